@@ -0,0 +1,76 @@
+import json
+from types import SimpleNamespace
+from typing import List, Dict, Any, Callable, Union
+
+Script = Union[Dict[str, Any], Callable[[List[Dict[str, Any]]], Dict[str, Any]]]
+
+def _estimate_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(json.dumps(m.get("content") or "")) for m in messages) // 4
+
+def tool_call(name: str, **arguments) -> Dict[str, Any]:
+    """Script entry for a response that calls one tool."""
+    return {"tool_calls": [{"name": name, "arguments": arguments}]}
+
+def text(content: str) -> Dict[str, Any]:
+    """Script entry for a plain text response."""
+    return {"content": content}
+
+class _Completions:
+    def __init__(self, llm: "FakeLLM"):
+        self.llm = llm
+
+    async def create(self, model: str, messages: List[Dict[str, Any]], stream: bool = False, **kwargs):
+        self.llm.calls.append({"model": model, "messages": messages, "kwargs": kwargs})
+        entry = self.llm.next_entry(messages)
+        prompt_tokens = _estimate_tokens(messages)
+
+        if "plan" in entry:
+            content = json.dumps(entry["plan"])
+            if stream:
+                return self._stream(content)
+            return self._response(content, [], prompt_tokens)
+
+        tool_calls = [
+            SimpleNamespace(
+                id=f"call_{len(self.llm.calls)}_{i}",
+                type="function",
+                function=SimpleNamespace(name=call["name"], arguments=json.dumps(call["arguments"])),
+            )
+            for i, call in enumerate(entry.get("tool_calls", []))
+        ]
+        return self._response(entry.get("content", ""), tool_calls, prompt_tokens)
+
+    def _response(self, content: str, tool_calls: list, prompt_tokens: int):
+        completion_tokens = max(1, len(content) // 4 + 10 * len(tool_calls))
+        message = SimpleNamespace(content=content, tool_calls=tool_calls or None)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=message, finish_reason="tool_calls" if tool_calls else "stop")],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    async def _stream(self, content: str, chunk_size: int = 16):
+        for i in range(0, len(content), chunk_size):
+            delta = SimpleNamespace(content=content[i:i + chunk_size])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+class FakeLLM:
+    """
+    Stand-in for AsyncOpenAI that replays a script of responses, so the full Worker
+    loop can be benchmarked without network calls or model latency. Script entries
+    are dicts ({"plan": ...}, tool_call(...), text(...)) or callables that build one
+    from the messages sent.
+    """
+    def __init__(self, script: List[Script]):
+        self.script = list(script)
+        self.calls: List[Dict[str, Any]] = []
+        self.chat = SimpleNamespace(completions=_Completions(self))
+
+    def next_entry(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if not self.script:
+            return {"content": "Script exhausted"}
+        entry = self.script.pop(0)
+        return entry(messages) if callable(entry) else entry
@@ -0,0 +1,314 @@
+"""
+Offline benchmarks for the extraction pipeline and the worker loop.
+
+Fixture sites are served from bench/fixtures by a local HTTP server and the LLM
+is replaced by a scripted fake, so runs need no network access or API keys and
+are repeatable. Results are compared against bench/thresholds.json and the
+script exits non-zero when any metric regresses past its budget.
+
+    python bench/run_bench.py --iterations 5 --json log/bench.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from types import SimpleNamespace
+from typing import Dict, Any, List, Callable, Awaitable
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, "scripts"))
+
+# The worker reads scripts/custom.log and writes log/ relative to the repo root
+os.chdir(ROOT_DIR)
+os.makedirs("log", exist_ok=True)
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-offline")
+
+from playwright.async_api import async_playwright
+from web.web import get_page_elements, get_main_content
+from web.accessibility import get_ax_elements
+from web.handler import process
+from web.fetch import fetch_url_text, close_client
+from web.bundle import BUNDLE_SOURCE, install_bundle, call_bundle
+from worker import Worker
+from plan_cache import PlanCache
+from metrics import count_tokens
+from server import FixtureServer
+from fake_llm import FakeLLM, tool_call
+
+FIXTURE_PAGES = {
+    "article": "article.html",
+    "spa": "spa.html",
+    "nested_form": "nested_form.html",
+    "embedded": "embedded.html",
+    "large_table": "large_table.html?rows=2000",
+}
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+def summarize(durations: List[float], **extra) -> Dict[str, Any]:
+    """Latency percentiles in milliseconds plus any extra measurements."""
+    return {
+        "runs": len(durations),
+        "p50_ms": round(percentile(durations, 50) * 1000, 2),
+        "p95_ms": round(percentile(durations, 95) * 1000, 2),
+        **extra,
+    }
+
+async def measure(iterations: int, func: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+    """Run func repeatedly, recording wall time and the Python allocation peak."""
+    durations = []
+    peak = 0
+    result = None
+    for _ in range(iterations):
+        tracemalloc.start()
+        start = time.perf_counter()
+        result = await func()
+        durations.append(time.perf_counter() - start)
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return {"durations": durations, "peak_bytes": peak, "result": result}
+
+async def js_heap_bytes(page) -> int:
+    """Used JS heap of the page (Chromium only), 0 when unavailable."""
+    try:
+        return int(await page.evaluate("() => performance.memory ? performance.memory.usedJSHeapSize : 0"))
+    except Exception:
+        return 0
+
+async def bench_extraction(page, server: FixtureServer, iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Time raw element extraction and the selector processing pass on each fixture."""
+    results = {}
+    stub_worker = SimpleNamespace(page=page, worker_id="bench", site_knowledge=None)
+    for name, path in FIXTURE_PAGES.items():
+        await page.goto(server.url(path), wait_until="load")
+        if name == "spa":
+            await page.wait_for_selector(".product-card")
+
+        raw = await measure(iterations, lambda: get_page_elements(page))
+        results[f"extract.{name}"] = summarize(
+            raw["durations"],
+            peak_python_bytes=raw["peak_bytes"],
+            js_heap_bytes=await js_heap_bytes(page),
+            output_tokens=count_tokens(raw["result"]),
+        )
+
+        ax = await measure(iterations, lambda: get_ax_elements(page))
+        results[f"extract_ax.{name}"] = summarize(
+            ax["durations"],
+            peak_python_bytes=ax["peak_bytes"],
+            output_tokens=count_tokens(ax["result"]),
+        )
+
+        elements_json = raw["result"]
+        processed = await measure(iterations, lambda: process(stub_worker, elements_json))
+        results[f"process.{name}"] = summarize(
+            processed["durations"],
+            peak_python_bytes=processed["peak_bytes"],
+            output_tokens=count_tokens(processed["result"]),
+        )
+        print(f"[Bench] {name}: extract p50 {results[f'extract.{name}']['p50_ms']}ms "
+              f"(accessibility tree {results[f'extract_ax.{name}']['p50_ms']}ms), "
+              f"process p50 {results[f'process.{name}']['p50_ms']}ms, "
+              f"{results[f'process.{name}']['output_tokens']} tokens")
+    return results
+
+async def bench_read(page, server: FixtureServer, iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Reading an article through the browser versus the browserless HTTP fast path."""
+    url = server.url(FIXTURE_PAGES["article"])
+
+    async def browser_read():
+        await page.goto(url, wait_until="load")
+        return await get_main_content(page)
+
+    browser = await measure(iterations, browser_read)
+    fetched = await measure(iterations, lambda: fetch_url_text(url))
+    await close_client()
+    results = {
+        "read.browser": summarize(browser["durations"], output_tokens=count_tokens(browser["result"])),
+        "read.http": summarize(fetched["durations"], peak_python_bytes=fetched["peak_bytes"],
+                               output_tokens=count_tokens(fetched["result"]["text"])),
+    }
+    print(f"[Bench] read article: browser p50 {results['read.browser']['p50_ms']}ms, "
+          f"http p50 {results['read.http']['p50_ms']}ms")
+    return results
+
+async def bench_bundle(page, server: FixtureServer, iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Calls into the preinstalled page bundle versus sending its source with every call."""
+    results = {}
+    # What every call used to cost: the whole script travels over CDP and is compiled again
+    inline_js = f"(arg) => {{ ({BUNDLE_SOURCE})(); return window.__autobrowser.collectElements(arg); }}"
+    arg = {"selector": "input, button, a[href], select, textarea, label, table, span", "margin": None,
+           "limit": 400, "repeatedWeight": 0.25}
+    for name in ("article", "large_table"):
+        await page.goto(server.url(FIXTURE_PAGES[name]), wait_until="load")
+        bundled = await measure(iterations, lambda: call_bundle(page, "collectElements", arg))
+        inline = await measure(iterations, lambda: page.evaluate(inline_js, arg))
+        results[f"bundle.collect.{name}"] = summarize(bundled["durations"], elements=len(bundled["result"]))
+        results[f"bundle.inline.{name}"] = summarize(inline["durations"], elements=len(inline["result"]))
+        print(f"[Bench] bundle {name}: preinstalled p50 {results[f'bundle.collect.{name}']['p50_ms']}ms, "
+              f"inline source p50 {results[f'bundle.inline.{name}']['p50_ms']}ms")
+
+    selectors = [f"//tr[{row}]/td[1]" for row in range(1, 201)] + ["//table", "//a[@href]", "//input", "//*[@id='missing']"]
+    checked = await measure(iterations, lambda: call_bundle(page, "checkSelectors", selectors))
+    results["bundle.check_selectors"] = summarize(checked["durations"], selectors=len(selectors),
+                                                  found=sum(1 for check in checked["result"] if check.get("found")))
+    print(f"[Bench] bundle checkSelectors ({len(selectors)} selectors): p50 {results['bundle.check_selectors']['p50_ms']}ms")
+    return results
+
+def workflow_script(form_url: str) -> list:
+    """Fake LLM responses for a one-task workflow that fills a field on the nested form."""
+    return [
+        {"plan": {
+            "title": "Fill the application form",
+            "tasks": [{"title": "Enter first name", "description": f"Open {form_url} and type Ada into the first name field"}],
+        }},
+        tool_call("move_to_url", url=form_url),
+        tool_call("get_url_contents"),
+        tool_call("send_keys_to_element", xpathSelector="//input[@id='first_name']", keys="Ada"),
+        tool_call("mark_task_complete", task_id="1", result="Typed Ada into the first name field"),
+    ]
+
+async def run_workflow(page, form_url: str, max_steps: int = 10) -> Dict[str, Any]:
+    """Drive the real Worker loop against the fake LLM until every task has finished."""
+    worker = Worker(
+        page=page, worker_id="bench", request_queue=None, api="openai", model="bench-model", max_messages=50,
+        config={"enable_macros": "false", "enable_site_knowledge": "false"},
+    )
+    llm = FakeLLM(workflow_script(form_url))
+    worker.client = llm
+    worker.orchestrator.client = llm
+    with tempfile.TemporaryDirectory() as cache_dir:
+        worker.orchestrator.plan_cache = PlanCache(path=os.path.join(cache_dir, "plans.json"))
+        await page.goto("about:blank")
+        await worker.setup_client()
+        step_durations = []
+        if await worker.process_user_input(f"Type Ada into the first name field on {form_url}"):
+            for _ in range(max_steps):
+                start = time.perf_counter()
+                await worker.step()
+                step_durations.append(time.perf_counter() - start)
+                tasks = worker.current_workflow.tasks
+                if tasks and all(t.completed or t.failed for t in tasks):
+                    break
+        worker._end_workflow_trace("completed")
+
+    tasks = worker.current_workflow.tasks if worker.current_workflow else []
+    return {
+        "steps": step_durations,
+        "completed": bool(tasks) and all(t.completed for t in tasks),
+        "llm_calls": len(llm.calls),
+        "prompt_tokens": worker.token_usage.prompt_tokens if worker.token_usage else 0,
+        "prompt_tokens_by_category": worker.token_usage.by_category if worker.token_usage else {},
+    }
+
+async def bench_workflow(page, server: FixtureServer, iterations: int) -> Dict[str, Dict[str, Any]]:
+    form_url = server.url("nested_form.html")
+    runs = await measure(iterations, lambda: run_workflow(page, form_url))
+    last = runs["result"]
+    if not last["completed"]:
+        print("[Bench] Workflow did not complete, see output above")
+    print(f"[Bench] workflow: {len(last['steps'])} steps, {last['llm_calls']} LLM calls, {last['prompt_tokens']} prompt tokens")
+    return {
+        "workflow.nested_form": summarize(
+            runs["durations"],
+            completed=last["completed"],
+            steps=len(last["steps"]),
+            llm_calls=last["llm_calls"],
+            prompt_tokens=last["prompt_tokens"],
+            prompt_tokens_by_category=last["prompt_tokens_by_category"],
+            peak_python_bytes=runs["peak_bytes"],
+            js_heap_bytes=await js_heap_bytes(page),
+        ),
+        "workflow.step": summarize(last["steps"]),
+    }
+
+async def bench_video(page, iterations: int) -> Dict[str, Dict[str, Any]]:
+    """Time frames from the dashboard video track; skipped when aiortc isn't installed."""
+    try:
+        from nyx import Nyx
+        import aiortc  # noqa: F401
+    except ImportError as e:
+        print(f"[Bench] Skipping video track benchmark: {e}")
+        return {}
+
+    class PageHolder:
+        """Stands in for Nyx; the track only needs .page and a weak reference."""
+        def __init__(self, page):
+            self.page = page
+
+    holder = PageHolder(page)
+    track = await Nyx.create_video_track(holder)
+    frames = await measure(max(iterations, 10), track.recv)
+    track.stop()
+    return {"video.frame": summarize(frames["durations"], peak_python_bytes=frames["peak_bytes"])}
+
+def check_thresholds(results: Dict[str, Dict[str, Any]], thresholds: Dict[str, Dict[str, float]]) -> List[str]:
+    """Return a message for every metric that exceeds its budget."""
+    regressions = []
+    for scenario, budgets in thresholds.items():
+        measured = results.get(scenario)
+        if measured is None:
+            continue
+        for metric, limit in budgets.items():
+            value = measured.get(metric)
+            if isinstance(value, (int, float)) and value > limit:
+                regressions.append(f"{scenario}.{metric} = {value} exceeds {limit}")
+    return regressions
+
+async def main(args) -> int:
+    results: Dict[str, Dict[str, Any]] = {}
+    with FixtureServer() as server:
+        async with async_playwright() as p:
+            browser = await p.chromium.launch(headless=True)
+            context = await browser.new_context(viewport={"width": 1280, "height": 720})
+            await install_bundle(context)
+            page = await context.new_page()
+            try:
+                results.update(await bench_extraction(page, server, args.iterations))
+                results.update(await bench_read(page, server, args.iterations))
+                results.update(await bench_bundle(page, server, args.iterations))
+                results.update(await bench_workflow(page, server, args.iterations))
+                results.update(await bench_video(page, args.iterations))
+            finally:
+                await browser.close()
+
+    print("\n=== Benchmark Results ===")
+    for scenario, measured in results.items():
+        print(f"{scenario}: {json.dumps(measured)}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(args.json) or ".", exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if not args.thresholds:
+        return 0
+    with open(args.thresholds, "r", encoding="utf-8") as f:
+        regressions = check_thresholds(results, json.load(f))
+    if regressions:
+        print("\n=== Regressions ===")
+        for line in regressions:
+            print(line)
+        return 1
+    print("\nAll metrics within thresholds")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the offline Auto Browser benchmarks")
+    parser.add_argument("--iterations", type=int, default=5, help="Runs per scenario")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--thresholds", default=os.path.join(BENCH_DIR, "thresholds.json"),
+                        help="Budgets to check against; pass an empty string to skip")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,69 @@
+import os
+import threading
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def large_table_html(rows: int = 2000, columns: int = 8) -> str:
+    """A wide data table with a link and a button per row, generated so the corpus stays small on disk."""
+    header = "".join(f"<th>Column {c}</th>" for c in range(columns))
+    body = []
+    for r in range(rows):
+        cells = "".join(f"<td>r{r}c{c} value {(r * 31 + c * 17) % 997}</td>" for c in range(columns))
+        body.append(
+            f'<tr class="data-row">{cells}'
+            f'<td><a href="/record/{r}">Open {r}</a></td>'
+            f'<td><button class="btn row-action" data-row="{r}">Edit</button></td></tr>'
+        )
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head><meta charset="utf-8"><title>Bench Large Table - {rows} rows</title></head>
+<body>
+    <nav class="nav"><a href="/">Home</a><a href="/reports">Reports</a><input type="search" placeholder="Filter rows"></nav>
+    <table id="data"><thead><tr>{header}<th>Link</th><th>Action</th></tr></thead>
+    <tbody>{''.join(body)}</tbody></table>
+</body>
+</html>"""
+
+class FixtureHandler(SimpleHTTPRequestHandler):
+    """Serves bench/fixtures plus generated pages; quiet so timings aren't skewed by logging."""
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        if parsed.path == "/large_table.html":
+            rows = int(parse_qs(parsed.query).get("rows", ["2000"])[0])
+            payload = large_table_html(rows).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer:
+    """Local HTTP server for the fixture corpus, running on a background thread."""
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        handler = partial(FixtureHandler, directory=FIXTURES_DIR)
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def __enter__(self) -> "FixtureServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
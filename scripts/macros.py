@@ -0,0 +1,103 @@
+import os
+import json
+import time
+from typing import Dict, Any, List, Optional
+from plan_cache import CACHE_DIR, extract_parameters, parameterize, fill
+
+# Tools with deterministic side effects that are worth replaying
+MACRO_TOOLS = {"move_to_url", "send_keys_to_element", "call_submit", "click_element"}
+
+# Arguments stored and replayed verbatim. Selectors are not parameterized: the page fingerprint decides
+# whether a recorded selector still applies
+LITERAL_ARGUMENTS = {"xpathSelector"}
+
+# Identifies the element a selector resolves to: its stable attributes plus its label (or link target
+# without the query string), so a selector that now lands on a different bare <a> or <button> diverges
+FINGERPRINT_JS = """
+el => [
+    el.tagName.toLowerCase(),
+    el.id || '',
+    el.getAttribute('name') || '',
+    el.getAttribute('type') || '',
+    el.getAttribute('role') || '',
+    typeof el.href === 'string' && el.href ? el.href.split(/[?#]/)[0] : (el.getAttribute('aria-label') || el.textContent || '').replace(/\\s+/g, ' ').trim().slice(0, 40)
+].join('|')
+""".replace('\n', ' ').strip()
+
+class MacroLibrary:
+    """
+    Recorded tool-call sequences from successfully completed tasks, keyed on the
+    parameterized task description. Each step keeps the fingerprint of the element
+    its selector resolved to so replays can stop as soon as the page diverges.
+    """
+    def __init__(self, path: str = os.path.join(CACHE_DIR, "macros.json"), max_macros: int = 200):
+        self.path = path
+        self.max_macros = max_macros
+        self.macros: Dict[str, Dict[str, Any]] = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.macros = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[Macros] Could not load {self.path}: {e}")
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.macros, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[Macros] Could not save {self.path}: {e}")
+
+    def lookup(self, task_description: str) -> Optional[List[Dict[str, Any]]]:
+        """Return the macro steps for a task with its parameters filled in."""
+        skeleton, params = extract_parameters(task_description)
+        macro = self.macros.get(skeleton)
+        if not macro or macro["param_count"] != len(params):
+            return None
+        return [
+            {
+                "tool": step["tool"],
+                "arguments": {
+                    name: fill(value, params) if isinstance(value, str) and name not in LITERAL_ARGUMENTS else value
+                    for name, value in step["arguments"].items()
+                },
+                "fingerprint": step.get("fingerprint"),
+            }
+            for step in macro["steps"]
+        ]
+
+    def record(self, task_description: str, steps: List[Dict[str, Any]]) -> None:
+        """Store the steps that completed a task, replacing any older macro for it."""
+        steps = [step for step in steps if step["tool"] in MACRO_TOOLS]
+        if not steps:
+            return
+        skeleton, params = extract_parameters(task_description)
+        self.macros[skeleton] = {
+            "param_count": len(params),
+            "steps": [
+                {
+                    "tool": step["tool"],
+                    "arguments": {
+                        name: parameterize(value, params) if isinstance(value, str) and name not in LITERAL_ARGUMENTS else value
+                        for name, value in step["arguments"].items()
+                    },
+                    "fingerprint": step.get("fingerprint"),
+                }
+                for step in steps
+            ],
+            "recorded": time.time(),
+        }
+        if len(self.macros) > self.max_macros:
+            oldest = min(self.macros, key=lambda k: self.macros[k]["recorded"])
+            del self.macros[oldest]
+        self._save()
+        print(f"[Macros] Recorded {len(steps)} step(s) for '{skeleton}'")
+
+    def forget(self, task_description: str) -> None:
+        """Drop the macro for a task after a replay diverged."""
+        if self.macros.pop(extract_parameters(task_description)[0], None) is not None:
+            self._save()
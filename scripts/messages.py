@@ -14,6 +14,7 @@ class Message:
     tool_call_id: Optional[str] = None
     name: Optional[str] = None
     tool_calls: Optional[List[Dict[str, Any]]] = None
+    seq: Optional[int] = None  # Position in the history, assigned when added
     
     @staticmethod
     def create_text(role: str, text: str) -> 'Message':
@@ -144,13 +145,19 @@ class MessageHistory:
     for adding and retrieving messages in different formats.
     """
     def __init__(self, system_prompt: str):
-        self.messages: List[Message] = [
-            Message.create_text("system", system_prompt)
-        ]
+        self.next_seq = 0
+        self.messages: List[Message] = []
+        self.add_message(Message.create_text("system", system_prompt))
         
     def add_message(self, message: Message) -> None:
         """Add a message to the history."""
+        message.seq = self.next_seq
+        self.next_seq += 1
         self.messages.append(message)
+
+    def messages_since(self, seq: int) -> List[Message]:
+        """Messages added after the one numbered seq (use -1 for all), even if older ones were trimmed."""
+        return [msg for msg in self.messages if msg.seq is not None and msg.seq > seq]
         
     def add_system_text(self, text: str) -> None:
         """Add a system text message."""
@@ -1,6 +1,166 @@
+import io
+import json
+import base64
+import math
+import functools
+from typing import Dict, Any, List, Optional
 import tiktoken
+from web.profiler import metrics
+
+LLM_TOKENS = metrics.counter("autobrowser_llm_tokens_total", "LLM tokens by call and kind (prompt/completion), from API usage when reported")
+PROMPT_TOKENS_BY_CATEGORY = metrics.counter("autobrowser_prompt_tokens_estimated_total", "Estimated prompt tokens by message category")
+
+# Chat format overhead per message and for priming the reply (OpenAI cookbook)
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            # Non-OpenAI models (grok, ollama) don't map to an encoding; o200k is close enough for estimates
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # Encodings are downloaded on first use, which fails offline
+        print(f"[Tokens] No tiktoken encoding for {model} ({type(e).__name__}), estimating 4 characters per token")
+        return None
+
+def count_tokens(text: str, model: str = "gpt-4o") -> int:
+    """Number of tokens text encodes to for model."""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
 
 def avg_tokens(text, model="gpt-4o"):
-    # Choose the appropriate encoding for your model. Here, we use the default for gpt-3.5-turbo.
-    encoding = tiktoken.get_encoding(model)
-    return len(encoding.encode(text))
+    return count_tokens(text, model)
+
+def image_tokens(image_url: Dict[str, Any]) -> int:
+    """Vision token cost of an image part: 85 base plus 170 per 512px tile at high detail."""
+    if image_url.get("detail") == "low":
+        return 85
+    width, height = 1280, 720  # Default viewport screenshot
+    url = image_url.get("url", "")
+    if url.startswith("data:"):
+        try:
+            from PIL import Image
+            with Image.open(io.BytesIO(base64.b64decode(url.split(",", 1)[1]))) as image:
+                width, height = image.size
+        except Exception:
+            pass
+    # Fit within 2048x2048, then scale the short side down to 768
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+# Tools whose result is (or ends with) a page snapshot
+PAGE_SNAPSHOT_TOOLS = {"get_url_contents", "move_to_url", "click_element", "send_keys_to_element",
+                       "scroll_and_extract", "get_more_elements"}
+
+def message_category(message: Dict[str, Any], index: int) -> str:
+    """Bucket a chat message by what it carries so prompt size can be attributed."""
+    role = message.get("role")
+    content = message.get("content")
+    if index == 0 and role == "system":
+        return "system_prompt"
+    if role == "tool":
+        # Failed actions return a short error instead of the snapshot
+        if message.get("name") in PAGE_SNAPSHOT_TOOLS and not (isinstance(content, str) and content.startswith("Error")):
+            return "page_json"
+        return "tool_results"
+    if role == "system":
+        return "task_instructions"
+    if role == "assistant":
+        return "assistant"
+    return "user"
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]], model: str, tools: Optional[List[Dict[str, Any]]] = None) -> Dict[str, int]:
+    """Estimate prompt tokens per category before a call is made."""
+    counts: Dict[str, int] = {}
+
+    def add(category: str, amount: int):
+        counts[category] = counts.get(category, 0) + amount
+
+    for index, message in enumerate(messages):
+        category = message_category(message, index)
+        add(category, TOKENS_PER_MESSAGE)
+        content = message.get("content")
+        if isinstance(content, str):
+            add(category, count_tokens(content, model))
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "image_url":
+                    add("images", image_tokens(part.get("image_url", {})))
+                elif part.get("type") == "text":
+                    add(category, count_tokens(part.get("text", ""), model))
+        for tool_call in message.get("tool_calls") or []:
+            function = tool_call.get("function", {})
+            add(category, count_tokens(function.get("name", "") + function.get("arguments", ""), model))
+    if tools:
+        add("tool_definitions", count_tokens(json.dumps(tools), model))
+    if counts:
+        add("system_prompt", TOKENS_PER_REPLY)
+    return counts
+
+def usage_tokens(usage: Any) -> Optional[Dict[str, int]]:
+    """Prompt/completion counts from an API response's usage field, if reported."""
+    if usage is None or getattr(usage, "prompt_tokens", None) is None:
+        return None
+    return {"prompt": int(usage.prompt_tokens), "completion": int(usage.completion_tokens or 0)}
+
+def record_usage(call: str, estimate: Dict[str, int], usage: Optional[Dict[str, int]], completion_estimate: int = 0) -> Dict[str, int]:
+    """Export one call's tokens to /metrics, preferring API usage over estimates."""
+    prompt = usage["prompt"] if usage else sum(estimate.values())
+    completion = usage["completion"] if usage else completion_estimate
+    LLM_TOKENS.inc(prompt, call=call, kind="prompt")
+    LLM_TOKENS.inc(completion, call=call, kind="completion")
+    for category, tokens in estimate.items():
+        PROMPT_TOKENS_BY_CATEGORY.inc(tokens, call=call, category=category)
+    return {"prompt": prompt, "completion": completion}
+
+class TokenAccount:
+    """Token totals for one workflow, broken down by LLM call and prompt category."""
+    def __init__(self, model: str):
+        self.model = model
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.estimated_prompt_tokens = 0
+        self.by_call: Dict[str, Dict[str, int]] = {}
+        self.by_category: Dict[str, int] = {}
+        self.last_request: Dict[str, Any] = {}
+
+    def record(self, call: str, estimate: Dict[str, int], usage: Any = None, completion_estimate: int = 0) -> Dict[str, int]:
+        """Add a finished call, using its usage field when the API reported one."""
+        counted = record_usage(call, estimate, usage_tokens(usage), completion_estimate)
+        self.requests += 1
+        self.prompt_tokens += counted["prompt"]
+        self.completion_tokens += counted["completion"]
+        self.estimated_prompt_tokens += sum(estimate.values())
+        totals = self.by_call.setdefault(call, {"requests": 0, "prompt": 0, "completion": 0})
+        totals["requests"] += 1
+        totals["prompt"] += counted["prompt"]
+        totals["completion"] += counted["completion"]
+        for category, tokens in estimate.items():
+            self.by_category[category] = self.by_category.get(category, 0) + tokens
+        self.last_request = {"call": call, **counted, "estimated_prompt": sum(estimate.values()), "by_category": estimate}
+        return counted
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "model": self.model,
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "estimated_prompt_tokens": self.estimated_prompt_tokens,
+            "by_call": self.by_call,
+            "by_category": dict(sorted(self.by_category.items(), key=lambda item: -item[1])),
+            "last_request": self.last_request,
+        }
@@ -6,13 +6,20 @@ import json
 from openai import AsyncOpenAI
 from fastapi import FastAPI, WebSocket, Body
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from pathlib import Path
 import numpy as np
 from PIL import Image
 import io
 from pydantic import BaseModel
 import weakref
+import uuid
+import time
+from web.profiler import metrics, sampler, set_profile_mode, get_profile_mode
+from web.tracing import tracer, InMemoryExporter, JsonFileExporter
+from web.network import RequestRouter
+from web.fetch import close_client
+from web.bundle import install_bundle
 
 class Nyx:
     def __init__(self):
@@ -42,6 +49,15 @@ class Nyx:
             self.MODEL = self.config["ollama_local_model"]
 
         self.tools = None #worker can initialize directly
+
+        # Blocks heavy resources, ads and trackers for every page of the browser context (images and fonts stay on with vision)
+        self.request_router = RequestRouter.from_config(self.config)
+
+        # Tracing: recent traces stay in memory for the dashboard, optionally also exported to disk
+        self.trace_store = InMemoryExporter()
+        tracer.add_exporter(self.trace_store)
+        if self.config.get("trace_exporter", "json") == "json":
+            tracer.add_exporter(JsonFileExporter(self.config.get("trace_file", "log/traces.jsonl")))
         
         # Initialize video streaming attributes
         self.video_track = None
@@ -97,6 +113,50 @@ class Nyx:
                 return HTMLResponse("Error: Dashboard template not found. Please ensure dashboard.html exists in the templates directory.")
             return HTMLResponse(template_path.read_text())
 
+        @self.app.get("/metrics")
+        async def metrics_endpoint():
+            return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+        @self.app.get("/network")
+        async def network_stats():
+            """Requests let through and blocked by the request router."""
+            return self.request_router.stats()
+
+        @self.app.get("/traces")
+        async def list_traces(name: str = None):
+            """Recent traces, newest first (name=workflow for workflow traces only)."""
+            return self.trace_store.list_traces(name)
+
+        @self.app.get("/traces/{trace_id}")
+        async def get_trace(trace_id: str):
+            """All spans of a trace, ordered by start time."""
+            return self.trace_store.get_trace(trace_id)
+
+        @self.app.post("/profile/start")
+        async def profile_start(mode: str = "sampling", rate: int = 100):
+            """Switch profiling on for the live server (mode: sampling or deterministic)."""
+            try:
+                set_profile_mode(mode, rate)
+            except ValueError as e:
+                return PlainTextResponse(str(e), status_code=400)
+            return {"mode": get_profile_mode(), "rate_hz": sampler.rate_hz if mode == "sampling" else None}
+
+        @self.app.post("/profile/stop")
+        async def profile_stop():
+            """Switch profiling off and return the collapsed stacks, also saved under log/."""
+            collapsed = set_profile_mode("off")
+            if collapsed:
+                os.makedirs("log", exist_ok=True)
+                path = f"log/profile_{int(time.time())}.collapsed"
+                await asyncio.to_thread(Path(path).write_text, collapsed + "\n")
+                print(f"[PROFILE] Collapsed stacks written to {path}")
+            return PlainTextResponse(collapsed)
+
+        @self.app.get("/profile/collapsed")
+        async def profile_collapsed():
+            """Collapsed stacks of the current sampling run without stopping it."""
+            return PlainTextResponse(sampler.collapsed())
+
         @self.app.post("/offer")
         async def offer(params: RTCOffer):
             from aiortc import RTCPeerConnection, RTCSessionDescription
@@ -151,6 +211,7 @@ class Nyx:
 
                 # Initialize or update worker (this will now also send the ready message)
                 worker = await self.create_worker(websocket)
+                worker.session_id = uuid.uuid4().hex[:8]  # Metric label for this dashboard session
                 
                 while True:
                     try:
@@ -219,6 +280,8 @@ class Nyx:
                 screen={"width": 1920, "height": 1080},  # Match screen size with viewport
                 permissions=["geolocation"],
             )
+            await self.request_router.install(self.context)
+            await install_bundle(self.context)
             
             self.page = await self.context.new_page()
             await self.page.goto("about:blank")  # Navigate to a blank page to ensure page is ready
@@ -284,9 +347,10 @@ class Nyx:
                     self._frame_count += 1
                     return frame
 
-            async def stop(self):
+            def stop(self):
+                # MediaStreamTrack.stop() is synchronous in aiortc
                 self._stopped = True
-                await super().stop()
+                super().stop()
 
         # Create and return the video track
         return BrowserVideoStreamTrack(self)
@@ -302,7 +366,8 @@ class Nyx:
                 model=self.MODEL,
                 max_messages=10,
                 websocket=websocket, # Assign websocket during creation
-                enable_vision=True
+                enable_vision=True,
+                config=self.config
             )
             # Initialize the worker (sets up API client, etc.)
             await self.worker.initialize()
@@ -341,6 +406,7 @@ class Nyx:
 
             # Initialize or update worker
             worker = await self.create_worker(websocket)
+            worker.session_id = uuid.uuid4().hex[:8]  # Metric label for this dashboard session
             
             try:
                 print("\n=== Nyx AI Initialized ===")
@@ -402,7 +468,7 @@ class Nyx:
             await self.pc.close()
             self.pc = None
         if self.video_track:
-            await self.video_track.stop()
+            self.video_track.stop()
             self.video_track = None
         if self.page:
             await self.page.close()
@@ -416,6 +482,7 @@ class Nyx:
         if self.playwright:
             await self.playwright.stop()
             self.playwright = None
+        await close_client()
 
     def run_dashboard(self, host="0.0.0.0", port=8000):
         """Run the web dashboard."""
@@ -1,6 +1,30 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, AsyncIterator
+import re
 import json
+import asyncio
 from openai import AsyncOpenAI
+import time
+from plan_cache import PlanCache
+from router import ModelRouter
+from web.profiler import Timer
+from metrics import TokenAccount, estimate_prompt_tokens, record_usage, usage_tokens, count_tokens
+
+PLANNER_PROMPT = """You are an expert AI deisnged to split the user request into multiple tasks. 
+
+        - The worker has web browsing capabilities and tools available - focus on the high-level goals.
+        - Each task should be clear and goal-oriented.
+        
+        Format your response as a JSON object with the following structure:
+        {
+            "title": "Workflow title",
+            "tasks": [
+                {
+                    "title": "Task title",
+                    "description": "Detailed description of what needs to be accomplished"
+                }
+            ]
+        }
+        Focus on what needs to be accomplished rather than how to do it."""
 
 class Task:
     def __init__(self, title: str, description: str):
@@ -76,51 +100,203 @@ class Workflow:
             if task_index < len(self.tasks) - 1:
                 self.current_task_index = task_index + 1
 
+class StreamingPlanParser:
+    """Incrementally pulls complete task objects out of a streamed workflow JSON document."""
+    _TASKS_START = re.compile(r'"tasks"\s*:\s*\[')
+    _TITLE = re.compile(r'"title"\s*:\s*"((?:[^"\\]|\\.)*)"')
+
+    def __init__(self):
+        self.buffer = ""
+        self.title = None
+        self._pos = None  # Scan position inside the tasks array, None until it opens
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Task]:
+        """Add streamed text and return any tasks completed by it."""
+        self.buffer += chunk
+        if self._pos is None:
+            match = self._TASKS_START.search(self.buffer)
+            if not match:
+                return []
+            title = self._TITLE.search(self.buffer, 0, match.start())
+            if title:
+                self.title = json.loads(f'"{title.group(1)}"')
+            self._pos = match.end()
+
+        tasks = []
+        while self._pos < len(self.buffer) and not self._done:
+            char = self.buffer[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == "{":
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    data = json.loads(self.buffer[self._object_start:self._pos + 1])
+                    tasks.append(Task(data["title"], data["description"]))
+            elif char == "]" and self._depth == 0:
+                self._done = True
+            self._pos += 1
+        return tasks
+
 class Orchestrator:
-    def __init__(self, api_key: str = None, model: str = "gpt-4-turbo-preview"):
+    def __init__(self, api_key: str = None, model: str = "gpt-4-turbo-preview", plan_cache: Optional[PlanCache] = None, revalidate_cached_plans: bool = False, router: Optional[ModelRouter] = None):
         self.client = AsyncOpenAI(api_key=api_key) if api_key else AsyncOpenAI()
         self.model = model
         self.current_workflow = None
+        self.current_prompt = None
+        self.plan_cache = plan_cache if plan_cache is not None else PlanCache()
+        self.revalidate_cached_plans = revalidate_cached_plans
+        self._revalidation_tasks = set()
+        self.router = router
+        self.token_account: Optional[TokenAccount] = None  # Set by the worker for each workflow
+
+    def _record_tokens(self, call: str, messages: List[Dict[str, Any]], usage: Any, completion_text: str) -> None:
+        """Attribute an orchestrator call's tokens to the current workflow, or just to /metrics"""
+        estimate = estimate_prompt_tokens(messages, self.model)
+        completion_estimate = count_tokens(completion_text or "", self.model)
+        if self.token_account:
+            self.token_account.record(call, estimate, usage, completion_estimate)
+        else:
+            record_usage(call, estimate, usage_tokens(usage), completion_estimate)
+
+    def _use_cached_plan(self, user_prompt: str) -> Optional[Workflow]:
+        """Load a cached plan for the prompt, scheduling a background re-plan if enabled"""
+        cached_plan = self.plan_cache.lookup(user_prompt)
+        if not cached_plan:
+            return None
+        print(f"[Orchestrator] Using cached plan: {cached_plan['title']}")
+        if self.revalidate_cached_plans:
+            task = asyncio.create_task(self._revalidate_plan(user_prompt, cached_plan))
+            self._revalidation_tasks.add(task)
+            task.add_done_callback(self._revalidation_tasks.discard)
+        return Workflow.from_dict(cached_plan)
 
     async def create_workflow(self, user_prompt: str) -> Workflow:
-        """Create a workflow based on user prompt"""
-        system_prompt = """You are an expert AI deisnged to split the user request into multiple tasks. 
+        """Create a workflow based on user prompt, reusing a cached plan when one matches"""
+        async for _ in self.stream_workflow(user_prompt):
+            pass
+        return self.current_workflow
 
-        - The worker has web browsing capabilities and tools available - focus on the high-level goals.
-        - Each task should be clear and goal-oriented.
-        
-        Format your response as a JSON object with the following structure:
-        {
-            "title": "Workflow title",
-            "tasks": [
-                {
-                    "title": "Task title",
-                    "description": "Detailed description of what needs to be accomplished"
-                }
-            ]
-        }
-        Focus on what needs to be accomplished rather than how to do it."""
+    async def stream_workflow(self, user_prompt: str) -> AsyncIterator[Task]:
+        """Create a workflow, yielding each task as soon as it is parsed from the streamed plan.
 
+        self.current_workflow is set before the first task is yielded and grows as
+        further tasks arrive, so callers can start on task 1 while planning continues.
+        """
+        self.current_prompt = user_prompt
+        cached_workflow = self._use_cached_plan(user_prompt)
+        if cached_workflow:
+            self.current_workflow = cached_workflow
+            for task in cached_workflow.tasks:
+                yield task
+            return
+
+        workflow = Workflow("Planning...", [])
+        self.current_workflow = workflow
+        parser = StreamingPlanParser()
+        messages = [
+            {"role": "system", "content": PLANNER_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+        usage = None
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.3
-            )
+            async with Timer("llm_call.plan_first_token", model=self.model):
+                stream = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    temperature=0.3,
+                    stream=True
+                )
+
+            async for chunk in stream:
+                # Only some providers report usage on streams (in a final chunk without choices)
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                for task in parser.feed(chunk.choices[0].delta.content or ""):
+                    if parser.title:
+                        workflow.title = parser.title
+                    workflow.tasks.append(task)
+                    yield task
+
+            self._record_tokens("plan", messages, usage, parser.buffer)
+            workflow_data = json.loads(parser.buffer)
+            print(f"Workflow data: {workflow_data}")
+            workflow.title = workflow_data["title"]
+            if not workflow.tasks:
+                raise ValueError("Plan contains no tasks")
+
+        except Exception as e:
+            raise Exception(f"Failed to create workflow: {str(e)}")
+
+    async def _plan(self, user_prompt: str) -> Dict[str, Any]:
+        """Ask the model for a fresh workflow plan"""
+        try:
+            messages = [
+                {"role": "system", "content": PLANNER_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ]
+            async with Timer("llm_call.plan", model=self.model):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    response_format={"type": "json_object"},
+                    temperature=0.3
+                )
+            self._record_tokens("replan", messages, getattr(response, "usage", None), response.choices[0].message.content)
 
             workflow_data = json.loads(response.choices[0].message.content)
             print(f"Workflow data: {workflow_data}")
-            tasks = [Task(**task) for task in workflow_data["tasks"]]
-            self.current_workflow = Workflow(workflow_data["title"], tasks)
-            return self.current_workflow
+            tasks = [Task(task["title"], task["description"]) for task in workflow_data["tasks"]]
+            return Workflow(workflow_data["title"], tasks).to_dict()
 
         except Exception as e:
             raise Exception(f"Failed to create workflow: {str(e)}")
 
+    async def _revalidate_plan(self, user_prompt: str, cached_plan: Dict[str, Any]):
+        """Re-plan in the background and drop the cached plan if it has drifted"""
+        try:
+            fresh_plan = await self._plan(user_prompt)
+            cached_titles = [t["title"].strip().lower() for t in cached_plan["tasks"]]
+            fresh_titles = [t["title"].strip().lower() for t in fresh_plan["tasks"]]
+            if cached_titles != fresh_titles:
+                # The fresh plan hasn't run yet; the next run plans again and caches it if it succeeds
+                print(f"[Orchestrator] Cached plan for '{user_prompt}' is stale, dropping it from the cache")
+                self.plan_cache.invalidate(user_prompt)
+            else:
+                print(f"[Orchestrator] Cached plan for '{user_prompt}' is still valid")
+        except Exception as e:
+            print(f"[Orchestrator] Background re-plan failed: {e}")
+
+    def record_workflow_result(self):
+        """Cache the current plan, and add it to the template library, only if every task completed.
+        A plan that led to a failed task is dropped so it isn't replayed."""
+        if not self.current_workflow or not self.current_prompt:
+            return
+        if all(task.completed and not task.failed for task in self.current_workflow.tasks):
+            plan = self.current_workflow.to_dict()
+            self.plan_cache.store(self.current_prompt, plan)
+            self.plan_cache.record_success(self.current_prompt, plan)
+        else:
+            print(f"[Orchestrator] Workflow for '{self.current_prompt}' had failures, dropping its cached plan")
+            self.plan_cache.invalidate(self.current_prompt)
+
     async def handle_worker_request(self, request: str, context: Dict[str, Any]) -> str:
         """Handle requests from worker when it needs help"""
         system_prompt = """You are an expert workflow orchestrator helping a worker complete tasks.
@@ -132,6 +308,19 @@ class Orchestrator:
         If user input is absolutely necessary, start your response with 'USER_INPUT_REQUIRED:'.
         Otherwise, suggest alternative approaches to achieve the desired outcome."""
 
+        # Transient errors (timeouts, detached elements) only need a retry, which the local model can spot
+        if self.router and self.router.enabled:
+            triage = await self.router.classify(
+                "error_triage",
+                "Is this worker error transient so that simply retrying the last action is likely to work?",
+                ["transient_retry", "needs_alternative", "needs_user_input"],
+                f"Current task: {context.get('current_task', 'Unknown')}\nWorker request: {request}\nError: {context.get('error_message', '')}",
+                escalate=False
+            )
+            if triage and triage["label"] == "transient_retry":
+                return (f"The error looks transient ({triage['reason']}). Refresh the page contents with "
+                        f"get_url_contents and retry the last action before trying anything else.")
+
         try:
             messages = [
                 {"role": "system", "content": system_prompt},
@@ -141,11 +330,16 @@ class Orchestrator:
                 """}
             ]
 
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3
-            )
+            start = time.monotonic()
+            async with Timer("llm_call.worker_help", model=self.model):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3
+                )
+            if self.router:
+                self.router.record_large_latency(time.monotonic() - start)
+            self._record_tokens("worker_help", messages, getattr(response, "usage", None), response.choices[0].message.content)
             print(f"Plan from orchestrator: {response.choices[0].message.content}")
             return response.choices[0].message.content
 
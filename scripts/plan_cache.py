@@ -0,0 +1,193 @@
+import os
+import re
+import json
+import copy
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+CACHE_DIR = "cache"
+
+# Values that vary between otherwise identical prompts ("search for 'x'", "open example.com")
+_PARAM_PATTERN = re.compile(
+    r"""("[^"]+"|'[^']+'|https?://\S+|\b[\w-]+(?:\.[\w-]+)*\.[a-z]{2,}\b|\b\d+(?:\.\d+)?\b)""",
+    re.IGNORECASE,
+)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Lowercase, collapse whitespace and drop trailing punctuation."""
+    text = re.sub(r"\s+", " ", prompt.strip().lower())
+    return text.rstrip(" .!?")
+
+
+def extract_parameters(prompt: str) -> Tuple[str, List[str]]:
+    """
+    Split a prompt into a normalized skeleton with {pN} slots and the values removed.
+    Values keep their original case (URL paths, names and quoted text are case-sensitive);
+    only the skeleton is lowercased. Unquoted words are part of the skeleton, so
+    'search example.com for "cats"' and 'search wiki.org for "dogs"' share a template
+    but 'search example.com for cats' and 'search wiki.org for dogs' don't.
+    """
+    params: List[str] = []
+
+    def replace(match):
+        params.append(match.group(0).strip("\"'"))
+        return "{p%d}" % (len(params) - 1)
+
+    text = re.sub(r"\s+", " ", prompt.strip()).rstrip(" .!?")
+    skeleton = _PARAM_PATTERN.sub(replace, text).lower()
+    return skeleton, params
+
+
+class PlanCache:
+    """
+    Cache of workflow plans keyed on the normalized prompt, plus a library of
+    parameterized templates built from plans that ran to completion.
+    """
+    def __init__(self, path: str = os.path.join(CACHE_DIR, "plans.json"), max_entries: int = 200):
+        self.path = path
+        self.max_entries = max_entries
+        self.plans: Dict[str, Dict[str, Any]] = {}
+        self.templates: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self.plans = data.get("plans", {})
+            self.templates = data.get("templates", {})
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[PlanCache] Could not load {self.path}: {e}")
+
+    def _save(self) -> None:
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"plans": self.plans, "templates": self.templates}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"[PlanCache] Could not save {self.path}: {e}")
+
+    def _evict(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Drop the least recently used entries beyond max_entries."""
+        if len(entries) <= self.max_entries:
+            return
+        by_age = sorted(entries, key=lambda k: entries[k].get("last_used", 0))
+        for key in by_age[:len(entries) - self.max_entries]:
+            del entries[key]
+
+    def lookup(self, prompt: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of a cached plan (exact match first, then template match)."""
+        key = normalize_prompt(prompt)
+        entry = self.plans.get(key)
+        if entry:
+            entry["last_used"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            self._save()
+            return _reset_plan(entry["plan"])
+
+        skeleton, params = extract_parameters(prompt)
+        template = self.templates.get(skeleton)
+        if template and len(template["params"]) == len(params):
+            template["last_used"] = time.time()
+            template["hits"] = template.get("hits", 0) + 1
+            self._save()
+            return _fill_template(template["plan"], params)
+        return None
+
+    def store(self, prompt: str, plan: Dict[str, Any]) -> None:
+        """Cache the plan produced for a prompt."""
+        self.plans[normalize_prompt(prompt)] = {
+            "plan": _reset_plan(plan),
+            "created": time.time(),
+            "last_used": time.time(),
+            "hits": 0,
+        }
+        self._evict(self.plans)
+        self._save()
+
+    def record_success(self, prompt: str, plan: Dict[str, Any]) -> None:
+        """Add a plan that completed without failures to the template library."""
+        skeleton, params = extract_parameters(prompt)
+        self.templates[skeleton] = {
+            "plan": _parameterize_plan(_reset_plan(plan), params),
+            "params": params,
+            "created": time.time(),
+            "last_used": time.time(),
+            "hits": 0,
+        }
+        self._evict(self.templates)
+        self._save()
+
+    def invalidate(self, prompt: str) -> None:
+        """Forget the cached plan and template for a prompt."""
+        self.plans.pop(normalize_prompt(prompt), None)
+        self.templates.pop(extract_parameters(prompt)[0], None)
+        self._save()
+
+
+def _reset_plan(plan: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy a Workflow.to_dict() plan with all progress cleared."""
+    plan = copy.deepcopy(plan)
+    plan["current_task_index"] = 0
+    for task in plan.get("tasks", []):
+        task["completed"] = False
+        task["failed"] = False
+    return plan
+
+
+def _map_strings(plan: Dict[str, Any], fn) -> Dict[str, Any]:
+    plan = copy.deepcopy(plan)
+    plan["title"] = fn(plan["title"])
+    for task in plan["tasks"]:
+        task["title"] = fn(task["title"])
+        task["description"] = fn(task["description"])
+    return plan
+
+
+# Numbers that number the plan itself ("Task 2", "step 3") rather than restate the prompt
+_ORDINAL_PREFIX = re.compile(r"\b(?:task|step|part|phase)\s*#?$", re.IGNORECASE)
+
+
+def parameterize(text: str, params: List[str]) -> str:
+    """
+    Replace parameter values in text with {pN} slots. Only whole tokens are replaced:
+    a value inside a longer word, number, domain or path ("2" in "h2", "10" in "2010")
+    is left alone.
+    """
+    slots = {value.lower(): index for index, value in enumerate(params) if value}
+    text = text.replace("{", "{{").replace("}", "}}")
+    if not slots:
+        return text
+    # Longest values first so "example.com/docs" wins over "example.com"
+    pattern = re.compile(
+        r"(?<![\w.\-/])(?:"
+        + "|".join(re.escape(value) for value in sorted(slots, key=len, reverse=True))
+        + r")(?![\w\-/]|\.\w)",
+        re.IGNORECASE,
+    )
+
+    def replace(match):
+        value = match.group(0)
+        if value[0].isdigit() and _ORDINAL_PREFIX.search(text, 0, match.start()):
+            return value
+        return "{p%d}" % slots[value.lower()]
+
+    return pattern.sub(replace, text)
+
+
+def fill(text: str, params: List[str]) -> str:
+    """Substitute parameter values back into a parameterized string."""
+    return text.format(**{f"p{i}": value for i, value in enumerate(params)})
+
+
+def _parameterize_plan(plan: Dict[str, Any], params: List[str]) -> Dict[str, Any]:
+    return _map_strings(plan, lambda text: parameterize(text, params))
+
+
+def _fill_template(plan: Dict[str, Any], params: List[str]) -> Dict[str, Any]:
+    return _map_strings(plan, lambda text: fill(text, params))
@@ -0,0 +1,113 @@
+import json
+import time
+from typing import Dict, Any, List, Optional
+from openai import AsyncOpenAI
+from web.profiler import Timer, metrics
+from metrics import estimate_prompt_tokens, record_usage, usage_tokens, count_tokens
+
+ROUTING_DECISIONS = metrics.counter("autobrowser_router_decisions_total", "Classification steps by where they were answered")
+ROUTING_SAVED_SECONDS = metrics.counter("autobrowser_router_saved_seconds_total", "Estimated large-model latency avoided by local routing")
+
+OLLAMA_BASE_URL = "http://localhost:11434/v1"
+
+CLASSIFIER_PROMPT = """You are a fast classifier inside a web automation agent.
+Answer the question using only the information given.
+Respond with a JSON object: {"label": <one of the allowed labels>, "confidence": <number between 0 and 1>, "reason": <short reason>}
+Use a low confidence whenever the answer is not clearly supported by the context."""
+
+class ModelRouter:
+    """
+    Tiered routing for cheap classification steps. Questions go to a small local
+    Ollama model first and are escalated to the large model only when the local
+    answer is missing or below the confidence threshold.
+    """
+    def __init__(self, large_client: AsyncOpenAI, large_model: str, local_model: Optional[str] = None,
+                 local_base_url: str = OLLAMA_BASE_URL, confidence_threshold: float = 0.8):
+        self.large_client = large_client
+        self.large_model = large_model
+        self.local_model = local_model
+        self.local_client = AsyncOpenAI(api_key="____", base_url=local_base_url) if local_model else None
+        self.confidence_threshold = confidence_threshold
+        self.stats = {"local": 0, "escalated": 0, "saved_seconds": 0.0}
+        self._large_latency = None  # Moving average of large-model call latency
+
+    @property
+    def enabled(self) -> bool:
+        return self.local_client is not None
+
+    def record_large_latency(self, seconds: float) -> None:
+        """Track how long large-model calls take so savings can be estimated."""
+        if self._large_latency is None:
+            self._large_latency = seconds
+        else:
+            self._large_latency = 0.8 * self._large_latency + 0.2 * seconds
+
+    async def _ask(self, client: AsyncOpenAI, model: str, question: str, labels: List[str], context: str) -> Dict[str, Any]:
+        messages = [
+            {"role": "system", "content": CLASSIFIER_PROMPT},
+            {"role": "user", "content": f"Allowed labels: {', '.join(labels)}\n\nQuestion: {question}\n\nContext:\n{context}"}
+        ]
+        async with Timer("llm_call.router", model=model):
+            response = await client.chat.completions.create(
+                model=model,
+                messages=messages,
+                response_format={"type": "json_object"},
+                temperature=0
+            )
+        content = response.choices[0].message.content
+        call = "router.local" if client is self.local_client else "router.large"
+        record_usage(call, estimate_prompt_tokens(messages, model), usage_tokens(getattr(response, "usage", None)),
+                     count_tokens(content or "", model))
+        answer = json.loads(content)
+        label = str(answer.get("label", "")).strip()
+        if label not in labels:
+            raise ValueError(f"Unexpected label '{label}'")
+        return {
+            "label": label,
+            "confidence": float(answer.get("confidence", 0)),
+            "reason": str(answer.get("reason", ""))
+        }
+
+    async def classify(self, kind: str, question: str, labels: List[str], context: str, escalate: bool = True) -> Optional[Dict[str, Any]]:
+        """Classify with the local model, escalating to the large model when confidence is low.
+
+        With escalate=False a low-confidence answer returns None and the caller
+        falls back to its normal large-model path.
+        """
+        if self.local_client:
+            start = time.monotonic()
+            try:
+                answer = await self._ask(self.local_client, self.local_model, question, labels, context)
+                elapsed = time.monotonic() - start
+                if answer["confidence"] >= self.confidence_threshold:
+                    saved = (self._large_latency or 0.0) - elapsed
+                    self.stats["local"] += 1
+                    self.stats["saved_seconds"] += saved
+                    ROUTING_DECISIONS.inc(kind=kind, routed_to="local")
+                    ROUTING_SAVED_SECONDS.inc(max(saved, 0.0), kind=kind)
+                    print(f"[Router] {kind} -> local {self.local_model} (label={answer['label']}, "
+                          f"confidence={answer['confidence']:.2f}, {elapsed:.2f}s, saved ~{saved:.2f}s)")
+                    answer["routed_to"] = "local"
+                    return answer
+                print(f"[Router] {kind}: local confidence {answer['confidence']:.2f} below "
+                      f"{self.confidence_threshold:.2f} after {elapsed:.2f}s, escalating")
+            except Exception as e:
+                print(f"[Router] {kind}: local model unavailable ({e}), escalating")
+
+        self.stats["escalated"] += 1
+        ROUTING_DECISIONS.inc(kind=kind, routed_to="large" if escalate else "fallback")
+        if not escalate:
+            return None
+
+        start = time.monotonic()
+        try:
+            answer = await self._ask(self.large_client, self.large_model, question, labels, context)
+        except Exception as e:
+            print(f"[Router] {kind}: large model classification failed: {e}")
+            return None
+        elapsed = time.monotonic() - start
+        self.record_large_latency(elapsed)
+        print(f"[Router] {kind} -> large {self.large_model} (label={answer['label']}, "
+              f"confidence={answer['confidence']:.2f}, {elapsed:.2f}s)")
+        answer["routed_to"] = "large"
+        return answer
@@ -0,0 +1,91 @@
+import os
+import time
+import sqlite3
+import threading
+from typing import List, Dict, Any, Set
+from urllib.parse import urlparse
+from plan_cache import CACHE_DIR
+
+class SiteKnowledge:
+    """
+    Persistent per-domain record of which selectors worked in click_element and
+    send_keys_to_element. Known-good selectors are surfaced in later snapshots and
+    selectors that keep failing are dropped from them. Entries not used for
+    max_age_days expire, so a selector that failed before a site changed isn't
+    hidden forever.
+    """
+    def __init__(self, path: str = os.path.join(CACHE_DIR, "site_knowledge.db"), min_failures: int = 3,
+                 max_age_days: float = 30):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.min_failures = min_failures
+        self.max_age = max_age_days * 86400
+        # Writes run in worker threads, so the shared connection is used by one thread at a time
+        self._lock = threading.Lock()
+        # Several worker processes may share the file
+        self.conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS selectors (
+                domain TEXT NOT NULL,
+                selector TEXT NOT NULL,
+                successes INTEGER NOT NULL DEFAULT 0,
+                failures INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (domain, selector)
+            )
+        """)
+        self.conn.execute("DELETE FROM selectors WHERE last_used < ?", (self._cutoff(),))
+        self.conn.commit()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.max_age
+
+    @staticmethod
+    def domain_of(url: str) -> str:
+        """Return the host a URL belongs to, without a leading www."""
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith("www.") else host
+
+    def _record(self, domain: str, selector: str, success: bool) -> None:
+        if not domain or not selector:
+            return
+        try:
+            with self._lock:
+                # Counts of an entry that had expired start over
+                self.conn.execute(f"""
+                    INSERT INTO selectors (domain, selector, successes, failures, last_used)
+                    VALUES (?, ?, {int(success)}, {int(not success)}, ?)
+                    ON CONFLICT(domain, selector) DO UPDATE SET
+                        successes = CASE WHEN last_used < ? THEN 0 ELSE successes END + {int(success)},
+                        failures = CASE WHEN last_used < ? THEN 0 ELSE failures END + {int(not success)},
+                        last_used = excluded.last_used
+                """, (domain, selector, time.time(), self._cutoff(), self._cutoff()))
+                self.conn.commit()
+        except sqlite3.Error as e:
+            print(f"[SiteKnowledge] Could not record selector: {e}")
+
+    def record_success(self, domain: str, selector: str) -> None:
+        self._record(domain, selector, True)
+
+    def record_failure(self, domain: str, selector: str) -> None:
+        self._record(domain, selector, False)
+
+    def known_good(self, domain: str, limit: int = 15) -> List[Dict[str, Any]]:
+        """Selectors that have worked on this domain more often than they failed, most used first."""
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT selector, successes, failures FROM selectors
+                WHERE domain = ? AND successes > failures AND last_used >= ?
+                ORDER BY successes DESC, last_used DESC LIMIT ?
+            """, (domain, self._cutoff(), limit)).fetchall()
+        return [{"xpath_selector": r[0], "successes": r[1], "failures": r[2]} for r in rows]
+
+    def known_bad(self, domain: str) -> Set[str]:
+        """Selectors that keep failing on this domain."""
+        with self._lock:
+            rows = self.conn.execute("""
+                SELECT selector FROM selectors
+                WHERE domain = ? AND failures >= ? AND failures > 2 * successes AND last_used >= ?
+            """, (domain, self.min_failures, self._cutoff())).fetchall()
+        return {r[0] for r in rows}
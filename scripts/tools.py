@@ -31,6 +31,164 @@ functions = [
             },
         }
     },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_more_elements",
+            "description": "Get the next most relevant elements of the active page. Use when the page contents include more_available and the element you need is not listed.",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "required": [],
+                "optional": [],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "scroll_and_extract",
+            "description": "Scroll the active page one screen up or down and get only the elements that were not listed before. Use when the page contents include a viewport hint and the element you need is further down.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "direction": {
+                        "type": "string",
+                        "description": "Which way to scroll: 'down' or 'up'.",
+                        "example_value": "down"
+                    },
+                },
+                "required": ["direction"],
+                "optional": [],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "fetch_url_text",
+            "description": "Read the text and links of a page over plain HTTP without opening it in the browser. Much faster than move_to_url for reading articles, documentation and search results. Pages that need JavaScript or a login are opened in the browser instead.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The URL to read.",
+                        "example_value": "https://en.wikipedia.org/wiki/Web_browser"
+                    },
+                },
+                "required": ["url"],
+                "optional": [],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_urls",
+            "description": "Read several pages concurrently and get one digest with the part of each page most relevant to the question. Use it to go through search results or compare sources in a single step.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "urls": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "The URLs to read (up to 10).",
+                        "example_value": ["https://example.com/a", "https://example.com/b"]
+                    },
+                    "question": {
+                        "type": "string",
+                        "description": "What you are looking for on these pages.",
+                        "example_value": "What is the price of the basic plan?"
+                    },
+                },
+                "required": ["urls", "question"],
+                "optional": [],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "read_page",
+            "description": "Read the full main text of the active page one chunk at a time. Use it for long articles and documents; the page contents only list interactive elements.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "chunk": {
+                        "type": "integer",
+                        "description": "Which chunk to read, starting at 1.",
+                        "example_value": 1
+                    },
+                    "rank": {
+                        "type": "boolean",
+                        "description": "Order chunks by relevance to the current task, so chunk 1 is the most relevant.",
+                        "example_value": False
+                    },
+                },
+                "required": ["chunk"],
+                "optional": ["rank"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "query_network_json",
+            "description": "Query the JSON responses the active page loaded over XHR/fetch since the last navigation. Without json_path it lists the responses and their structure; with json_path it returns the matching values. Useful for reading search results, feeds and tables on web apps.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "url_pattern": {
+                        "type": "string",
+                        "description": "Part of the request URL to match, or a pattern with * wildcards. Empty matches every response.",
+                        "example_value": "/api/search"
+                    },
+                    "json_path": {
+                        "type": "string",
+                        "description": "JSONPath to select, supporting $, .key, ['key'], [n], [*], .* and ..key.",
+                        "example_value": "$.results[*].title"
+                    },
+                },
+                "required": [],
+                "optional": ["url_pattern", "json_path"],
+            },
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "extract_records",
+            "description": "Extract every repeated record on the active page (table rows, search results, product cards) in one call and return them as compact rows. Large results are saved to a file and summarized. Optionally follows pagination.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "container_selector": {
+                        "type": "string",
+                        "description": "CSS selector (or xpath starting with /) matching one element per record.",
+                        "example_value": "div.product-card"
+                    },
+                    "fields": {
+                        "type": "object",
+                        "description": "Field names mapped to CSS selectors relative to the record, optionally ending in @attribute. An empty selector is the record itself.",
+                        "example_value": {"title": "h2", "price": ".price", "link": "a@href"}
+                    },
+                    "follow_next": {
+                        "type": "boolean",
+                        "description": "Also extract from following pages, found through next links.",
+                        "example_value": False
+                    },
+                    "max_pages": {
+                        "type": "integer",
+                        "description": "Most pages to read when following pagination.",
+                        "example_value": 5
+                    },
+                },
+                "required": ["container_selector", "fields"],
+                "optional": ["follow_next", "max_pages"],
+            },
+        }
+    },
     {
         "type": "function",
         "function": {
@@ -0,0 +1,142 @@
+from typing import List, Dict, Any, Optional
+from playwright.async_api import Page
+import asyncio
+import json
+from .profiler import Timer, async_profile
+
+# Roles the model can act on, mapped to the snapshot category they are listed under
+INTERACTIVE_ROLES = {
+    "textbox": "inputs", "searchbox": "inputs", "combobox": "inputs", "checkbox": "inputs",
+    "radio": "inputs", "slider": "inputs", "spinbutton": "inputs", "switch": "inputs", "listbox": "inputs",
+    "button": "buttons", "menuitem": "buttons", "tab": "buttons", "menuitemcheckbox": "buttons",
+    "link": "links",
+    "heading": "headings",
+}
+
+# Regions used to label which part of the page an element is in
+LANDMARK_ROLES = {"banner", "navigation", "main", "contentinfo", "complementary", "search", "form", "region", "dialog", "alertdialog"}
+
+# Form controls are labelled by their accessible name, which isn't their text content
+FORM_CONTROL_TAGS = {"input", "textarea", "select"}
+
+DOM_ATTRIBUTES = ("id", "name", "type", "href", "placeholder", "value", "aria-label", "role", "title")
+
+# Upper bound on nodes resolved to DOM elements, the same element budget get_page_elements uses.
+# Each one is a DOM.describeNode round trip, so large pages are cut before resolving, not after
+MAX_CANDIDATES = 400
+
+def _ax_value(node: Dict[str, Any], key: str) -> str:
+    value = node.get(key) or {}
+    return str(value.get("value", "")) if isinstance(value, dict) else ""
+
+def _section_of(node_id: str, nodes: Dict[str, Dict[str, Any]], cache: Dict[str, Optional[str]]) -> Optional[str]:
+    """Nearest landmark ancestor as 'role: name' (or just the role when unnamed)."""
+    path = []
+    current = nodes.get(node_id, {}).get("parentId")
+    section = None
+    while current is not None:
+        if current in cache:
+            section = cache[current]
+            break
+        path.append(current)
+        parent = nodes.get(current)
+        if parent is None:
+            break
+        role = _ax_value(parent, "role")
+        if role in LANDMARK_ROLES:
+            name = _ax_value(parent, "name")
+            section = f"{role}: {name}" if name else role
+            break
+        current = parent.get("parentId")
+    for visited in path:
+        cache[visited] = section
+    return section
+
+async def _describe(client, backend_node_id: int) -> Dict[str, Any]:
+    try:
+        described = await client.send("DOM.describeNode", {"backendNodeId": backend_node_id})
+        node = described.get("node", {})
+        attributes = node.get("attributes", [])
+        return {
+            "tag": node.get("localName", ""),
+            "attributes": dict(zip(attributes[::2], attributes[1::2])),
+        }
+    except Exception:
+        return {"tag": "", "attributes": {}}
+
+@async_profile
+async def get_ax_elements(page: Page) -> str:
+    """
+    Extract interactive elements from Chromium's accessibility tree over CDP.
+    Returns the same structure as get_page_elements, with a section attribute
+    naming the landmark each element belongs to.
+    """
+    async with Timer("Total get_ax_elements time"):
+        client = await page.context.new_cdp_session(page)
+        try:
+            async with Timer("AX tree fetch"):
+                await client.send("Accessibility.enable")
+                tree = await client.send("Accessibility.getFullAXTree")
+
+            async with Timer("AX tree prune"):
+                nodes = {node["nodeId"]: node for node in tree.get("nodes", [])}
+                section_cache: Dict[str, Optional[str]] = {}
+                candidates = []
+                for node in nodes.values():
+                    if node.get("ignored") or "backendDOMNodeId" not in node:
+                        continue
+                    role = _ax_value(node, "role")
+                    category = INTERACTIVE_ROLES.get(role)
+                    if category is None:
+                        continue
+                    properties = {p["name"]: p.get("value", {}).get("value") for p in node.get("properties", [])}
+                    if properties.get("hidden") or properties.get("disabled"):
+                        continue
+                    candidates.append((node, role, category, properties))
+                    if len(candidates) >= MAX_CANDIDATES:
+                        break
+
+            async with Timer("AX describe nodes"):
+                # Tag and attributes are needed to build selectors the action tools can use
+                described = await asyncio.gather(*[_describe(client, node["backendDOMNodeId"]) for node, _, _, _ in candidates])
+        finally:
+            try:
+                await client.detach()
+            except Exception:
+                pass
+
+        async with Timer("AX group elements"):
+            grouped: Dict[str, List[Dict[str, Any]]] = {}
+            for (node, role, category, properties), dom in zip(candidates, described):
+                tag = dom["tag"] or role
+                attributes = dom["attributes"]
+                name = _ax_value(node, "name")[:100]
+                element = {"tag": tag}
+                for attr in DOM_ATTRIBUTES:
+                    if attributes.get(attr):
+                        element["ariaLabel" if attr == "aria-label" else attr] = attributes[attr][:200]
+                if "role" not in element and tag not in ("a", "button", "input", "textarea", "select"):
+                    element["role"] = role
+                if name:
+                    element["label" if tag in FORM_CONTROL_TAGS else "text"] = name
+                if _ax_value(node, "value") and tag in FORM_CONTROL_TAGS:
+                    element["value"] = _ax_value(node, "value")[:100]
+                if properties.get("checked") in ("true", True):
+                    element["checked"] = True
+                if role == "heading" and properties.get("level"):
+                    element["level"] = properties["level"]
+                section = _section_of(node["nodeId"], nodes, section_cache)
+                if section:
+                    element["section"] = section
+                if not any(element.get(k) for k in ("text", "label", "value", "placeholder", "ariaLabel", "id", "name")):
+                    continue
+                grouped.setdefault(category, []).append(element)
+
+            total = sum(len(elements) for elements in grouped.values())
+            summary = {
+                "total_elements": total,
+                "elements_by_type": {category: len(elements) for category, elements in grouped.items()},
+                "elements": grouped,
+                "backend": "accessibility",
+            }
+            return json.dumps(summary, indent=2)
@@ -0,0 +1,194 @@
+// Page-side helpers for Auto Browser. web/bundle.py registers this function as an init
+// script for the browser context (and runs it in pages that are already open), after which
+// calls are a small window.__autobrowser.<name>(arg) instead of the whole source each time.
+// VERSION is filled in with a hash of this file so a stale copy in a long-lived page is replaced.
+() => {
+    const VERSION = '__BUNDLE_VERSION__';
+    if (window.__autobrowser && window.__autobrowser.version === VERSION) return;
+
+    // Matching elements of this document and its open shadow roots, described for the
+    // snapshot. Shadow DOM elements get a CSS path (Playwright's css engine pierces open
+    // shadow roots). Text comes from text nodes rather than innerText, so reading it needs
+    // no layout, and each text node is attributed to one element only: the innermost matched
+    // element that can be acted on (a link, button, label...), otherwise the innermost
+    // matched element. Containers whose text all belongs to matched descendants end up with
+    // none and are dropped as redundant. Elements are filtered here (hidden, empty, ignored links)
+    // and the walk stops once limit is used up, with repeats of a structure past the third
+    // counting repeatedWeight, so large pages don't compute styles for and serialize thousands
+    // of elements that would be dropped anyway.
+    const collectElements = ({selector, margin, limit = null, repeatedWeight = 1, ignoredHrefs = []}) => {
+        const results = [];
+        const viewportHeight = window.innerHeight || 1;
+        const cssFor = (element) => {
+            const tag = element.tagName.toLowerCase();
+            if (element.id) return `${tag}#${CSS.escape(element.id)}`;
+            for (const attr of ['name', 'aria-label', 'placeholder', 'type', 'href']) {
+                const value = element.getAttribute(attr);
+                if (value) return `${tag}[${attr}="${CSS.escape(value)}"]`;
+            }
+            let index = 1;
+            for (let sibling = element.previousElementSibling; sibling; sibling = sibling.previousElementSibling) {
+                if (sibling.tagName === element.tagName) index++;
+            }
+            return `${tag}:nth-of-type(${index})`;
+        };
+        // tag.class.class of an element; parent > element signatures group repeated siblings
+        const shapeOf = (element) => element
+            ? element.tagName.toLowerCase() + Array.from(element.classList).sort().map(c => '.' + c).join('').substring(0, 80)
+            : '';
+
+        const candidates = [];
+        const roots = [];
+        const collect = (root, hostPath) => {
+            roots.push(root);
+            for (const element of root.querySelectorAll(selector)) {
+                candidates.push({element, css: hostPath ? `${hostPath} ${cssFor(element)}` : null});
+            }
+            for (const host of root.querySelectorAll('*')) {
+                if (host.shadowRoot) {
+                    collect(host.shadowRoot, hostPath ? `${hostPath} ${cssFor(host)}` : cssFor(host));
+                }
+            }
+        };
+        collect(document, null);
+        const matched = new Set(candidates.map(c => c.element));
+
+        const ACTIONABLE_TAGS = new Set(['a', 'button', 'label', 'select', 'textarea', 'summary', 'option']);
+        const ACTIONABLE_ROLES = new Set(['button', 'link', 'menuitem', 'tab', 'checkbox', 'radio', 'option', 'switch']);
+        const actionable = (element) => ACTIONABLE_TAGS.has(element.tagName.toLowerCase())
+            || ACTIONABLE_ROLES.has(element.getAttribute('role')) || element.hasAttribute('onclick');
+        // Nearest matched and nearest actionable matched ancestor of each element, memoized
+        const owners = new Map();
+        const ownerOf = (start) => {
+            const path = [];
+            let element = start;
+            let info = {matched: null, actionable: null};
+            while (element) {
+                if (owners.has(element)) {
+                    info = owners.get(element);
+                    break;
+                }
+                path.push(element);
+                element = element.parentElement;
+            }
+            for (let i = path.length - 1; i >= 0; i--) {
+                const node = path[i];
+                if (matched.has(node)) {
+                    info = {matched: node, actionable: actionable(node) ? node : info.actionable};
+                }
+                owners.set(node, info);
+            }
+            return info.actionable || info.matched;
+        };
+        const SKIPPED_PARENTS = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE']);
+        // Each element keeps only its first run of consecutive owned text nodes (skipping a
+        // whitespace-only start), so its text is always a contiguous substring of the element
+        // for XPath matching, however long it is
+        const texts = new Map();
+        let position = 0;
+        for (const root of roots) {
+            const walker = document.createTreeWalker(root, NodeFilter.SHOW_TEXT);
+            for (let node = walker.nextNode(); node; node = walker.nextNode()) {
+                position++;
+                const parent = node.parentElement;
+                if (!parent || SKIPPED_PARENTS.has(parent.tagName)) continue;
+                const owner = ownerOf(parent);
+                if (!owner) continue;
+                let text = texts.get(owner);
+                if (!text) texts.set(owner, text = {run: '', last: position - 1, closed: false});
+                const contiguous = text.last === position - 1;
+                if (!contiguous && text.run.trim()) text.closed = true;
+                if (!text.closed && text.run.length < 400) text.run = (contiguous ? text.run : '') + node.data;
+                text.last = position;
+            }
+        }
+        const normalize = (value) => value.replace(/\s+/g, ' ').trim();
+        const textOf = (element) => {
+            const text = texts.get(element);
+            return text ? normalize(text.run).substring(0, 100) : '';
+        };
+
+        const groupCounts = new Map();
+        let used = 0;
+        for (const {element, css} of candidates) {
+            if (limit !== null && used >= limit) break;
+            // No style or layout writes happen in this loop, so layout is flushed at most once
+            const rect = element.getBoundingClientRect();
+            if (margin !== null && (rect.bottom < -margin * viewportHeight || rect.top > (1 + margin) * viewportHeight)) {
+                continue;
+            }
+            if (rect.width <= 0 || rect.height <= 0) continue;
+            const computedStyle = window.getComputedStyle(element);
+            if (computedStyle.display === 'none' || computedStyle.visibility === 'hidden') continue;
+
+            const text = textOf(element);
+            if (!text && !element.value && !element.placeholder && !element.getAttribute('aria-label')) continue;
+            const tag = element.tagName.toLowerCase();
+            const href = element.getAttribute('href');
+            if (tag === 'a' && (!href || ignoredHrefs.some(ignored => href.includes(ignored)))) continue;
+
+            const group = shapeOf(element.parentElement) + '>' + shapeOf(element);
+            const count = (groupCounts.get(group) || 0) + 1;
+            groupCounts.set(group, count);
+            used += count > 3 ? repeatedWeight : 1;
+            results.push({
+                tag,
+                type: element.type || undefined,
+                id: element.id || undefined,
+                name: element.name || undefined,
+                value: element.value || undefined,
+                href: href || undefined,
+                src: element.src || undefined,
+                placeholder: element.placeholder || undefined,
+                ariaLabel: element.getAttribute('aria-label') || undefined,
+                ariaDescribedby: element.getAttribute('aria-describedby') || undefined,
+                role: element.getAttribute('role') || undefined,
+                title: element.title || undefined,
+                text,
+                isVisible: true,
+                viewportY: Math.round(rect.top / viewportHeight * 100) / 100,
+                pageY: Math.round(rect.top + window.scrollY),
+                disabled: element.disabled || false,
+                checked: element.checked || undefined,
+                selected: element.selected || undefined,
+                multiple: element.multiple || undefined,
+                css: css || undefined,
+                group
+            });
+        }
+        return results;
+    };
+
+    // Match counts of XPath selectors in this document.
+    const checkSelectors = (selectors) => selectors.map(selector => {
+        try {
+            const elements = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            return {
+                found: elements.snapshotLength > 0,
+                count: elements.snapshotLength
+            };
+        } catch (e) {
+            return { found: false, error: e.toString() };
+        }
+    });
+
+    // Draws a border around a box (viewport coordinates) for duration ms.
+    const highlight = ({box, color, duration}) => {
+        const div = document.createElement('div');
+        div.style.cssText = `position:absolute;z-index:9999;border:4px solid ${color};pointer-events:none;`;
+        div.style.left = `${box.x + window.scrollX}px`;
+        div.style.top = `${box.y + window.scrollY}px`;
+        div.style.width = `${box.width}px`;
+        div.style.height = `${box.height}px`;
+        (document.body || document.documentElement).appendChild(div);
+        setTimeout(() => div.parentNode?.removeChild(div), duration);
+        return true;
+    };
+
+    Object.defineProperty(window, '__autobrowser', {
+        value: Object.freeze({version: VERSION, collectElements, checkSelectors, highlight}),
+        configurable: true,
+        enumerable: false,
+        writable: false
+    });
+}
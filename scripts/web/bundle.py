@@ -0,0 +1,46 @@
+import os
+import hashlib
+import asyncio
+from typing import Any, Union
+from playwright.async_api import Page, Frame, BrowserContext
+from .profiler import metrics
+
+BUNDLE_INJECTIONS = metrics.counter("autobrowser_bundle_injections_total", "Bundle evaluations in pages that didn't have it, by reason")
+
+_BUNDLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bundle.js")
+
+with open(_BUNDLE_PATH, "r", encoding="utf-8") as f:
+    _raw = f.read()
+
+BUNDLE_VERSION = hashlib.sha1(_raw.encode("utf-8")).hexdigest()[:12]
+# A function that defines window.__autobrowser when called
+BUNDLE_SOURCE = _raw.replace("__BUNDLE_VERSION__", BUNDLE_VERSION).strip()
+
+# Calls one bundle function; reports a missing or stale bundle instead of failing
+CALL_JS = """
+([name, version, arg]) => {
+    const bundle = window.__autobrowser;
+    if (!bundle || bundle.version !== version) return {missing: bundle ? 'stale' : 'absent'};
+    return {value: bundle[name](arg)};
+}
+"""
+
+async def install_bundle(context: BrowserContext) -> None:
+    """Register the bundle for every new document in context and add it to the pages already open."""
+    await context.add_init_script(script=f"({BUNDLE_SOURCE})();")
+    frames = [frame for page in context.pages for frame in page.frames if not frame.is_detached()]
+    await asyncio.gather(*[frame.evaluate(BUNDLE_SOURCE) for frame in frames], return_exceptions=True)
+
+async def call_bundle(target: Union[Page, Frame], name: str, arg: Any = None) -> Any:
+    """
+    Call window.__autobrowser.<name>(arg) in a page or frame. Documents created before
+    the bundle was installed (or holding an older version) get it injected once.
+    """
+    result = await target.evaluate(CALL_JS, [name, BUNDLE_VERSION, arg])
+    if "missing" in result:
+        BUNDLE_INJECTIONS.inc(reason=result["missing"])
+        await target.evaluate(BUNDLE_SOURCE)
+        result = await target.evaluate(CALL_JS, [name, BUNDLE_VERSION, arg])
+        if "missing" in result:
+            raise RuntimeError(f"Could not install the page bundle ({result['missing']})")
+    return result.get("value")
@@ -0,0 +1,227 @@
+import re
+import json
+import time
+import asyncio
+import fnmatch
+from collections import deque
+from typing import Dict, Any, List, Deque
+from playwright.async_api import Page, Response
+from .profiler import metrics
+
+CAPTURED_RESPONSES = metrics.counter("autobrowser_captured_json_total", "XHR/fetch JSON responses captured from the page, by outcome")
+
+MAX_BODY_BYTES = 2 * 1024 * 1024
+# Bodies larger than this are parsed in a worker thread so the event loop keeps running
+THREAD_PARSE_BYTES = 64 * 1024
+RESULT_MAX_CHARS = 6000
+
+class NetworkCapture:
+    """
+    Records JSON responses to the page's XHR/fetch requests. Each main-frame
+    navigation starts a new buffer holding its last max_responses responses, and
+    only the last max_navigations buffers are kept.
+    """
+    def __init__(self, max_responses: int = 50, max_navigations: int = 3, max_body_bytes: int = MAX_BODY_BYTES):
+        self.max_responses = max_responses
+        self.max_body_bytes = max_body_bytes
+        self.navigations: Deque[Dict[str, Any]] = deque(maxlen=max_navigations)
+        self._pending = set()
+        self._page = None
+
+    def attach(self, page: Page) -> None:
+        self._page = page
+        self._new_navigation(page.url)
+        page.on("framenavigated", self._on_navigated)
+        page.on("response", self._on_response)
+
+    def _new_navigation(self, url: str) -> None:
+        self.navigations.append({"url": url, "started": time.time(), "responses": deque(maxlen=self.max_responses)})
+
+    def _on_navigated(self, frame) -> None:
+        if self._page is not None and frame == self._page.main_frame:
+            # Same-document navigations (SPA route changes) keep their buffer
+            if frame.url.split("#")[0] != self.navigations[-1]["url"].split("#")[0]:
+                self._new_navigation(frame.url)
+
+    def _on_response(self, response: Response) -> None:
+        request = response.request
+        if request.resource_type not in ("xhr", "fetch"):
+            return
+        content_type = response.headers.get("content-type", "")
+        if "json" not in content_type:
+            return
+        # Bodies can only be read asynchronously; keep a reference so the task isn't collected
+        task = asyncio.ensure_future(self._record(response, self.navigations[-1]))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    async def _record(self, response: Response, navigation: Dict[str, Any]) -> None:
+        try:
+            length = int(response.headers.get("content-length") or 0)
+            if length > self.max_body_bytes:
+                CAPTURED_RESPONSES.inc(outcome="too_large")
+                return
+            body = await response.body()
+            if len(body) > self.max_body_bytes:
+                CAPTURED_RESPONSES.inc(outcome="too_large")
+                return
+            data = await asyncio.to_thread(json.loads, body) if len(body) > THREAD_PARSE_BYTES else json.loads(body)
+        except Exception:
+            # Redirects, aborted requests and malformed JSON have no usable body
+            CAPTURED_RESPONSES.inc(outcome="unreadable")
+            return
+        navigation["responses"].append({
+            "url": response.url,
+            "method": response.request.method,
+            "status": response.status,
+            "size": len(body),
+            "data": data,
+        })
+        CAPTURED_RESPONSES.inc(outcome="captured")
+
+    async def settle(self, timeout: float = 2.0) -> None:
+        """Wait for bodies that are still being read."""
+        if self._pending:
+            await asyncio.wait(list(self._pending), timeout=timeout)
+
+    def responses(self, url_pattern: str = "", all_navigations: bool = False) -> List[Dict[str, Any]]:
+        """Captured responses whose URL contains url_pattern (or matches it, when it has wildcards), newest first."""
+        navigations = list(self.navigations) if all_navigations else list(self.navigations)[-1:]
+        matched = []
+        for navigation in reversed(navigations):
+            for entry in reversed(navigation["responses"]):
+                url = entry["url"]
+                if not url_pattern or (fnmatch.fnmatch(url, url_pattern) if "*" in url_pattern else url_pattern in url):
+                    matched.append(entry)
+        return matched
+
+def _shape(value: Any, depth: int = 0) -> Any:
+    """Short structural summary of a JSON value: keys of objects, length and item shape of arrays."""
+    if isinstance(value, dict):
+        if depth >= 3:
+            return "{...}"
+        return {key: _shape(item, depth + 1) for key, item in list(value.items())[:15]}
+    if isinstance(value, list):
+        return [f"{len(value)} items", _shape(value[0], depth + 1)] if value else []
+    return type(value).__name__
+
+_PATH_TOKEN = re.compile(r"\.\.(\w+|\*)|\.(\w+|\*)|\[(\d+|\*|'[^']*'|\"[^\"]*\")\]")
+
+def json_path(data: Any, path: str) -> List[Any]:
+    """
+    Evaluate a JSONPath subset: $, .key, ['key'], [n], [*], .* and ..key (recursive
+    descent). Returns all matches.
+    """
+    path = (path or "$").strip()
+    if path.startswith("$"):
+        path = path[1:]
+    matches = [data]
+    position = 0
+    while position < len(path):
+        token = _PATH_TOKEN.match(path, position)
+        if token is None:
+            raise ValueError(f"Unsupported JSONPath at '{path[position:]}'")
+        position = token.end()
+        recursive, key, index = token.groups()
+        selected = []
+        if recursive is not None:
+            for match in matches:
+                selected.extend(_descend(match, recursive))
+        else:
+            selector = key if key is not None else index.strip("'\"")
+            for match in matches:
+                selected.extend(_select(match, selector, quoted=index is not None and index[:1] in "'\""))
+        matches = selected
+    return matches
+
+def _select(value: Any, selector: str, quoted: bool = False) -> List[Any]:
+    if selector == "*" and not quoted:
+        if isinstance(value, dict):
+            return list(value.values())
+        return list(value) if isinstance(value, list) else []
+    if isinstance(value, list) and selector.isdigit() and not quoted:
+        index = int(selector)
+        return [value[index]] if index < len(value) else []
+    if isinstance(value, dict) and selector in value:
+        return [value[selector]]
+    return []
+
+def _descend(value: Any, key: str) -> List[Any]:
+    found = []
+    queue = deque([value])
+    while queue:
+        current = queue.popleft()
+        if isinstance(current, dict):
+            if key == "*":
+                found.extend(current.values())
+            elif key in current:
+                found.append(current[key])
+            queue.extend(current.values())
+        elif isinstance(current, list):
+            if key == "*":
+                found.extend(current)
+            queue.extend(current)
+    return found
+
+def query_responses(capture: NetworkCapture, url_pattern: str = "", path: str = "", max_chars: int = RESULT_MAX_CHARS) -> str:
+    """
+    Without path, list the captured responses with their structure so the model
+    can pick one. With path, return the matching values from every matching response.
+    """
+    responses = capture.responses(url_pattern)
+    if not responses:
+        responses = capture.responses(url_pattern, all_navigations=True)
+    if not responses:
+        return "No JSON responses captured" + (f" matching '{url_pattern}'" if url_pattern else "") + " for this page."
+
+    if not path:
+        listing = [
+            {"url": entry["url"], "method": entry["method"], "status": entry["status"], "size": entry["size"], "shape": _shape(entry["data"])}
+            for entry in responses[:10]
+        ]
+
+        def build_listing(count: int) -> str:
+            payload = {"responses": listing[:count], "total": len(responses)}
+            if count < len(listing):
+                payload["truncated"] = True
+            return json.dumps(payload, indent=1)
+
+        return _fit(build_listing, len(listing), max_chars)
+
+    # One (url, match) pair per match so a long result is cut between values, never inside one
+    pairs = [(entry["url"], match) for entry in responses for match in json_path(entry["data"], path)]
+    if not pairs:
+        return f"JSONPath {path} matched nothing in {len(responses)} response(s)."
+
+    def build_results(count: int) -> str:
+        results = []
+        for url, match in pairs[:count]:
+            if not results or results[-1]["url"] != url:
+                results.append({"url": url, "matches": []})
+            results[-1]["matches"].append(match)
+        if count == len(pairs):
+            return json.dumps(results, separators=(",", ":"), ensure_ascii=False)
+        payload = {"results": results, "truncated": True, "total_matches": len(pairs), "hint": "narrow the path or URL pattern"}
+        if not results:
+            # Not even one value fits; describe the first instead
+            payload["first_match_shape"] = _shape(pairs[0][1])
+        return json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+
+    return _fit(build_results, len(pairs), max_chars)
+
+def _fit(build, count: int, max_chars: int) -> str:
+    """
+    build(n) serializes the first n items. Return the largest one that fits in
+    max_chars, so truncated output is still valid JSON.
+    """
+    text = build(count)
+    if len(text) <= max_chars:
+        return text
+    low, high = 0, count - 1
+    while low < high:
+        middle = (low + high + 1) // 2
+        if len(build(middle)) <= max_chars:
+            low = middle
+        else:
+            high = middle - 1
+    return build(low)
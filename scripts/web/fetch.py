@@ -0,0 +1,242 @@
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+from typing import Dict, Any, List, Optional
+import httpx
+from .profiler import Timer, metrics
+
+FETCHES = metrics.counter("autobrowser_http_fetch_total", "Browserless page fetches by outcome (text, browser_fallback, error)")
+
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
+
+FETCH_MAX_CHARS = 6000
+FETCH_MAX_LINKS = 25
+# Bytes of a response body read at most; larger pages are cut, larger declared downloads skipped
+FETCH_MAX_BYTES = 5 * 1024 * 1024
+
+# Skipped with everything inside them
+SKIPPED_TAGS = {"script", "style", "noscript", "template", "svg", "iframe", "head", "nav", "footer", "aside", "form", "button", "select"}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+BLOCK_TAGS = {"p", "li", "h1", "h2", "h3", "h4", "h5", "h6", "pre", "blockquote", "td", "th", "dd", "dt", "figcaption", "div", "section", "article", "main"}
+MAIN_TAGS = {"main", "article"}
+
+# Empty mount points of client-rendered apps
+_APP_ROOT = re.compile(r"<div[^>]+id=[\"'](?:root|app|__next|__nuxt|svelte)[\"'][^>]*>\s*</div>", re.IGNORECASE)
+_NEEDS_JS = re.compile(r"(enable|requires?) javascript|javascript (is )?(required|disabled)", re.IGNORECASE)
+
+_client: Optional[httpx.AsyncClient] = None
+
+def get_client() -> httpx.AsyncClient:
+    """Shared client, so connections to the same hosts are pooled and kept alive between fetches."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            follow_redirects=True,
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            headers={
+                "User-Agent": USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml;q=0.9,text/plain;q=0.8,*/*;q=0.5",
+                "Accept-Language": "en-US,en;q=0.9",
+            },
+        )
+    return _client
+
+async def close_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+class _ReadableParser(HTMLParser):
+    """Collects text blocks, links and a few page signals in one pass over the HTML."""
+    def __init__(self, base_url: str):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self.title = ""
+        self.blocks: List[Dict[str, Any]] = []
+        self.links: List[Dict[str, str]] = []
+        self.password_inputs = 0
+        self._stack: List[str] = []
+        self._skip_depth = 0
+        self._main_depth = 0
+        self._in_title = False
+        self._text: List[str] = []
+        self._link_chars = 0
+        self._link: Optional[Dict[str, Any]] = None
+
+    def _flush(self):
+        text = re.sub(r"\s+", " ", "".join(self._text)).strip()
+        if text:
+            tag = next((t for t in reversed(self._stack) if t in BLOCK_TAGS), "")
+            self.blocks.append({"text": text, "tag": tag, "main": self._main_depth > 0, "link_chars": self._link_chars})
+        self._text = []
+        self._link_chars = 0
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "input" and (attrs.get("type") or "").lower() == "password":
+            self.password_inputs += 1
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._text.append(" ")
+            return
+        if tag == "title":
+            self._in_title = True
+        if self._skip_depth or tag in SKIPPED_TAGS:
+            self._skip_depth += 1
+            self._stack.append(tag)
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS or attrs.get("role") == "main":
+            self._main_depth += 1
+        if tag == "a" and attrs.get("href") and not attrs["href"].startswith(("#", "javascript:", "mailto:")):
+            self._link = {"href": urljoin(self.base_url, attrs["href"]), "text": []}
+        self._stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag in VOID_TAGS or tag not in self._stack:
+            return
+        # Close anything left open inside tag, as browsers do
+        while self._stack:
+            open_tag = self._stack.pop()
+            if self._skip_depth:
+                self._skip_depth -= 1
+                if open_tag == tag:
+                    return
+                continue
+            if open_tag in MAIN_TAGS and self._main_depth:
+                self._main_depth -= 1
+            if open_tag == "a" and self._link is not None:
+                text = re.sub(r"\s+", " ", "".join(self._link["text"])).strip()
+                if text:
+                    self.links.append({"text": text[:100], "href": self._link["href"]})
+                self._link = None
+            if open_tag in BLOCK_TAGS:
+                self._flush()
+            if open_tag == tag:
+                return
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        self._text.append(data)
+        if self._link is not None:
+            self._link["text"].append(data)
+            self._link_chars += len(data.strip())
+
+    def close(self):
+        super().close()
+        self._flush()
+
+def extract_readable(html: str, url: str = "", max_chars: int = FETCH_MAX_CHARS) -> Dict[str, Any]:
+    """
+    Readability-style text of an HTML page: text blocks from <main>/<article> when
+    present, without navigation and link lists, plus the page's links. needs_browser
+    says why the text isn't usable without rendering (client-side app or login), if so.
+    """
+    parser = _ReadableParser(url)
+    parser.feed(html)
+    parser.close()
+
+    blocks = parser.blocks
+    if any(block["main"] for block in blocks):
+        blocks = [block for block in blocks if block["main"]]
+    # Drop menus and link lists: blocks that are mostly link text, unless they're headings
+    content = [
+        block for block in blocks
+        if block["tag"].startswith("h") or block["link_chars"] < 0.6 * len(block["text"])
+    ]
+    text = "\n\n".join(block["text"] for block in content)
+
+    needs_browser = None
+    if parser.password_inputs:
+        needs_browser = "login form"
+    elif len(text) < 200 and (_APP_ROOT.search(html) or _NEEDS_JS.search(html)):
+        needs_browser = "page is rendered with JavaScript"
+    elif not text:
+        needs_browser = "no readable text"
+
+    return {
+        "url": url,
+        "title": re.sub(r"\s+", " ", parser.title).strip(),
+        "text": text[:max_chars],
+        "truncated": len(text) > max_chars,
+        "links": parser.links,
+        "needs_browser": needs_browser,
+    }
+
+async def _read_capped(response: httpx.Response, max_bytes: int) -> str:
+    """Read at most max_bytes of a streamed body and decode it."""
+    body = bytearray()
+    async for chunk in response.aiter_bytes():
+        body.extend(chunk)
+        if len(body) >= max_bytes:
+            break
+    return bytes(body[:max_bytes]).decode(response.encoding or "utf-8", errors="replace")
+
+async def fetch_url_text(url: str, max_chars: int = FETCH_MAX_CHARS) -> Dict[str, Any]:
+    """Fetch a page over plain HTTP and extract its readable text without the browser."""
+    async with Timer("http_fetch"):
+        try:
+            # Streamed, so PDFs, videos and other large downloads are turned away on their headers
+            async with get_client().stream("GET", url) as response:
+                result = {"url": str(response.url), "status": response.status_code}
+                content_type = response.headers.get("content-type", "")
+                try:
+                    length = int(response.headers.get("content-length") or 0)
+                except ValueError:
+                    length = 0
+                textual = "html" in content_type or not content_type or content_type.startswith("text/") or "json" in content_type
+                if response.status_code in (401, 403):
+                    result["needs_browser"] = "access denied without a browser session"
+                elif response.status_code >= 400:
+                    result["needs_browser"] = f"HTTP {response.status_code}"
+                elif not textual:
+                    result["needs_browser"] = f"unsupported content type {content_type.split(';')[0]}"
+                elif length > FETCH_MAX_BYTES:
+                    result["needs_browser"] = f"response too large ({length} bytes)"
+                elif "html" in content_type or not content_type:
+                    html = await _read_capped(response, FETCH_MAX_BYTES)
+                    async with Timer("readable_extract"):
+                        result.update(extract_readable(html, str(response.url), max_chars))
+                        result["status"] = response.status_code
+                else:
+                    text = await _read_capped(response, FETCH_MAX_BYTES)
+                    result.update({"title": "", "text": text[:max_chars], "truncated": len(text) > max_chars, "links": [], "needs_browser": None})
+        except httpx.HTTPError as e:
+            FETCHES.inc(outcome="error")
+            return {"url": url, "error": f"{type(e).__name__}: {e}", "needs_browser": "request failed"}
+
+        FETCHES.inc(outcome="browser_fallback" if result.get("needs_browser") else "text")
+        return result
+
+def format_fetch_result(result: Dict[str, Any], max_links: int = FETCH_MAX_LINKS) -> str:
+    """Compact plain-text rendering of a fetch_url_text result for the model."""
+    lines = [f"URL: {result['url']}"]
+    if result.get("title"):
+        lines.append(f"Title: {result['title']}")
+    lines.append("")
+    lines.append(result.get("text", ""))
+    if result.get("truncated"):
+        lines.append("[text truncated]")
+    links = result.get("links") or []
+    if links:
+        lines.append("")
+        lines.append("Links:")
+        seen = set()
+        for link in links:
+            if link["href"] in seen:
+                continue
+            seen.add(link["href"])
+            lines.append(f"- {link['text']}: {link['href']}")
+            if len(seen) >= max_links:
+                break
+    return "\n".join(lines)
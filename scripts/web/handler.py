@@ -1,54 +1,96 @@
 import json
+import re
 from playwright.async_api import Page, Locator
 from typing import Dict, Any, List
 import time
 from .profiler import Timer, async_profile
+from .log_writer import log_writer
+from .repeated import collapse_repeated
+from .bundle import call_bundle
 import asyncio
 
+SUPPORTED_XPATH_ATTRIBUTES = ["type", "placeholder", "role", "text", "id", "name", "href", "value"]
+
+def escape_xpath_string(value: str) -> str:
+    """
+    Escapes a string for use in XPath by using concat() for single quotes.
+    """
+    if "'" in value:
+        parts = value.split("'")
+        return "concat(" + ", ".join(f"'{part}'" for part in parts if part) + ", \"'\")"
+    return f"'{value}'"
+
+def build_xpath(elem: Dict[str, Any]) -> str:
+    """
+    Build an XPath for an extracted element.
+    Priority is given to id, href, ariaLabel, and text. Falls back to combining all attributes if needed.
+    """
+    base_xpath = f"//{elem.get('tag', 'div')}"
+
+    if 'id' in elem and elem['id']:
+        base_xpath += f"[@id={escape_xpath_string(elem['id'])}]"
+    elif 'href' in elem and elem['href'] and elem.get('tag') == 'a':
+        base_xpath += f"[@href={escape_xpath_string(elem['href'])}]"
+    elif 'ariaLabel' in elem and elem['ariaLabel']:
+        base_xpath += f"[@aria-label={escape_xpath_string(elem['ariaLabel'])}]"
+    elif 'text' in elem and elem['text']:
+        # Extracted text is whitespace-normalized, so match it against the normalized string value
+        text = " ".join(elem['text'].split())
+        base_xpath += f"[contains(normalize-space(.), {escape_xpath_string(text)})]"
+    else:
+        conditions = [
+            f"@{attr}={escape_xpath_string(value)}" if attr != "text" else f"contains(normalize-space(.), {escape_xpath_string(' '.join(value.split()))})"
+            for attr, value in elem.items()
+            if attr in SUPPORTED_XPATH_ATTRIBUTES and value
+        ]
+        if conditions:
+            base_xpath += f"[{' and '.join(conditions)}]"
+    return base_xpath
+
+# Elements outside the main document carry qualified handles instead of plain XPaths:
+# "frame[N]::<xpath>" for page.frames[N] and "css::<selector>" for open shadow DOM
+FRAME_HANDLE = re.compile(r"^frame\[(\d+)\]::(.*)$", re.S)
+CSS_PREFIX = "css::"
+
+def build_selector(elem: Dict[str, Any]) -> str:
+    """XPath for a main-document element, or a frame/shadow-qualified handle."""
+    selector = f"{CSS_PREFIX}{elem['css']}" if elem.get('css') else build_xpath(elem)
+    if elem.get('frame'):
+        selector = f"frame[{elem['frame']}]::{selector}"
+    return selector
+
+def is_qualified_handle(selector: str) -> bool:
+    return selector.startswith(CSS_PREFIX) or FRAME_HANDLE.match(selector) is not None
+
+def resolve_selector(page: Page, selector: str):
+    """Map a selector or qualified handle to the frame it lives in and a Playwright selector."""
+    root = page
+    match = FRAME_HANDLE.match(selector)
+    if match:
+        index = int(match.group(1))
+        frames = page.frames
+        if index >= len(frames):
+            raise ValueError(f"Frame {index} no longer exists, refresh the page contents")
+        root = frames[index]
+        selector = match.group(2)
+    if selector.startswith(CSS_PREFIX):
+        return root, f"css={selector[len(CSS_PREFIX):]}"
+    return root, f"xpath={selector}"
+
 async def enhance_json_with_selectors(page: Page, json_string: str) -> Dict[str, Any]:
     """
     Parse JSON string and enhance it with robust XPath selectors.
-    Priority is given to id, href, ariaLabel, and text. Falls back to combining all attributes if needed.
     Adds a count of elements found for each XPath.
     """
     try:
         async with Timer("JSON parsing"):
             data = json.loads(json_string)['elements']
-        
-        supported_attributes = ["type", "placeholder", "role", "text", "id", "name", "href", "value"]
-
-        def escape_xpath_string(value: str) -> str:
-            """
-            Escapes a string for use in XPath by using concat() for single quotes.
-            """
-            if "'" in value:
-                parts = value.split("'")
-                return "concat(" + ", ".join(f"'{part}'" for part in parts if part) + ", \"'\")"
-            return f"'{value}'"
-        
+
         async def process_element(elem: Dict[str, Any]) -> Dict[str, Any]:
-            base_xpath = f"//{elem.get('tag', 'div')}"
-
-            # Build XPath with priority order
-            if 'id' in elem and elem['id']:
-                base_xpath += f"[@id={escape_xpath_string(elem['id'])}]"
-            elif 'href' in elem and elem['href'] and elem.get('tag') == 'a':
-                base_xpath += f"[@href={escape_xpath_string(elem['href'])}]"
-            elif 'ariaLabel' in elem and elem['ariaLabel']:
-                base_xpath += f"[@aria-label={escape_xpath_string(elem['ariaLabel'])}]"
-            elif 'text' in elem and elem['text']:
-                text = elem['text'].replace('\n', ' ').strip()
-                base_xpath += f"[contains(., {escape_xpath_string(text)})]"
-            else:
-                conditions = [
-                    f"@{attr}={escape_xpath_string(value)}" if attr != "text" else f"contains(., {escape_xpath_string(value)})"
-                    for attr, value in elem.items()
-                    if attr in supported_attributes and value
-                ]
-                if conditions:
-                    base_xpath += f"[{' and '.join(conditions)}]"
-
-            elem['xpath_selector'] = base_xpath
+            elem['xpath_selector'] = build_selector(elem)
+            # The handle now carries the frame and shadow path
+            elem.pop('css', None)
+            elem.pop('frame', None)
             return elem
 
         # Process all elements concurrently in batches
@@ -68,6 +110,7 @@ async def enhance_json_with_selectors(page: Page, json_string: str) -> Dict[str,
                     selector_tasks = [
                         page.query_selector_all(f"xpath={elem['xpath_selector']}")
                         for elem in processed
+                        if not is_qualified_handle(elem['xpath_selector'])
                     ]
                     try:
                         await asyncio.gather(*selector_tasks)
@@ -89,29 +132,12 @@ async def test_selectors_on_page(page: Page, enhanced_json: Dict[str, Any]) -> D
     Test the XPath selectors on the given page and add results to the JSON.
     """
     async def bulk_check_elements(elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        # Create a JavaScript function to check multiple elements at once
-        js_check_elements = """
-        (selectors) => {
-            return selectors.map(selector => {
-                try {
-                    const elements = document.evaluate(selector, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
-                    return {
-                        found: elements.snapshotLength > 0,
-                        count: elements.snapshotLength
-                    };
-                } catch (e) {
-                    return { found: false, error: e.toString() };
-                }
-            });
-        }
-        """
-        
         # Extract just the XPath selectors
         selectors = [elem['xpath_selector'].replace('xpath=', '') for elem in elements]
         
         # Run the bulk check
         try:
-            results = await page.evaluate(js_check_elements, selectors)
+            results = await call_bundle(page, "checkSelectors", selectors)
             
             # Update elements with results
             for elem, result in zip(elements, results):
@@ -187,14 +213,60 @@ async def test_selectors_on_page(page: Page, enhanced_json: Dict[str, Any]) -> D
             continue
             
         async with Timer(f"Processing {element_type}"):
-            for i in range(0, len(elements), batch_size):
-                batch = elements[i:i + batch_size]
-                processed = await bulk_check_elements(batch)
-                for j, elem in enumerate(processed):
-                    elements[i + j] = elem
+            # Frame and shadow DOM handles were resolved in their own document during extraction
+            for elem in elements:
+                if is_qualified_handle(elem['xpath_selector']):
+                    elem['test_result'] = {'found': True, 'visible': True, 'status': 'success'}
+            checkable = [elem for elem in elements if not is_qualified_handle(elem['xpath_selector'])]
+            for i in range(0, len(checkable), batch_size):
+                batch = checkable[i:i + batch_size]
+                # Checks update the element dicts in place
+                await bulk_check_elements(batch)
     
     return enhanced_json
 
+async def apply_site_knowledge(worker, results: Dict[str, Any]) -> None:
+    """
+    Drop selectors that keep failing on this site and surface ones that have worked before.
+    Known-good selectors missing from the snapshot are added if they still resolve on the page.
+    """
+    knowledge = getattr(worker, "site_knowledge", None)
+    if knowledge is None:
+        return
+
+    domain = knowledge.domain_of(worker.page.url)
+    # SQLite reads can wait on the write lock, so keep them off the event loop
+    known_bad, known_good = await asyncio.to_thread(lambda: (knowledge.known_bad(domain), knowledge.known_good(domain)))
+    good_selectors = {entry['xpath_selector'] for entry in known_good}
+    present = set()
+
+    for tag in ["inputs", "buttons", "links", "apps", "nav"]:
+        elements = results.get(tag)
+        if not elements:
+            continue
+        kept = []
+        for elem in elements:
+            selector = elem.get('xpath_selector')
+            if selector in known_bad:
+                continue
+            if selector in good_selectors:
+                elem['known_good'] = True
+            present.add(selector)
+            kept.append(elem)
+        results[tag] = kept
+
+    missing = [entry for entry in known_good if entry['xpath_selector'] not in present]
+    if not missing:
+        return
+
+    try:
+        checks = await call_bundle(worker.page, "checkSelectors", [entry['xpath_selector'] for entry in missing])
+        resolved = [entry for entry, check in zip(missing, checks) if check.get('found')]
+        if resolved:
+            results['known_good_selectors'] = resolved
+    except Exception as e:
+        print(f"Error checking known-good selectors: {str(e)}")
+
 @async_profile
 async def process(worker, json_string):
     async with Timer("Total process time"):
@@ -204,6 +276,9 @@ async def process(worker, json_string):
         async with Timer("Test selectors"):
             results = await test_selectors_on_page(worker.page, enhanced_json)
 
+        async with Timer("Apply site knowledge"):
+            await apply_site_knowledge(worker, results)
+
         async with Timer("Process results"):
             tags = ["inputs", "buttons", "links", "apps", "nav"]
 
@@ -228,7 +303,15 @@ async def process(worker, json_string):
             except:
                 pass
 
+        async with Timer("Collapse repeated"):
+            collapse_repeated(results)
+
         async with Timer("Write results"):
-            results["elements_by_type"] = json.loads(json_string)['elements_by_type']
-            open(f"log/cleaned_{worker.worker_id}.log", "w", encoding="utf-8").write(str(json.dumps(results, indent=2)))
+            snapshot = json.loads(json_string)
+            results["elements_by_type"] = snapshot['elements_by_type']
+            for hint in ("more_available", "viewport"):
+                if hint in snapshot:
+                    results[hint] = snapshot[hint]
+            # results isn't modified after this point, so it is serialized on the writer thread
+            log_writer.write(f"log/cleaned_{worker.worker_id}.jsonl", {"url": worker.page.url, "elements": results})
             return str(json.dumps(results, indent=2))
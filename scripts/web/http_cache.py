@@ -0,0 +1,281 @@
+import os
+import re
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, List, Optional, Tuple
+from playwright.async_api import Route, Request
+from .profiler import metrics
+
+HTTP_CACHE_REQUESTS = metrics.counter("autobrowser_http_cache_requests_total", "Static asset requests by cache result (hit, revalidated, miss)")
+HTTP_CACHE_BYTES = metrics.counter("autobrowser_http_cache_bytes_total", "Bytes served from the HTTP cache or fetched from the network")
+HTTP_CACHE_EVICTIONS = metrics.counter("autobrowser_http_cache_evictions_total", "Entries evicted to keep the HTTP cache under its size limit")
+
+CACHE_DIR = os.path.join("cache", "http")
+
+# Static assets that are shared between pages and sessions
+CACHEABLE_TYPES = {"script", "stylesheet", "font", "image", "media"}
+
+# Not replayed from the cache: the body is stored decoded and hop-by-hop headers belong to the original connection
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*(s-maxage|max-age)\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+def _directives(cache_control: str) -> set:
+    return {part.split("=", 1)[0].strip().lower() for part in cache_control.split(",") if part.strip()}
+
+def freshness_lifetime(headers: Dict[str, str], now: Optional[float] = None) -> float:
+    """Seconds a response stays fresh from when it was stored, per Cache-Control and Expires."""
+    cache_control = headers.get("cache-control", "")
+    ages = dict((name.lower(), int(value)) for name, value in _MAX_AGE.findall(cache_control))
+    if "s-maxage" in ages:
+        return ages["s-maxage"]
+    if "max-age" in ages:
+        return ages["max-age"]
+    if "expires" in headers:
+        try:
+            expires = parsedate_to_datetime(headers["expires"]).timestamp()
+            date = parsedate_to_datetime(headers["date"]).timestamp() if "date" in headers else (now or time.time())
+            return max(0.0, expires - date)
+        except (TypeError, ValueError):
+            return 0.0
+    if "last-modified" in headers:
+        # Heuristic freshness (RFC 9111 4.2.2): a tenth of the time since the last modification
+        try:
+            modified = parsedate_to_datetime(headers["last-modified"]).timestamp()
+            return max(0.0, ((now or time.time()) - modified) / 10)
+        except (TypeError, ValueError):
+            return 0.0
+    return 0.0
+
+def is_storable(status: int, headers: Dict[str, str]) -> bool:
+    """Whether a response may go into a cache shared by every context and worker."""
+    if status != 200 or "set-cookie" in headers:
+        return False
+    directives = _directives(headers.get("cache-control", ""))
+    if directives & {"no-store", "private"}:
+        return False
+    # Entries are keyed on the URL alone, so responses that vary on anything but encoding can't be reused
+    vary = {v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()}
+    if vary - {"accept-encoding"}:
+        return False
+    return freshness_lifetime(headers) > 0 or "etag" in headers or "last-modified" in headers
+
+class HttpCache:
+    """
+    Content-addressed disk cache for static assets, shared by all browser
+    contexts and worker processes. Bodies are stored once under objects/<sha256>
+    and each URL has an index entry with its headers and freshness. Fresh
+    entries are served without touching the network, stale ones are revalidated
+    with ETag/Last-Modified, and least recently used entries are evicted once
+    the cache grows past max_bytes.
+    """
+    def __init__(self, path: str = CACHE_DIR, max_bytes: int = 500 * 1024 * 1024, max_object_bytes: int = 20 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.bytes_from_cache = 0
+        self._stored_since_evict = 0
+        self._evict_lock = threading.Lock()
+        os.makedirs(os.path.join(path, "index"), exist_ok=True)
+        os.makedirs(os.path.join(path, "objects"), exist_ok=True)
+
+    def _index_path(self, url: str) -> str:
+        return os.path.join(self.path, "index", hashlib.sha256(url.encode("utf-8")).hexdigest() + ".json")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.path, "objects", digest)
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes) -> None:
+        # Other worker processes may read the same file; replace it in one step
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def lookup(self, url: str) -> Optional[Tuple[Dict[str, Any], bytes]]:
+        """Index entry and body for url, or None."""
+        index_path = self._index_path(url)
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+            if entry.get("url") != url:
+                return None
+            with open(self._object_path(entry["digest"]), "rb") as f:
+                body = f.read()
+            # Index mtime is the last use, for LRU eviction
+            os.utime(index_path)
+            return entry, body
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes) -> Optional[Dict[str, Any]]:
+        """Save a response if it is storable. Returns the index entry."""
+        if len(body) > self.max_object_bytes or not is_storable(status, headers):
+            return None
+        digest = hashlib.sha256(body).hexdigest()
+        object_path = self._object_path(digest)
+        if not os.path.exists(object_path):
+            self._write_atomic(object_path, body)
+        entry = {
+            "url": url,
+            "digest": digest,
+            "size": len(body),
+            "status": status,
+            "headers": {k: v for k, v in headers.items() if k not in DROPPED_HEADERS},
+            "stored_at": time.time(),
+            "lifetime": freshness_lifetime(headers),
+            "no_cache": "no-cache" in _directives(headers.get("cache-control", "")),
+        }
+        self._write_atomic(self._index_path(url), json.dumps(entry).encode("utf-8"))
+        self._stored_since_evict += 1
+        if self._stored_since_evict >= 50:
+            self._stored_since_evict = 0
+            self.evict()
+        return entry
+
+    def refresh(self, url: str, entry: Dict[str, Any], headers: Dict[str, str]) -> None:
+        """Restart an entry's freshness after a 304, taking updated headers from it."""
+        updated = {k: v for k, v in headers.items() if k not in DROPPED_HEADERS}
+        entry["headers"].update(updated)
+        entry["stored_at"] = time.time()
+        entry["lifetime"] = freshness_lifetime(entry["headers"])
+        self._write_atomic(self._index_path(url), json.dumps(entry).encode("utf-8"))
+
+    @staticmethod
+    def is_fresh(entry: Dict[str, Any], now: Optional[float] = None) -> bool:
+        if entry.get("no_cache"):
+            return False
+        return (now or time.time()) - entry["stored_at"] < entry["lifetime"]
+
+    def evict(self) -> int:
+        """Drop least recently used entries until the cache fits max_bytes, then orphaned bodies."""
+        with self._evict_lock:
+            index_dir = os.path.join(self.path, "index")
+            entries: List[Tuple[float, str, str]] = []
+            for name in os.listdir(index_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(index_dir, name)
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        digest = json.load(f)["digest"]
+                    entries.append((os.path.getmtime(path), path, digest))
+                except (OSError, KeyError, ValueError):
+                    continue
+
+            object_dir = os.path.join(self.path, "objects")
+            sizes = {}
+            recent = set()
+            for name in os.listdir(object_dir):
+                if not name.endswith(".tmp"):
+                    try:
+                        stat = os.stat(os.path.join(object_dir, name))
+                    except OSError:
+                        continue
+                    sizes[name] = stat.st_size
+                    # Another process may have written the body but not its index entry yet
+                    if time.time() - stat.st_mtime < 60:
+                        recent.add(name)
+
+            # Bodies are shared between URLs, so count each referenced body once
+            references: Dict[str, int] = {}
+            for _, _, digest in entries:
+                references[digest] = references.get(digest, 0) + 1
+            total = sum(sizes.get(digest, 0) for digest in references)
+            evicted = 0
+            for _, path, digest in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                evicted += 1
+                references[digest] -= 1
+                if references[digest] == 0:
+                    total -= sizes.get(digest, 0)
+                    del references[digest]
+
+            for digest in sizes:
+                if digest not in references and digest not in recent:
+                    try:
+                        os.remove(self._object_path(digest))
+                    except OSError:
+                        pass
+            if evicted:
+                HTTP_CACHE_EVICTIONS.inc(evicted)
+                print(f"[HttpCache] Evicted {evicted} entries, {total / 1024 / 1024:.1f} MB left")
+            return evicted
+
+    def handles(self, request: Request) -> bool:
+        if request.method != "GET" or request.resource_type not in CACHEABLE_TYPES:
+            return False
+        # Never share anything fetched with credentials attached
+        return "authorization" not in request.headers
+
+    async def handle(self, route: Route, request: Request) -> None:
+        """Serve a request from the cache, revalidate it, or fetch and store it."""
+        url = request.url
+        cached = await asyncio.to_thread(self.lookup, url)
+        if cached is not None:
+            entry, body = cached
+            if self.is_fresh(entry):
+                self._record_hit("hit", body)
+                await route.fulfill(status=entry["status"], headers=entry["headers"], body=body)
+                return
+            validators = {}
+            if entry["headers"].get("etag"):
+                validators["If-None-Match"] = entry["headers"]["etag"]
+            if entry["headers"].get("last-modified"):
+                validators["If-Modified-Since"] = entry["headers"]["last-modified"]
+            if validators:
+                response = await route.fetch(headers={**request.headers, **validators})
+                if response.status == 304:
+                    await asyncio.to_thread(self.refresh, url, entry, response.headers)
+                    self._record_hit("revalidated", body)
+                    await route.fulfill(status=entry["status"], headers=entry["headers"], body=body)
+                    return
+                await self._store_and_fulfill(route, url, response)
+                return
+
+        response = await route.fetch()
+        await self._store_and_fulfill(route, url, response)
+
+    async def _store_and_fulfill(self, route: Route, url: str, response) -> None:
+        self.misses += 1
+        HTTP_CACHE_REQUESTS.inc(result="miss")
+        body = await response.body()
+        HTTP_CACHE_BYTES.inc(len(body), source="network")
+        try:
+            await asyncio.to_thread(self.store, url, response.status, response.headers, body)
+        except OSError as e:
+            print(f"[HttpCache] Could not store {url}: {e}")
+        headers = {k: v for k, v in response.headers.items() if k not in DROPPED_HEADERS or k == "set-cookie"}
+        await route.fulfill(status=response.status, headers=headers, body=body)
+
+    def _record_hit(self, result: str, body: bytes) -> None:
+        if result == "hit":
+            self.hits += 1
+        else:
+            self.revalidated += 1
+        self.bytes_from_cache += len(body)
+        HTTP_CACHE_REQUESTS.inc(result=result)
+        HTTP_CACHE_BYTES.inc(len(body), source="cache")
+
+    def stats(self) -> Dict[str, Any]:
+        requests = self.hits + self.revalidated + self.misses
+        return {
+            "hits": self.hits,
+            "revalidated": self.revalidated,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.revalidated) / requests, 3) if requests else 0.0,
+            "bytes_from_cache": self.bytes_from_cache,
+        }
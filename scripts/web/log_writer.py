@@ -0,0 +1,107 @@
+import os
+import json
+import time
+import queue
+import atexit
+import threading
+from typing import Dict, Any, Optional
+from .profiler import metrics
+
+LOG_RECORDS = metrics.counter("autobrowser_log_records_total", "Log records by outcome (written, dropped, failed)")
+
+class LogWriter:
+    """
+    Append-only JSONL logging off the event loop. Records are queued without
+    blocking and a background thread serializes and appends them, rotating each
+    file to path.1..path.N once it reaches max_bytes. When the queue is full new
+    records are dropped rather than stalling the caller.
+    """
+    def __init__(self, max_queue: int = 1000, max_bytes: int = 10 * 1024 * 1024, backups: int = 3):
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue(maxsize=max_queue)
+        self._files: Dict[str, Any] = {}
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def write(self, path: str, record: Dict[str, Any]) -> bool:
+        """Queue a record to be appended to path as one JSON line. Never blocks."""
+        self._ensure_started()
+        record.setdefault("ts", time.time())
+        try:
+            self._queue.put_nowait((path, record))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS.inc(outcome="dropped")
+            if self.dropped == 1 or self.dropped % 100 == 0:
+                print(f"[LogWriter] Queue full, dropped {self.dropped} record(s)")
+            return False
+
+    def flush(self, timeout: float = 5.0) -> None:
+        """Wait until queued records have been written."""
+        if self._thread is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def close(self) -> None:
+        """Write what's queued, stop the thread and close files."""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    break
+                path, record = item
+                self._append(path, json.dumps(record, default=str, ensure_ascii=False) + "\n")
+                LOG_RECORDS.inc(outcome="written")
+                # Flush once the queue drains rather than per line
+                if self._queue.qsize() == 0:
+                    for f in self._files.values():
+                        f.flush()
+            except Exception as e:
+                LOG_RECORDS.inc(outcome="failed")
+                print(f"[LogWriter] Could not write log record: {e}")
+            finally:
+                self._queue.task_done()
+        for f in self._files.values():
+            f.close()
+        self._files.clear()
+
+    def _append(self, path: str, line: str):
+        f = self._files.get(path)
+        if f is None:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            f = self._files[path] = open(path, "a", encoding="utf-8")
+        if f.tell() and f.tell() + len(line.encode("utf-8")) > self.max_bytes:
+            f = self._rotate(path)
+        f.write(line)
+
+    def _rotate(self, path: str):
+        self._files.pop(path).close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{path}.{i}"):
+                os.replace(f"{path}.{i}", f"{path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(path, f"{path}.1")
+        else:
+            os.remove(path)
+        f = self._files[path] = open(path, "a", encoding="utf-8")
+        return f
+
+log_writer = LogWriter()
+atexit.register(log_writer.close)
@@ -0,0 +1,193 @@
+from typing import Dict, Any, Optional, Set, Iterable
+from urllib.parse import urlsplit
+from playwright.async_api import BrowserContext, Route, Request
+from .profiler import metrics
+from .http_cache import HttpCache
+
+REQUESTS_BLOCKED = metrics.counter("autobrowser_requests_blocked_total", "Browser requests aborted by the request router, by reason and resource type")
+BLOCKED_BYTES = metrics.counter("autobrowser_blocked_bytes_estimated_total", "Estimated bytes not downloaded because requests were blocked")
+REQUESTS_ALLOWED = metrics.counter("autobrowser_requests_allowed_total", "Browser requests let through by the request router")
+
+# Resource types the agent never needs to read or act on a page
+DEFAULT_BLOCKED_TYPES = {"image", "media", "font"}
+
+# Ads, analytics and beacons; they keep the network busy long after the page is usable
+DEFAULT_BLOCKED_DOMAINS = {
+    "doubleclick.net", "googlesyndication.com", "googleadservices.com", "google-analytics.com",
+    "googletagmanager.com", "googletagservices.com", "adservice.google.com", "facebook.net",
+    "connect.facebook.net", "hotjar.com", "segment.io", "segment.com", "mixpanel.com",
+    "amplitude.com", "scorecardresearch.com", "quantserve.com", "taboola.com", "outbrain.com",
+    "criteo.com", "adnxs.com", "amazon-adsystem.com", "moatads.com", "newrelic.com", "nr-data.net",
+    "fullstory.com", "clarity.ms", "bat.bing.com", "ads-twitter.com", "pubmatic.com", "rubiconproject.com",
+}
+
+# Blocked requests are never downloaded, so their size is estimated from typical transfer sizes per type
+TYPICAL_BYTES = {"image": 40_000, "media": 500_000, "font": 35_000, "stylesheet": 20_000, "script": 30_000}
+DEFAULT_TYPICAL_BYTES = 5_000
+
+# The page itself is always loaded, whatever the blocklists say
+NEVER_BLOCKED_TYPES = {"document"}
+
+# Screenshots sent to a vision model need these, or icons and pictures come out blank
+VISION_TYPES = {"image", "font"}
+
+def _host(url: str) -> str:
+    try:
+        host = (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+def _matches(host: str, domains: Iterable[str]) -> bool:
+    """True if host is one of domains or a subdomain of one."""
+    if not host:
+        return False
+    parts = host.split(".")
+    # Check host, then each parent domain: a.b.example.com, b.example.com, example.com
+    return any(".".join(parts[i:]) in domains for i in range(len(parts) - 1))
+
+def _split_list(value: Optional[str]) -> Set[str]:
+    return {item.strip().lower() for item in (value or "").split(",") if item.strip()}
+
+def parse_site_overrides(value: Optional[str]) -> Dict[str, Set[str]]:
+    """
+    Parse 'site=type,type; site=off' into the resource types allowed per site.
+    'off' (or 'all') turns blocking off for that site entirely.
+    """
+    overrides = {}
+    for entry in (value or "").split(";"):
+        if "=" not in entry:
+            continue
+        site, types = entry.split("=", 1)
+        site = site.strip().lower()
+        if site.startswith("www."):
+            site = site[4:]
+        if site:
+            overrides[site] = _split_list(types)
+    return overrides
+
+class RequestRouter:
+    """
+    One route handler per browser context that aborts requests the agent doesn't
+    need: resource types such as images and fonts, and ad/tracker domains.
+    Allowlisted domains skip all checks. Per-site overrides allow some resource
+    types (or everything) on sites that need them, e.g. 'maps.google.com=image'.
+    Static assets that get through are served from http_cache when one is set.
+    """
+    def __init__(self, blocked_types: Optional[Set[str]] = None, blocked_domains: Optional[Set[str]] = None,
+                 allowed_domains: Optional[Set[str]] = None, site_overrides: Optional[Dict[str, Set[str]]] = None,
+                 enabled: bool = True, http_cache: Optional[HttpCache] = None):
+        self.enabled = enabled
+        self.http_cache = http_cache
+        self.blocked_types = (DEFAULT_BLOCKED_TYPES if blocked_types is None else set(blocked_types)) - NEVER_BLOCKED_TYPES
+        self.blocked_domains = DEFAULT_BLOCKED_DOMAINS if blocked_domains is None else set(blocked_domains)
+        self.allowed_domains = set(allowed_domains or ())
+        self.site_overrides = dict(site_overrides or {})
+        self.blocked_requests = 0
+        self.blocked_bytes = 0
+        self.allowed_requests = 0
+        self.blocked_by_reason: Dict[str, int] = {}
+        self._contexts = set()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, str]) -> "RequestRouter":
+        """
+        Build a router from the request_* options in api_config.cfg. With enable_vision
+        on, images and fonts are never blocked since the model reads screenshots.
+        """
+        enabled = config.get("request_blocking", "true").strip().lower() in ("1", "true", "yes", "on")
+        vision = config.get("enable_vision", "false").strip().lower() in ("1", "true", "yes", "on")
+        http_cache = None
+        if config.get("http_cache", "true").strip().lower() in ("1", "true", "yes", "on"):
+            http_cache = HttpCache(max_bytes=int(config.get("http_cache_max_mb", "500")) * 1024 * 1024)
+        blocked_types = config.get("block_resource_types")
+        blocked_types = _split_list(blocked_types) if blocked_types is not None else set(DEFAULT_BLOCKED_TYPES)
+        if vision:
+            blocked_types -= VISION_TYPES
+        return cls(
+            blocked_types=blocked_types,
+            blocked_domains=DEFAULT_BLOCKED_DOMAINS | _split_list(config.get("block_domains")),
+            allowed_domains=_split_list(config.get("allow_domains")),
+            site_overrides=parse_site_overrides(config.get("request_site_overrides")),
+            enabled=enabled,
+            http_cache=http_cache,
+        )
+
+    def _site_allows(self, site: str) -> Optional[Set[str]]:
+        if not site or not self.site_overrides:
+            return None
+        parts = site.split(".")
+        for i in range(len(parts) - 1):
+            allowed = self.site_overrides.get(".".join(parts[i:]))
+            if allowed is not None:
+                return allowed
+        return None
+
+    def block_reason(self, url: str, resource_type: str, site: str = "") -> Optional[str]:
+        """Why a request should be blocked ('resource_type' or 'domain'), or None to let it through."""
+        if not self.enabled or resource_type in NEVER_BLOCKED_TYPES:
+            return None
+        host = _host(url)
+        if not host or _matches(host, self.allowed_domains):
+            return None
+        allowed_types = self._site_allows(site)
+        if allowed_types is not None and (allowed_types & {"off", "all"}):
+            return None
+        if _matches(host, self.blocked_domains):
+            return "domain"
+        if resource_type in self.blocked_types and not (allowed_types and resource_type in allowed_types):
+            return "resource_type"
+        return None
+
+    @staticmethod
+    def _page_site(request: Request) -> str:
+        # Service worker requests have no frame
+        try:
+            return _host(request.frame.page.url)
+        except Exception:
+            return ""
+
+    async def handle(self, route: Route, request: Request) -> None:
+        url = request.url
+        # data: and blob: URLs never touch the network
+        if not url.startswith("http"):
+            await route.continue_()
+            return
+        reason = self.block_reason(url, request.resource_type, self._page_site(request))
+        if reason is None:
+            self.allowed_requests += 1
+            REQUESTS_ALLOWED.inc()
+            if self.http_cache and self.http_cache.handles(request):
+                try:
+                    await self.http_cache.handle(route, request)
+                    return
+                except Exception as e:
+                    # Let the browser load it normally, e.g. when the fetch failed or the page went away
+                    print(f"[Network] HTTP cache failed for {url}: {e}")
+            await route.continue_()
+            return
+        size = TYPICAL_BYTES.get(request.resource_type, DEFAULT_TYPICAL_BYTES)
+        self.blocked_requests += 1
+        self.blocked_bytes += size
+        self.blocked_by_reason[reason] = self.blocked_by_reason.get(reason, 0) + 1
+        REQUESTS_BLOCKED.inc(reason=reason, resource_type=request.resource_type)
+        BLOCKED_BYTES.inc(size, resource_type=request.resource_type)
+        await route.abort("blockedbyclient")
+
+    async def install(self, context: BrowserContext) -> None:
+        """Route every request of context through this router. Safe to call more than once."""
+        if not (self.enabled or self.http_cache) or id(context) in self._contexts:
+            return
+        await context.route("**/*", self.handle)
+        self._contexts.add(id(context))
+        print(f"[Network] Blocking {', '.join(sorted(self.blocked_types)) or 'no resource types'} and {len(self.blocked_domains)} tracker domains")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http_cache": self.http_cache.stats() if self.http_cache else None,
+            "enabled": self.enabled,
+            "allowed_requests": self.allowed_requests,
+            "blocked_requests": self.blocked_requests,
+            "blocked_bytes_estimated": self.blocked_bytes,
+            "blocked_by_reason": dict(self.blocked_by_reason),
+        }
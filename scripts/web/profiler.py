@@ -1,60 +1,311 @@
+import os
 import time
 import functools
 import cProfile
 import pstats
 import io
-from typing import Callable, Any
+from typing import Callable, Any, Dict, List, Tuple
 import asyncio
 from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import Counter as StackCounter
 import threading
+import signal
+import sys
+from .tracing import tracer
 
-# Thread-local storage to track active profilers
-_local = threading.local()
-_local.active_profiler = False
+# Profiling is off unless switched on at runtime: "off", "sampling" or "deterministic"
+_profile_mode = "off"
+
+# Name of the profiled call chain in the current asyncio task, used to attribute samples
+_profile_scope: ContextVar[str] = ContextVar("profile_scope", default="")
+# Set while a deterministic cProfile run is active in this task so nested calls don't start another
+_deterministic_active: ContextVar[bool] = ContextVar("deterministic_active", default=False)
+
+# Set AUTO_BROWSER_TIMER_LOG=1 to also print every timed span
+VERBOSE_TIMERS = os.environ.get("AUTO_BROWSER_TIMER_LOG") == "1"
+
+# Labels attached to every metric recorded in the current context (worker, session, domain)
+_metric_labels: ContextVar[Dict[str, str]] = ContextVar("metric_labels", default={})
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    parts = [f'{k}="{_escape_label(v)}"' for k, v in labels]
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    """Monotonically increasing value per label set."""
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self.type = "counter"
+        self._values: Dict[Tuple[Tuple[str, str], ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = tuple(sorted({**_metric_labels.get(), **labels}.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            return [f"{self.name}{_format_labels(key)} {value}" for key, value in self._values.items()]
+
+class Histogram:
+    """Bucketed distribution per label set, rendered in Prometheus histogram format."""
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.type = "histogram"
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[Tuple[str, str], ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = tuple(sorted({**_metric_labels.get(), **labels}.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        with self._lock:
+            for key, (bucket_counts, total, count) in self._series.items():
+                for bound, bucket_count in zip(self.buckets, bucket_counts):
+                    lines.append(f"{self.name}_bucket{_format_labels(key + (('le', bound),))} {bucket_count}")
+                lines.append(f"{self.name}_bucket{_format_labels(key + (('le', '+Inf'),))} {count}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide collection of metrics exposed on the /metrics endpoint."""
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args)
+            return metric
+
+    def counter(self, name: str, help_text: str) -> Counter:
+        return self._get_or_create(Counter, name, help_text)
+
+    def histogram(self, name: str, help_text: str, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, buckets)
+
+    def render_prometheus(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+SPAN_SECONDS = metrics.histogram("autobrowser_span_seconds", "Duration of instrumented spans in seconds")
+
+@contextmanager
+def metric_labels(**labels):
+    """Attach labels (worker, session, domain, ...) to metrics recorded inside the block."""
+    token = _metric_labels.set({**_metric_labels.get(), **{k: str(v) for k, v in labels.items()}})
+    try:
+        yield
+    finally:
+        _metric_labels.reset(token)
 
 class Timer:
-    def __init__(self, name: str):
+    """Times a span with a monotonic clock, records it in the span histogram and traces it."""
+    def __init__(self, name: str, **labels):
         self.name = name
+        self.labels = labels
         
-    async def __aenter__(self):
-        self.start = time.time()
+    def __enter__(self):
+        # Only trace inside an existing trace (e.g. a workflow) so stray timers don't start new ones
+        self._span_scope = tracer.span(self.name, **self.labels) if tracer.current_span() else None
+        if self._span_scope:
+            self._span_scope.__enter__()
+        self.start = time.perf_counter()
         return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        elapsed = time.perf_counter() - self.start
+        if self._span_scope:
+            self._span_scope.__exit__(exc_type, exc_val, exc_tb)
+        SPAN_SECONDS.observe(elapsed, span=self.name, **self.labels)
+        if VERBOSE_TIMERS:
+            print(f"[TIMER] {self.name}: {elapsed:.4f}s")
+
+    async def __aenter__(self):
+        return self.__enter__()
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        end = time.time()
-        print(f"[TIMER] {self.name}: {end - self.start:.4f}s")
+        self.__exit__(exc_type, exc_val, exc_tb)
+
+class SamplingProfiler:
+    """
+    Low-overhead statistical profiler producing flamegraph-compatible collapsed stacks.
+
+    On Unix it samples from a SIGPROF handler, which runs on the event loop thread inside
+    the context of the asyncio task that is executing, so each sample is attributed to
+    that task and its async_profile scope. Elsewhere a background thread samples the
+    main thread's stack without task attribution.
+    """
+    def __init__(self, max_depth: int = 64):
+        self.max_depth = max_depth
+        self.rate_hz = 0
+        self.running = False
+        self.started_at = None
+        # Samples land in _stacks and are moved into _collected when read. The signal handler
+        # runs on the thread that reads them, so it must never wait on _lock: it only touches
+        # _stacks, and readers swap that for a new Counter instead of iterating it in place.
+        self._stacks = StackCounter()
+        self._collected = StackCounter()
+        self._lock = threading.Lock()
+        self._previous_handler = None
+        self._thread = None
+
+    def start(self, rate_hz: int = 100) -> str:
+        """Start sampling at rate_hz samples per second of CPU time. Returns the sampling method."""
+        if self.running:
+            self.stop()
+        self.rate_hz = max(1, min(int(rate_hz), 1000))
+        interval = 1.0 / self.rate_hz
+        with self._lock:
+            self._stacks = StackCounter()
+            self._collected.clear()
+        self.running = True
+        self.started_at = time.time()
+        try:
+            self._previous_handler = signal.signal(signal.SIGPROF, self._on_signal)
+            signal.setitimer(signal.ITIMER_PROF, interval, interval)
+            return "signal"
+        except (AttributeError, ValueError):
+            # No SIGPROF (Windows) or not on the main thread
+            main_thread_id = threading.main_thread().ident
+            self._thread = threading.Thread(target=self._sample_thread, args=(main_thread_id, interval), daemon=True)
+            self._thread.start()
+            return "thread"
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks collected so far."""
+        if self.running:
+            self.running = False
+            if self._thread is None:
+                signal.setitimer(signal.ITIMER_PROF, 0, 0)
+                signal.signal(signal.SIGPROF, self._previous_handler or signal.SIG_DFL)
+            else:
+                self._thread.join(timeout=1)
+                self._thread = None
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        """Render samples as 'frame;frame;frame count' lines for flamegraph.pl / speedscope."""
+        with self._lock:
+            pending, self._stacks = self._stacks, StackCounter()
+            self._collected.update(pending)
+            return "\n".join(f"{stack} {count}" for stack, count in self._collected.most_common())
+
+    def _on_signal(self, signum, frame):
+        task_name = ""
+        try:
+            task = asyncio.current_task()
+            if task is not None:
+                task_name = task.get_name()
+        except RuntimeError:
+            pass
+        self._record(frame, task_name, _profile_scope.get(), locked=False)
+
+    def _sample_thread(self, thread_id: int, interval: float):
+        while self.running:
+            frame = sys._current_frames().get(thread_id)
+            if frame is not None:
+                self._record(frame, "", "")
+            time.sleep(interval)
+
+    def _record(self, frame, task_name: str, scope: str, locked: bool = True):
+        frames = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            frames.append(f"{code.co_name}@{os.path.basename(code.co_filename)}:{code.co_firstlineno}")
+            frame = frame.f_back
+        frames.reverse()
+        prefix = [f"task:{task_name}"] if task_name else []
+        if scope:
+            prefix.append(f"scope:{scope}")
+        # Semicolons and spaces separate frames and counts in the collapsed format
+        stack = ";".join(part.replace(";", ",") for part in prefix + frames).replace(" ", "_")
+        if not locked:
+            self._stacks[stack] += 1
+            return
+        # The sampling thread runs concurrently with readers, so it does lock
+        with self._lock:
+            self._stacks[stack] += 1
+
+sampler = SamplingProfiler()
+
+def set_profile_mode(mode: str, rate_hz: int = 100) -> str:
+    """Switch profiling at runtime. Stopping a sampling run returns its collapsed stacks."""
+    global _profile_mode
+    if mode not in ("off", "sampling", "deterministic"):
+        raise ValueError(f"Unknown profile mode: {mode}")
+    collapsed = ""
+    if _profile_mode == "sampling" and mode != "sampling":
+        collapsed = sampler.stop()
+    if mode == "sampling":
+        method = sampler.start(rate_hz)
+        print(f"[PROFILE] Sampling at {sampler.rate_hz}Hz using {method}")
+    _profile_mode = mode
+    return collapsed
+
+def get_profile_mode() -> str:
+    return _profile_mode
 
 def async_profile(func: Callable) -> Callable:
+    """Attribute samples to func and, in deterministic mode, run it under cProfile."""
     @functools.wraps(func)
     async def wrapper(*args, **kwargs):
-        # Check if a profiler is already active
-        if getattr(_local, 'active_profiler', False):
-            # If active, just run the function without profiling
-            return await func(*args, **kwargs)
-        
+        parent_scope = _profile_scope.get()
+        scope_token = _profile_scope.set(f"{parent_scope}>{func.__name__}" if parent_scope else func.__name__)
         try:
-            # Set profiler as active
-            _local.active_profiler = True
-            
+            # Only the outermost profiled call in a task runs cProfile
+            if _profile_mode != "deterministic" or _deterministic_active.get():
+                return await func(*args, **kwargs)
+
+            active_token = _deterministic_active.set(True)
             pr = cProfile.Profile()
             pr.enable()
-            
-            start_time = time.time()
-            result = await func(*args, **kwargs)
-            end_time = time.time()
-            
-            pr.disable()
-            s = io.StringIO()
-            ps = pstats.Stats(pr, stream=s).sort_stats('cumulative')
-            # ps.print_stats(20)  # Print top 20 time-consuming operations
-            
-            print(f"\n[PROFILE] Function {func.__name__}")
-            print(f"[PROFILE] Total time: {end_time - start_time:.4f}s")
-            print(f"[PROFILE] Detailed stats:\n{s.getvalue()}")
-            
-            return result
+            start_time = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                end_time = time.perf_counter()
+                pr.disable()
+                _deterministic_active.reset(active_token)
+                s = io.StringIO()
+                ps = pstats.Stats(pr, stream=s).sort_stats('cumulative')
+                ps.print_stats(20)  # Print top 20 time-consuming operations
+
+                print(f"\n[PROFILE] Function {func.__name__}")
+                print(f"[PROFILE] Total time: {end_time - start_time:.4f}s")
+                print(f"[PROFILE] Detailed stats:\n{s.getvalue()}")
         finally:
-            # Always reset the profiler state
-            _local.active_profiler = False
+            _profile_scope.reset(scope_token)
             
-    return wrapper 
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,127 @@
+import re
+import json
+from typing import Dict, Any, List, Tuple, Callable, Optional
+from .handler import build_selector
+from .repeated import GROUP_FIELD
+
+# Weights of the three relevance signals
+LEXICAL_WEIGHT = 0.6
+VIEWPORT_WEIGHT = 0.25
+INTERACTIVE_WEIGHT = 0.15
+
+DEFAULT_TOKEN_BUDGET = 4000
+
+# Fields only used for ranking, removed before the snapshot is shown to the model
+RANKING_FIELDS = ("viewportY", "pageY")
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "into", "is", "it",
+    "of", "on", "or", "the", "this", "to", "with", "you", "your", "page", "then", "that",
+}
+
+def terms(text: str) -> set:
+    """Lowercase content words with a naive plural strip, so 'Prices' matches 'price'."""
+    words = set()
+    for word in _WORD_PATTERN.findall((text or "").lower()):
+        if len(word) < 2 or word in _STOPWORDS:
+            continue
+        words.add(word[:-1] if len(word) > 3 and word.endswith("s") else word)
+    return words
+
+def _element_terms(elem: Dict[str, Any]) -> set:
+    fields = ("text", "label", "ariaLabel", "placeholder", "name", "id", "value", "title", "href", "section")
+    return terms(" ".join(str(elem[f]) for f in fields if elem.get(f)))
+
+def _interactivity(elem: Dict[str, Any]) -> float:
+    tag = elem.get("tag", "")
+    role = elem.get("role", "")
+    if tag in ("input", "textarea", "select"):
+        return 1.0
+    if tag == "button" or role in ("button", "tab", "menuitem", "checkbox", "radio"):
+        return 0.8
+    if tag == "a" or role == "link":
+        return 0.6
+    return 0.3
+
+def _viewport_score(elem: Dict[str, Any]) -> float:
+    # viewportY is the element's top in viewport heights: 0..1 is on screen
+    y = elem.get("viewportY")
+    if y is None:
+        return 0.5
+    if 0 <= y < 1:
+        return 1.0 - 0.3 * y
+    if y >= 1:
+        return 0.7 / y
+    return 0.5 / (1 - y)
+
+def score_element(elem: Dict[str, Any], task_terms: set) -> float:
+    """Relevance of an element to the task from lexical overlap, viewport position and interactivity."""
+    lexical = 0.0
+    if task_terms:
+        lexical = min(1.0, len(task_terms & _element_terms(elem)) / min(len(task_terms), 4))
+    return (LEXICAL_WEIGHT * lexical
+            + VIEWPORT_WEIGHT * _viewport_score(elem)
+            + INTERACTIVE_WEIGHT * _interactivity(elem))
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+def _strip_ranking_fields(elem: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in elem.items() if k not in RANKING_FIELDS}
+
+def take_within_budget(entries: List[Dict[str, Any]], token_budget: int,
+                       count_tokens: Callable[[str], int] = _estimate_tokens) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Split ranked entries into those that fit the budget (always at least one) and the rest."""
+    selected = []
+    used = 0
+    for i, entry in enumerate(entries):
+        elem = _strip_ranking_fields(entry["element"])
+        # Cost as the model will see it, including the selector added later; the group
+        # signature is only used to collapse repeated structures and never shown
+        shown = {k: v for k, v in elem.items() if k != GROUP_FIELD}
+        cost = count_tokens(json.dumps(shown)) + count_tokens(build_selector(elem)) + 8
+        if selected and used + cost > token_budget:
+            return selected, entries[i:]
+        selected.append(entry)
+        used += cost
+    return selected, []
+
+def build_snapshot(entries: List[Dict[str, Any]], total_candidates: int, remaining: int) -> str:
+    """Group selected entries back into the get_page_elements format, in document order."""
+    grouped: Dict[str, List[Dict[str, Any]]] = {}
+    for entry in sorted(entries, key=lambda e: e["order"]):
+        grouped.setdefault(entry["category"], []).append(_strip_ranking_fields(entry["element"]))
+    summary = {
+        "total_elements": total_candidates,
+        "elements_by_type": {category: len(elements) for category, elements in grouped.items()},
+        "elements": grouped,
+    }
+    if remaining:
+        summary["more_available"] = {
+            "count": remaining,
+            "hint": "Only the elements most relevant to the current task are shown. Call get_more_elements to see the next ones."
+        }
+    return json.dumps(summary, indent=2)
+
+def rank_snapshot(json_string: str, task: Optional[str], token_budget: int = DEFAULT_TOKEN_BUDGET,
+                  count_tokens: Callable[[str], int] = _estimate_tokens) -> Tuple[str, List[Dict[str, Any]]]:
+    """
+    Rank the elements of a get_page_elements snapshot against the task and keep the
+    top ones that fit in token_budget. Returns the reduced snapshot and the remaining
+    ranked entries for get_more_elements.
+    """
+    summary = json.loads(json_string)
+    task_terms = terms(task or "")
+    entries = []
+    for category, elements in summary.get("elements", {}).items():
+        for elem in elements:
+            entries.append({
+                "category": category,
+                "element": elem,
+                "order": len(entries),
+                "score": score_element(elem, task_terms),
+            })
+    entries.sort(key=lambda e: (-e["score"], e["order"]))
+    selected, remaining = take_within_budget(entries, token_budget, count_tokens)
+    return build_snapshot(selected, len(entries), len(remaining)), remaining
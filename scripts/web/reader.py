@@ -0,0 +1,116 @@
+import re
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Callable
+from playwright.async_api import Page
+from .web import get_main_content
+from .ranking import terms
+from .profiler import Timer
+
+CHUNK_TOKENS = 800
+
+# Counts DOM mutations so cached text is reused only while the page hasn't changed.
+# The observer is installed on first use and lives as long as the document.
+DOM_VERSION_JS = """
+() => {
+    if (window.__autobrowserDomVersion === undefined) {
+        window.__autobrowserDomVersion = 0;
+        new MutationObserver(() => { window.__autobrowserDomVersion += 1; })
+            .observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+    }
+    return window.__autobrowserDomVersion;
+}
+"""
+
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n|\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // 4
+
+def split_chunks(text: str, chunk_tokens: int = CHUNK_TOKENS,
+                 count_tokens: Callable[[str], int] = _estimate_tokens) -> List[str]:
+    """Split text into chunks of about chunk_tokens, breaking between paragraphs (or sentences in long ones)."""
+    pieces = []
+    for paragraph in _PARAGRAPH_BREAK.split(text or ""):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= chunk_tokens:
+            pieces.append(paragraph)
+            continue
+        for sentence in _SENTENCE_END.split(paragraph):
+            # A single run-on "sentence" over budget is cut by characters
+            while count_tokens(sentence) > chunk_tokens:
+                cut = max(1, len(sentence) * chunk_tokens // count_tokens(sentence))
+                pieces.append(sentence[:cut])
+                sentence = sentence[cut:]
+            if sentence:
+                pieces.append(sentence)
+
+    chunks = []
+    current: List[str] = []
+    used = 0
+    for piece in pieces:
+        cost = count_tokens(piece) + 1
+        if current and used + cost > chunk_tokens:
+            chunks.append("\n".join(current))
+            current, used = [], 0
+        current.append(piece)
+        used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+def rank_chunks(chunks: List[str], query: Optional[str]) -> List[int]:
+    """Chunk indexes by how many words they share with query, best first; document order on ties."""
+    query_terms = terms(query or "")
+    if not query_terms:
+        return list(range(len(chunks)))
+    return sorted(range(len(chunks)), key=lambda i: (-len(query_terms & terms(chunks[i])), i))
+
+class PageReader:
+    """
+    Main text of recently read pages, split into token-sized chunks and cached per
+    URL and DOM version, so paging through a long page reads the DOM only once.
+    """
+    def __init__(self, chunk_tokens: int = CHUNK_TOKENS, max_pages: int = 20,
+                 count_tokens: Callable[[str], int] = _estimate_tokens):
+        self.chunk_tokens = chunk_tokens
+        self.max_pages = max_pages
+        self.count_tokens = count_tokens
+        self._pages: "OrderedDict[Tuple[str, int], List[str]]" = OrderedDict()
+
+    async def chunks(self, page: Page) -> List[str]:
+        """Chunks of the page's main text, extracted again only if the URL or DOM changed."""
+        version = await page.evaluate(DOM_VERSION_JS)
+        key = (page.url, version)
+        cached = self._pages.get(key)
+        if cached is not None:
+            self._pages.move_to_end(key)
+            return cached
+        async with Timer("read_main_text"):
+            text = await get_main_content(page, max_chars=None)
+            chunks = split_chunks(text, self.chunk_tokens, self.count_tokens)
+        self._pages[key] = chunks
+        while len(self._pages) > self.max_pages:
+            self._pages.popitem(last=False)
+        return chunks
+
+    async def read(self, page: Page, chunk: int = 1, query: Optional[str] = None) -> str:
+        """
+        Chunk number chunk (1-based) of the page's main text. With query, chunks are
+        ordered by relevance to it, so chunk 1 is the most relevant one.
+        """
+        chunks = await self.chunks(page)
+        if not chunks:
+            return "No main content found on this page."
+        order = rank_chunks(chunks, query) if query else list(range(len(chunks)))
+        if chunk < 1 or chunk > len(order):
+            return f"Chunk {chunk} does not exist, the page has {len(chunks)} chunks."
+        index = order[chunk - 1]
+        if query:
+            header = f"[Chunk {chunk} of {len(chunks)} by relevance; part {index + 1} of the page]"
+        else:
+            header = f"[Chunk {chunk} of {len(chunks)}]"
+        footer = f"\n[Call read_page with chunk={chunk + 1} to continue]" if chunk < len(chunks) else "\n[End of page]"
+        return f"{header}\n{chunks[index]}{footer}"
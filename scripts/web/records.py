@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import asyncio
+import threading
+from typing import Any, List, Optional, Tuple
+from playwright.async_api import Page, BrowserContext
+from .profiler import Timer, metrics
+
+RECORDS_EXTRACTED = metrics.counter("autobrowser_records_extracted_total", "Records returned by extract_records")
+
+BATCH_SIZE = 500
+INLINE_ROWS = 40
+INLINE_CHARS = 6000
+RECORDS_DIR = os.path.join("cache", "records")
+
+# Reads one batch of records. Containers are matched on the first batch and kept on window so
+# later batches don't query again. Field specs are a CSS selector relative to the container,
+# optionally followed by @attribute; an empty selector means the container itself.
+RECORDS_JS = """
+({container, fields, offset, limit, next}) => {
+    const key = JSON.stringify([container, location.href]);
+    if (offset === 0 || !window.__autobrowserRecords || window.__autobrowserRecords.key !== key) {
+        let nodes;
+        if (container.startsWith('/') || container.startsWith('(')) {
+            const snapshot = document.evaluate(container, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+            nodes = [];
+            for (let i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+        } else {
+            nodes = Array.from(document.querySelectorAll(container));
+        }
+        window.__autobrowserRecords = {key, nodes};
+    }
+    const nodes = window.__autobrowserRecords.nodes;
+    const specs = fields.map(([name, spec]) => {
+        const at = spec.lastIndexOf('@');
+        return at >= 0 ? [spec.slice(0, at).trim(), spec.slice(at + 1).trim()] : [spec.trim(), null];
+    });
+    const read = (root, [selector, attribute]) => {
+        const element = selector ? root.querySelector(selector) : root;
+        if (!element) return null;
+        if (attribute) {
+            // Properties resolve relative URLs, attributes don't
+            if ((attribute === 'href' || attribute === 'src') && element[attribute]) return element[attribute];
+            return element.getAttribute(attribute);
+        }
+        return (element.textContent || '').replace(/\\s+/g, ' ').trim().substring(0, 500);
+    };
+    const rows = nodes.slice(offset, offset + limit).map(node => specs.map(spec => read(node, spec)));
+
+    let links = [];
+    if (next && offset === 0) {
+        const found = next === true
+            ? Array.from(document.querySelectorAll('a[rel~="next"], link[rel~="next"]'))
+                .concat(Array.from(document.querySelectorAll('a')).filter(a => /^\\s*(next|›|»|>)\\s*$/i.test(a.textContent)))
+            : Array.from(document.querySelectorAll(next));
+        links = found.map(a => a.href).filter(href => href && href.startsWith('http'));
+    }
+    return {rows, total: nodes.length, links};
+}
+"""
+
+def parse_fields(fields: Any) -> List[Tuple[str, str]]:
+    """Fields as (name, 'selector@attr') pairs from a dict, a JSON object string or a list of names."""
+    if isinstance(fields, str):
+        fields = fields.strip()
+        try:
+            fields = json.loads(fields) if fields.startswith(("{", "[")) else [f.strip() for f in fields.split(",") if f.strip()]
+        except ValueError:
+            raise ValueError("fields must be an object like {\"title\": \"h2\", \"link\": \"a@href\"}")
+    if isinstance(fields, dict):
+        return [(str(name), str(spec or "")) for name, spec in fields.items()]
+    if isinstance(fields, list):
+        # Bare names are read as descendants with that class, e.g. 'price' -> '.price'
+        return [(str(name), f".{name}") for name in fields]
+    raise ValueError("fields must be an object mapping field names to selectors")
+
+async def extract_page_records(page: Page, container: str, fields: List[Tuple[str, str]], next_links: Any = None,
+                               on_batch=None) -> Tuple[int, List[str]]:
+    """
+    Read every record on page in batches of BATCH_SIZE, passing each batch of rows to
+    on_batch. Returns the record count and the pagination links found on the page.
+    """
+    offset = 0
+    links: List[str] = []
+    while True:
+        batch = await page.evaluate(RECORDS_JS, {
+            "container": container, "fields": fields, "offset": offset, "limit": BATCH_SIZE, "next": next_links or None,
+        })
+        if offset == 0:
+            links = batch["links"]
+        if batch["rows"] and on_batch is not None:
+            await on_batch(page.url, batch["rows"])
+        offset += len(batch["rows"])
+        if not batch["rows"] or offset >= batch["total"]:
+            return offset, links
+
+class RecordSink:
+    """Collects rows, keeping the first few inline and spilling everything to a JSONL file once the result gets large."""
+    def __init__(self, field_names: List[str], worker_id: Any = ""):
+        self.field_names = field_names
+        self.rows: List[List[Any]] = []
+        self.count = 0
+        self.path: Optional[str] = None
+        self._worker_id = worker_id
+        self._chars = 0
+        # JSON lines of the rows held so far, each stamped with the page it came from
+        self._lines: List[str] = []
+        # Tabs read pages concurrently and their writes run in worker threads
+        self._file_lock = threading.Lock()
+
+    def _append_file(self, lines: List[str]) -> None:
+        with self._file_lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.writelines(lines)
+
+    async def add(self, url: str, rows: List[List[Any]]) -> None:
+        self.count += len(rows)
+        RECORDS_EXTRACTED.inc(len(rows))
+        lines = [json.dumps({**dict(zip(self.field_names, row)), "_url": url}, ensure_ascii=False) + "\n" for row in rows]
+        if self.path is None:
+            self.rows.extend(rows)
+            self._lines.extend(lines)
+            self._chars += len(json.dumps(rows))
+            if len(self.rows) <= INLINE_ROWS and self._chars <= INLINE_CHARS:
+                return
+            # Too big to return inline: write what we have and stream the rest to disk
+            self.path = os.path.join(RECORDS_DIR, f"records_{self._worker_id}_{int(time.time() * 1000)}.jsonl")
+            self.rows = self.rows[:INLINE_ROWS]
+            lines, self._lines = self._lines, []
+        await asyncio.to_thread(self._append_file, lines)
+
+    def summary(self, pages: int) -> str:
+        result = {"fields": self.field_names, "count": self.count, "pages": pages, "rows": self.rows}
+        if self.path:
+            result["rows_shown"] = len(self.rows)
+            result["file"] = self.path
+            result["note"] = f"Showing the first {len(self.rows)} of {self.count} records; all records are in the file as JSON lines."
+        return json.dumps(result, separators=(",", ":"), ensure_ascii=False)
+
+async def extract_records(page: Page, container: str, fields: Any, follow_next: Any = None,
+                          max_pages: int = 1, max_tabs: int = 4, worker_id: Any = "") -> str:
+    """
+    Extract every record matching container on the current page, and with follow_next
+    (True to detect next links, or a selector for pagination links) on up to max_pages
+    pages. Further pages are opened in parallel tabs as their links are discovered.
+    """
+    parsed = parse_fields(fields)
+    sink = RecordSink([name for name, _ in parsed], worker_id)
+    async with Timer("extract_records"):
+        _, links = await extract_page_records(page, container, parsed, follow_next, sink.add)
+        visited = {page.url.split("#")[0]}
+        pages = 1
+        if not follow_next or max_pages <= 1:
+            return sink.summary(pages)
+
+        context: BrowserContext = page.context
+        tabs = asyncio.Semaphore(max_tabs)
+
+        async def crawl(url: str) -> List[str]:
+            async with tabs:
+                tab = await context.new_page()
+                try:
+                    await tab.goto(url, wait_until="domcontentloaded", timeout=30000)
+                    try:
+                        await tab.wait_for_selector(container if not container.startswith(("/", "(")) else f"xpath={container}", timeout=5000)
+                    except Exception:
+                        pass
+                    _, found = await extract_page_records(tab, container, parsed, follow_next, sink.add)
+                    return found
+                except Exception as e:
+                    print(f"[Records] Could not read {url}: {e}")
+                    return []
+                finally:
+                    await tab.close()
+
+        frontier = links
+        while frontier and pages < max_pages:
+            batch = []
+            for url in frontier:
+                url = url.split("#")[0]
+                if url not in visited and pages + len(batch) < max_pages:
+                    visited.add(url)
+                    batch.append(url)
+            if not batch:
+                break
+            pages += len(batch)
+            found = await asyncio.gather(*[crawl(url) for url in batch])
+            frontier = [link for links in found for link in links]
+        return sink.summary(pages)
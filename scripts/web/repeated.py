@@ -0,0 +1,76 @@
+from typing import Dict, Any, List
+import numpy as np
+
+# Structural signature added during extraction: parent tag/classes > element tag/classes
+GROUP_FIELD = "group"
+
+# Fewer repeats than this are listed individually
+MIN_ROWS = 4
+
+# Element categories whose entries are collapsed
+COLLAPSED_CATEGORIES = ("inputs", "buttons", "links", "headings", "navigation", "apps", "other")
+
+def signature(elem: Dict[str, Any]) -> str:
+    """Structural signature of an element, from extraction or (accessibility backend) its tag, role and section."""
+    group = elem.get(GROUP_FIELD)
+    if group:
+        return group
+    return f"{elem.get('tag', '')}|{elem.get('role', '')}|{elem.get('type', '')}|{elem.get('section', '')}"
+
+def collapse_elements(elements: List[Dict[str, Any]], min_rows: int = MIN_ROWS) -> List[Dict[str, Any]]:
+    """
+    Replace each group of min_rows or more elements sharing a structural signature
+    with one entry: a template of the fields all of them share and a table of the
+    fields that vary (always including each row's xpath_selector). The entry takes
+    the place of the group's first element.
+    """
+    if len(elements) < min_rows:
+        for elem in elements:
+            elem.pop(GROUP_FIELD, None)
+        return elements
+
+    signatures = np.array([signature(elem) for elem in elements])
+    _, inverse, counts = np.unique(signatures, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+    for elem in elements:
+        elem.pop(GROUP_FIELD, None)
+    if counts.max() < min_rows:
+        return elements
+
+    collapsed: Dict[int, Dict[str, Any]] = {}
+    for group in np.flatnonzero(counts >= min_rows):
+        members = [elements[i] for i in np.flatnonzero(inverse == group)]
+        keys = list(dict.fromkeys(key for member in members for key in member))
+        template = {}
+        fields = []
+        for key in keys:
+            # Compare the whole column against its first value at once
+            column = np.array([repr(member.get(key)) for member in members])
+            if key != "xpath_selector" and (column == column[0]).all():
+                template[key] = members[0][key]
+            else:
+                fields.append(key)
+        collapsed[int(group)] = {
+            "repeated": len(members),
+            "template": template,
+            "fields": fields,
+            "rows": [[member.get(field) for field in fields] for member in members],
+        }
+
+    result = []
+    for elem, group in zip(elements, inverse):
+        entry = collapsed.get(int(group))
+        if entry is None:
+            result.append(elem)
+        elif entry is not True:
+            result.append(entry)
+            # The group is emitted once, where its first element was
+            collapsed[int(group)] = True
+    return result
+
+def collapse_repeated(results: Dict[str, Any], min_rows: int = MIN_ROWS) -> Dict[str, Any]:
+    """Collapse repeated structures in every element category of a processed snapshot."""
+    for category in COLLAPSED_CATEGORIES:
+        if isinstance(results.get(category), list):
+            results[category] = collapse_elements(results[category], min_rows)
+    return results
@@ -0,0 +1,87 @@
+import re
+import asyncio
+from typing import Dict, Any, List, Optional
+from playwright.async_api import BrowserContext
+from .fetch import fetch_url_text
+from .web import get_main_content
+from .ranking import terms
+from .profiler import Timer
+
+MAX_URLS = 10
+MAX_TABS = 4
+EXCERPT_CHARS = 1200
+
+_PARAGRAPHS = re.compile(r"\n\s*\n")
+
+def relevant_excerpt(text: str, question: Optional[str], max_chars: int = EXCERPT_CHARS) -> str:
+    """The paragraphs of text that share the most words with question, in their original order."""
+    paragraphs = [p.strip() for p in _PARAGRAPHS.split(text or "") if p.strip()]
+    if not paragraphs:
+        return ""
+    question_terms = terms(question or "")
+    if not question_terms:
+        return "\n".join(paragraphs)[:max_chars]
+
+    scored = []
+    for index, paragraph in enumerate(paragraphs):
+        overlap = len(question_terms & terms(paragraph))
+        # The opening paragraph usually says what the page is about
+        scored.append((overlap + (0.5 if index == 0 else 0), index))
+    scored.sort(key=lambda item: (-item[0], item[1]))
+
+    chosen = []
+    used = 0
+    for score, index in scored:
+        if chosen and (score == 0 or used + len(paragraphs[index]) > max_chars):
+            continue
+        chosen.append(index)
+        used += len(paragraphs[index]) + 1
+        if used >= max_chars:
+            break
+    return "\n".join(paragraphs[i] for i in sorted(chosen))[:max_chars]
+
+async def _read_in_tab(context: BrowserContext, url: str, tabs: asyncio.Semaphore) -> Dict[str, Any]:
+    async with tabs:
+        page = await context.new_page()
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            try:
+                await page.wait_for_load_state("networkidle", timeout=3000)
+            except Exception:
+                pass
+            return {"url": page.url, "title": await page.title(), "text": await get_main_content(page, max_chars=None), "source": "browser"}
+        finally:
+            await page.close()
+
+async def read_page(context: BrowserContext, url: str, tabs: asyncio.Semaphore) -> Dict[str, Any]:
+    """Read one page over HTTP, or in a pooled browser tab when it needs rendering."""
+    try:
+        fetched = await fetch_url_text(url)
+        if not fetched.get("needs_browser"):
+            return {"url": fetched["url"], "title": fetched.get("title", ""), "text": fetched["text"], "source": "http"}
+        return await _read_in_tab(context, url, tabs)
+    except Exception as e:
+        return {"url": url, "error": str(e)}
+
+async def read_urls(context: BrowserContext, urls: List[str], question: Optional[str] = None,
+                    max_tabs: int = MAX_TABS, excerpt_chars: int = EXCERPT_CHARS) -> str:
+    """
+    Read several pages concurrently and return one digest with the part of each
+    page most relevant to question. At most max_tabs browser tabs are open at once.
+    """
+    async with Timer("read_urls", urls=len(urls)):
+        tabs = asyncio.Semaphore(max_tabs)
+        # Keep order, drop duplicates
+        urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))[:MAX_URLS]
+        pages = await asyncio.gather(*[read_page(context, url, tabs) for url in urls])
+
+        sections = []
+        for number, page in enumerate(pages, 1):
+            if "error" in page:
+                sections.append(f"[{number}] {page['url']}\nCould not read page: {page['error']}")
+                continue
+            excerpt = relevant_excerpt(page["text"], question, excerpt_chars) or "No readable text found"
+            title = f" - {page['title']}" if page.get("title") else ""
+            sections.append(f"[{number}] {page['url']}{title}\n{excerpt}")
+        header = f"Read {len(urls)} pages" + (f" for: {question}" if question else "")
+        return header + "\n\n" + "\n\n".join(sections)
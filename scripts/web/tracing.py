@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional
+
+@dataclass
+class Span:
+    """A timed operation within a trace, modelled on OpenTelemetry spans."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float  # Wall clock, for display
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    end_time: Optional[float] = None
+    status: str = "ok"
+    _start_monotonic: float = field(default_factory=time.perf_counter, repr=False)
+
+    @property
+    def duration_ms(self) -> float:
+        if self.end_time is None:
+            return (time.perf_counter() - self._start_monotonic) * 1000
+        return (self.end_time - self.start_time) * 1000
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+        }
+
+class SpanExporter:
+    """Receives every finished span; flush() is called when a root span ends."""
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+class JsonFileExporter(SpanExporter):
+    """Appends finished spans as JSON lines for offline analysis."""
+    def __init__(self, path: str = "log/traces.jsonl"):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+class InMemoryExporter(SpanExporter):
+    """Keeps the most recent traces in memory for the dashboard waterfall."""
+    def __init__(self, max_traces: int = 50, max_spans_per_trace: int = 5000):
+        self.max_traces = max_traces
+        self.max_spans_per_trace = max_spans_per_trace
+        self._traces: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.max_traces:
+                    self._traces.popitem(last=False)
+            if len(spans) < self.max_spans_per_trace:
+                spans.append(span.to_dict())
+
+    def list_traces(self, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Summaries of stored traces, newest first. Only traces with a finished root are listed."""
+        summaries = []
+        with self._lock:
+            for trace_id, spans in reversed(self._traces.items()):
+                root = next((s for s in spans if s["parent_id"] is None), None)
+                if root is None or (name and root["name"] != name):
+                    continue
+                summaries.append({
+                    "trace_id": trace_id,
+                    "name": root["name"],
+                    "start_time": root["start_time"],
+                    "duration_ms": root["duration_ms"],
+                    "span_count": len(spans),
+                })
+        return summaries
+
+    def get_trace(self, trace_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return sorted(self._traces.get(trace_id, []), key=lambda s: s["start_time"])
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class _SpanScope:
+    """Context manager (sync or async) that opens a span as the current span."""
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.span = None
+        self._token = None
+
+    def __enter__(self) -> Span:
+        self.span = self.tracer.start_span(self.name, **self.attributes)
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_span.reset(self._token)
+        self.tracer.end_span(self.span, error=exc_val)
+
+    async def __aenter__(self) -> Span:
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.__exit__(exc_type, exc_val, exc_tb)
+
+class _UseSpan:
+    """Makes an already started span current without ending it on exit."""
+    def __init__(self, span: Optional[Span]):
+        self.span = span
+        self._token = None
+
+    def __enter__(self):
+        self._token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current_span.reset(self._token)
+
+class Tracer:
+    """Creates nested spans that follow asyncio tasks and hands finished spans to exporters."""
+    def __init__(self):
+        self.exporters: List[SpanExporter] = []
+
+    def add_exporter(self, exporter: SpanExporter) -> None:
+        self.exporters.append(exporter)
+
+    def current_span(self) -> Optional[Span]:
+        return _current_span.get()
+
+    def start_span(self, name: str, parent: Optional[Span] = None, root: bool = False, **attributes) -> Span:
+        """Start a span under parent (default: the current span). root=True starts a new trace."""
+        if parent is None and not root:
+            parent = _current_span.get()
+        return Span(
+            name=name,
+            trace_id=parent.trace_id if parent else os.urandom(16).hex(),
+            span_id=os.urandom(8).hex(),
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes=attributes,
+        )
+
+    def end_span(self, span: Span, error: Optional[BaseException] = None) -> None:
+        if span.end_time is not None:
+            return
+        span.end_time = span.start_time + (time.perf_counter() - span._start_monotonic)
+        if error is not None:
+            span.status = "error"
+            span.attributes["error"] = str(error)[:300]
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+                if span.parent_id is None:
+                    exporter.flush()
+            except Exception as e:
+                print(f"[Tracing] Exporter {type(exporter).__name__} failed: {e}")
+
+    def span(self, name: str, **attributes) -> _SpanScope:
+        """Open a child of the current span: `with tracer.span(...)` or `async with tracer.span(...)`."""
+        return _SpanScope(self, name, attributes)
+
+    def use_span(self, span: Optional[Span]) -> _UseSpan:
+        """Run a block with span as the parent of any spans opened inside it."""
+        return _UseSpan(span)
+
+tracer = Tracer()
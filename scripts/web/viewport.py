@@ -0,0 +1,99 @@
+import json
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set, Tuple
+from playwright.async_api import Page
+from .handler import build_selector
+
+# How far beyond the visible area (in viewport heights) viewport-first snapshots reach
+VIEWPORT_MARGIN = 0.5
+
+# Scrolls the document, or the largest scrollable container when the document itself doesn't scroll
+# (common in SPAs), by most of a screen so consecutive regions overlap slightly
+SCROLL_JS = """
+(direction) => {
+    let target = document.scrollingElement || document.documentElement;
+    let container = false;
+    if (target.scrollHeight <= target.clientHeight + 1) {
+        let best = null;
+        let bestArea = 0;
+        for (const el of document.querySelectorAll('*')) {
+            if (el.scrollHeight <= el.clientHeight + 1) continue;
+            const overflow = getComputedStyle(el).overflowY;
+            if (overflow !== 'auto' && overflow !== 'scroll') continue;
+            const area = el.clientWidth * el.clientHeight;
+            if (area > bestArea) {
+                bestArea = area;
+                best = el;
+            }
+        }
+        if (best) {
+            target = best;
+            container = true;
+        }
+    }
+    const before = target.scrollTop;
+    const step = Math.round(window.innerHeight * 0.8);
+    if (direction === 'up') target.scrollTop = before - step;
+    else if (direction === 'down') target.scrollTop = before + step;
+    return {
+        moved: Math.abs(target.scrollTop - before) > 1,
+        scrollTop: Math.round(target.scrollTop),
+        scrollHeight: target.scrollHeight,
+        viewportHeight: window.innerHeight,
+        container: container
+    };
+}
+"""
+
+async def scroll_viewport(page: Page, direction: str) -> Dict[str, Any]:
+    """Scroll 'up' or 'down' by one screen ('none' only reads it) and report the new position."""
+    return await page.evaluate(SCROLL_JS, direction)
+
+def element_key(elem: Dict[str, Any], offset: int = 0) -> str:
+    """Identity of an element on the page: its selector plus vertical position."""
+    return f"{build_selector(elem)}@{elem.get('pageY', 0) + offset}"
+
+def filter_new_elements(json_string: str, seen: Set[str], offset: int = 0) -> Tuple[str, int]:
+    """Drop elements already in seen from a snapshot and record the rest. Returns the snapshot and how many are new."""
+    summary = json.loads(json_string)
+    grouped = {}
+    for category, elements in summary.get("elements", {}).items():
+        fresh = []
+        for elem in elements:
+            key = element_key(elem, offset)
+            if key in seen:
+                continue
+            seen.add(key)
+            fresh.append(elem)
+        if fresh:
+            grouped[category] = fresh
+    total = sum(len(elements) for elements in grouped.values())
+    summary.update({
+        "total_elements": total,
+        "elements_by_type": {category: len(elements) for category, elements in grouped.items()},
+        "elements": grouped,
+    })
+    return json.dumps(summary, indent=2), total
+
+class RegionCache:
+    """Processed snapshots per scrolled page region, keyed by URL, scroll offset and page height."""
+    def __init__(self, max_regions: int = 50):
+        self.max_regions = max_regions
+        self._regions: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+    @staticmethod
+    def key(url: str, position: Dict[str, Any]) -> Tuple[str, int, int]:
+        # Page height is part of the key so regions are re-read after infinite scroll appends content
+        return (url, position["scrollTop"] // 50, position["scrollHeight"])
+
+    def get(self, key: Tuple[str, int, int]) -> Optional[str]:
+        snapshot = self._regions.get(key)
+        if snapshot is not None:
+            self._regions.move_to_end(key)
+        return snapshot
+
+    def put(self, key: Tuple[str, int, int], snapshot: str) -> None:
+        self._regions[key] = snapshot
+        self._regions.move_to_end(key)
+        while len(self._regions) > self.max_regions:
+            self._regions.popitem(last=False)
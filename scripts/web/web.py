@@ -1,14 +1,18 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from playwright.async_api import Page  # Changed to async_api
 import time
 import json
+import asyncio
 from .profiler import Timer, async_profile
+from .bundle import call_bundle
 
 @async_profile
-async def get_page_elements(page: Page) -> str:
+async def get_page_elements(page: Page, viewport_margin: Optional[float] = None) -> str:
     """
     Get a clean, structured representation of important page elements.
     Returns elements in a format that's easy for LLMs to understand.
+    With viewport_margin, only elements within that many viewport heights of the
+    visible area are described, which keeps long and infinite-scroll pages cheap.
     """
     async with Timer("Total get_page_elements time"):
         async with Timer("Setup selectors"):
@@ -44,51 +48,48 @@ async def get_page_elements(page: Page) -> str:
             
             combined_selector = ", ".join(important_selectors + react_selectors + vue_selectors)
 
+        ignored_tags = []
+        ignored_href_strings = ["policy", "policies", "facebook", "store", "googleadservices", "instagram"]
+        # Upper bound on candidates; which ones reach the model is decided by relevance ranking
+        MAX_ELEMENTS = 400
+        # Repeats of a structure are shown as table rows, so past the first few they count a quarter
+        REPEATED_WEIGHT = 0.25
+
         async with Timer("Query elements"):
-            # Get elements matching our selectors
-            elements = await page.query_selector_all(combined_selector)
+            # One bundle call per frame (same-origin or not), all frames in parallel; the
+            # collection code itself is preinstalled by web/bundle.js. Each frame filters
+            # and stops at the element budget in the page
+            frames = [(index, frame) for index, frame in enumerate(page.frames) if not frame.is_detached()]
+            collect_args = {
+                "selector": combined_selector,
+                "margin": viewport_margin,
+                "limit": MAX_ELEMENTS,
+                "repeatedWeight": REPEATED_WEIGHT,
+                "ignoredHrefs": ignored_href_strings,
+            }
+            frame_results = await asyncio.gather(
+                *[call_bundle(frame, "collectElements", collect_args) for _, frame in frames],
+                return_exceptions=True
+            )
 
         async with Timer("Process elements"):
             structured_elements: List[Dict[str, Any]] = []
-            
-            # JavaScript function as a single line with proper escaping
-            js_element_info = """
-                (element) => {
-                    const rect = element.getBoundingClientRect();
-                    const computedStyle = window.getComputedStyle(element);
-                    return {
-                        tag: element.tagName.toLowerCase(),
-                        type: element.type || undefined,
-                        id: element.id || undefined,
-                        name: element.name || undefined,
-                        value: element.value || undefined,
-                        href: element.getAttribute('href') || undefined,
-                        src: element.src || undefined,
-                        placeholder: element.placeholder || undefined,
-                        ariaLabel: element.getAttribute('aria-label') || undefined,
-                        ariaDescribedby: element.getAttribute('aria-describedby') || undefined,
-                        role: element.getAttribute('role') || undefined,
-                        title: element.title || undefined,
-                        text: (element.innerText || '').substring(0, 100),
-                        isVisible: rect.width > 0 && rect.height > 0 && computedStyle.display !== 'none' && computedStyle.visibility !== 'hidden',
-                        disabled: element.disabled || false,
-                        checked: element.checked || undefined,
-                        selected: element.selected || undefined,
-                        multiple: element.multiple || undefined
-                    };
-                }
-                """.replace('\n', ' ').strip()
+            group_counts: Dict[str, int] = {}
+            used = 0.0
 
-            ignored_tags = []
-            ignored_href_strings = ["policy", "policies", "facebook", "store", "googleadservices", "instagram"]
-            MAX_LINKS = 40
-            MAX_ELEMENTS = 100
+            elements = []
+            for (index, frame), infos in zip(frames, frame_results):
+                if isinstance(infos, Exception):
+                    print(f"Error reading frame {frame.url}: {infos}")
+                    continue
+                for info in infos:
+                    # Elements outside the main frame are addressed as frame[index]::selector
+                    if index > 0:
+                        info["frame"] = index
+                    elements.append(info)
 
-            for element in elements:
+            for element_info in elements:
                 try:
-                    # Get element info using the JavaScript function
-                    element_info = await element.evaluate(js_element_info)
-                    
                     # Clean up the element info by removing undefined values
                     element_info = {k: v for k, v in element_info.items() if k is not None and v is not None and v != "undefined"}
                     
@@ -109,8 +110,6 @@ async def get_page_elements(page: Page) -> str:
                         continue
 
                     if element_info.get("tag") == "a":
-                        if MAX_LINKS == 0:
-                            continue
                         if element_info.get("href") == None:
                             continue
                         
@@ -121,14 +120,16 @@ async def get_page_elements(page: Page) -> str:
                                 break
                         if ignored:
                             continue
-                        MAX_LINKS -= 1
 
                     element_info.pop("disabled", None)
                     element_info.pop("isVisible", None)
                     
                     structured_elements.append(element_info)
 
-                    if len(structured_elements) > MAX_ELEMENTS:
+                    group = element_info.get("group", "")
+                    group_counts[group] = group_counts.get(group, 0) + 1
+                    used += REPEATED_WEIGHT if group_counts[group] > 3 else 1
+                    if used > MAX_ELEMENTS:
                         break
                     
                 except Exception as e:
@@ -203,26 +204,27 @@ async def get_focused_element_info(page: Page) -> Dict[str, Any]:
         focused = await page.evaluate(js_focused)
         return focused if focused else {"info": "No element currently focused"}
 
-async def get_main_content(page: Page) -> str:
+async def get_main_content(page: Page, max_chars: Optional[int] = 1500) -> str:
     """
-    Extract the main content of the page.
+    Extract the main content of the page, cut to max_chars (None for all of it).
     """
     async with Timer("Get main content"):
         js_main_content = """
-        () => {
+        (maxChars) => {
+            const cut = (text) => maxChars === null ? text : text.substring(0, maxChars);
             const mainSelectors = ['main', '[role="main"]', '#main-content', '#content', 'article', '.main-content'];
             for (const selector of mainSelectors) {
                 const element = document.querySelector(selector);
-                if (element) return element.innerText.substring(0, 1500);
+                if (element) return cut(element.innerText);
             }
             const textNodes = Array.from(document.body.querySelectorAll('p, h1, h2, h3, h4, h5, h6'))
                 .filter(el => el.innerText.trim().length > 0);
             if (textNodes.length > 0) {
-                return textNodes.map(node => node.innerText).join('\\n\\n').substring(0, 1500);
+                return cut(textNodes.map(node => node.innerText).join('\\n\\n'));
             }
             return "No main content found";
         }
         """.replace('\n', ' ').strip()
         
-        main_content = await page.evaluate(js_main_content)
+        main_content = await page.evaluate(js_main_content, max_chars)
         return main_content
\ No newline at end of file
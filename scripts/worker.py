@@ -6,38 +6,123 @@ from playwright.async_api import Page
 from openai import AsyncOpenAI
 from typing import Dict, Any, Union
 from pathlib import Path
+from urllib.parse import urlparse
 import traceback
 import base64
+import re
+import uuid
 
 # Import web tools and messages
-from web.web import get_page_elements, get_main_content
-from web.handler import process, test_selectors_on_page, enhance_json_with_selectors
+from web.web import get_page_elements
+from web.accessibility import get_ax_elements
+from web.fetch import fetch_url_text as http_fetch_text, format_fetch_result
+from web.research import read_urls as read_pages
+from web.reader import PageReader
+from web.capture import NetworkCapture, query_responses
+from web.records import extract_records as extract_page_records_tool
+from web.viewport import scroll_viewport, filter_new_elements, RegionCache, VIEWPORT_MARGIN
+from web.bundle import call_bundle
+from web.handler import process, resolve_selector
+from web.ranking import rank_snapshot, take_within_budget, build_snapshot, DEFAULT_TOKEN_BUDGET
+from web.profiler import Timer, metric_labels
+from web.tracing import tracer
+from web.log_writer import log_writer
 from tools import functions as web_tools
 from messages import MessageHistory, Message
 from orchestrator import Orchestrator
+from router import ModelRouter
+from macros import MacroLibrary, MACRO_TOOLS, FINGERPRINT_JS
+from site_knowledge import SiteKnowledge
+from metrics import TokenAccount, estimate_prompt_tokens, count_tokens
+
+# Explicit URLs or bare domains such as "news.ycombinator.com" in a prompt
+_URL_PATTERN = re.compile(r"https?://[^\s'\"<>]+|\b(?:[a-z0-9-]+\.)+(?:com|org|net|io|dev|ai|gov|edu|co|uk|de|in)\b", re.IGNORECASE)
+
+def _is_error_result(result: Any) -> bool:
+    """Tool methods report failures as strings rather than raising."""
+    return str(result).startswith(("Error", "Invalid XPath", "Multiple elements"))
 
 class Worker:
-    def __init__(self, page: Page, worker_id: int, request_queue, api: str, model: str, max_messages: int, tools=None, websocket=None, enable_vision=False):
+    def __init__(self, page: Page, worker_id: int, request_queue, api: str, model: str, max_messages: int, tools=None, websocket=None, enable_vision=False, config=None):
         """Initialize a worker with a browser page and configuration."""
         self.page = page
+        self.config: Dict[str, str] = config or {}
         self.worker_id = worker_id
         self.api = api
         self.model = model
         self.max_messages = max_messages
         self.element_cache: Dict[str, str] = {}
+        # Lower-ranked elements of the last snapshot, paged through with get_more_elements
+        self.snapshot_token_budget = int(self.config.get("snapshot_token_budget", DEFAULT_TOKEN_BUDGET))
+        self._remaining_elements = []
+        self._remaining_total = 0
+        self._remaining_url = None
+
+        # Extraction backend: "dom" (CSS selector scan) or "ax" (Chromium accessibility tree), per site
+        self.extraction_backend = self.config.get("extraction_backend", "dom").strip().lower()
+        self.ax_backend_sites = {
+            site.strip().lower().removeprefix("www.")
+            for site in self.config.get("ax_backend_sites", "").split(",") if site.strip()
+        }
+
+        # "viewport" snapshots only what is on or near the screen; scroll_and_extract reveals the rest
+        self.extraction_mode = self.config.get("extraction_mode", "full").strip().lower()
+        self.region_cache = RegionCache()
+        self._seen_elements = set()
+        self._seen_url = None
+
+        # JSON the page's scripts fetch (search results, feeds), queryable without scraping the rendered DOM
+        self.network_capture = NetworkCapture()
+        if page is not None:
+            self.network_capture.attach(page)
+
+        # Full main text of read pages, chunked and cached per URL and DOM version
+        self.page_reader = PageReader(
+            chunk_tokens=int(self.config.get("read_chunk_tokens", "800")),
+            count_tokens=self._count_tokens,
+        )
         self.client = None
         self.is_running = True
         self.waiting_for_input = False
         self.current_task = "Initializing"
         self.tools = tools or web_tools
         self.messages = self._init_message_history()
+        self._logged_seq = -1  # Last message sequence number written to the chat log
         self.websocket = websocket
         self.enable_vision = enable_vision
         self.first_step_over = False
+        self.session_id = "terminal"
         
         # Initialize orchestrator
-        self.orchestrator = Orchestrator(model=model)
+        self.orchestrator = Orchestrator(
+            model=model,
+            revalidate_cached_plans=self._config_flag("revalidate_cached_plans")
+        )
         self.current_workflow = None
+        self._planning_task = None
+        self._speculation = None
+        self._speculation_url = None
+        self._workflow_span = None
+        self.router = None
+        self.token_usage = None  # TokenAccount for the current workflow
+
+        # Recorded tool-call sequences replayed without the LLM
+        self.macros = MacroLibrary() if self._config_flag("enable_macros") else None
+        self._macro_trace = []
+        self._trace_task_index = None
+        self._macro_replayed = False
+
+        # Selectors that worked (or kept failing) on previously visited sites
+        self.site_knowledge = SiteKnowledge(
+            max_age_days=float(self.config.get("site_knowledge_max_age_days", "30"))
+        ) if self._config_flag("enable_site_knowledge", True) else None
+
+    def _config_flag(self, key: str, default: bool = False) -> bool:
+        """Read a true/false option from api_config.cfg."""
+        value = self.config.get(key)
+        if value is None:
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
 
     def _init_message_history(self) -> MessageHistory:
         """Initialize the message history with system prompt."""
@@ -58,6 +143,13 @@ IMPORTANT: You have access to the following tools to help complete your tasks. E
 5. click_element(xpathSelector: str) - Click on an element
 6. highlight_element(xpathSelector: str) - Highlight an element for visibility
 7. move_and_click_at_page_position(x: float, y: float) - Click at specific coordinates
+8. get_more_elements() - Get the next most relevant elements when the page contents say more are available
+9. scroll_and_extract(direction: str) - Scroll up or down one screen and get only the newly revealed elements
+10. fetch_url_text(url: str) - Read a page's text and links without opening it in the browser (much faster for articles and search results)
+11. read_urls(urls: list, question: str) - Read several pages at once and get the parts relevant to the question in one digest
+12. read_page(chunk: int, rank: bool) - Read the current page's main text one chunk at a time; rank=true puts the chunks most relevant to the task first
+13. query_network_json(url_pattern: str, json_path: str) - Query JSON the page loaded in the background; call without json_path first to list responses and their structure
+14. extract_records(container_selector: str, fields: dict, follow_next: bool, max_pages: int) - Extract every repeated record (rows, results, products) on the page in one call, optionally across pages
 
 Additionally, you have special tools to manage task status:
 - mark_task_complete(task_id: str, result: str) - Mark a task as successfully completed
@@ -69,6 +161,12 @@ Remember:
 - A task fails only when you've exhausted all possible approaches
 - Only mark a task complete when you've achieved its objective
 - You can make multiple tool calls within a single task
+- Elements marked known_good, and entries under known_good_selectors, have worked on this site before - prefer them
+- Use fetch_url_text when you only need to read a page; use move_to_url when you need to interact with it
+- To compare or research several results, pass their URLs to read_urls in one call instead of visiting them one by one
+- On web apps, data such as search results or listings is often easier to read with query_network_json than from the page contents
+- Entries with "repeated" list similar elements as a table: "template" holds the fields they share and each row of "rows" gives the varying "fields" of one element, including its own xpath_selector
+- Selectors such as frame[1]::... (element inside an iframe) or css::... (element inside a web component) are handles - pass them to tools unchanged
 """
 
         system_prompt = f'''You are an advanced AI agent capable of performing complex web-based tasks. Your capabilities include:
@@ -136,6 +234,16 @@ Instructions:
                 self.client = AsyncOpenAI(api_key="____", base_url='http://localhost:11434/v1')
             else:
                 raise ValueError(f"Unsupported API type: {self.api}")
+
+            # Cheap classification steps go to a small local model when enabled
+            local_model = self.config.get("local_routing_model") if self._config_flag("enable_local_routing") else None
+            self.router = ModelRouter(
+                self.client,
+                self.model,
+                local_model=local_model,
+                confidence_threshold=float(self.config.get("routing_confidence", 0.8))
+            )
+            self.orchestrator.router = self.router
                 
             print("API client initialized successfully")
         except Exception as e:
@@ -143,29 +251,136 @@ Instructions:
             raise
 
     async def process_user_input(self, user_input: str):
-        """Process user input by creating a workflow and starting execution."""
+        """Process user input by streaming a workflow plan and starting on the first task."""
+        # Each workflow is one trace; planning and every later step nest under it
+        self._end_workflow_trace("superseded")
+        self._workflow_span = tracer.start_span("workflow", root=True, worker=self.worker_id, prompt=user_input[:200])
+        self.token_usage = TokenAccount(self.model)
+        self.orchestrator.token_account = self.token_usage
+        with tracer.use_span(self._workflow_span):
+            return await self._start_workflow(user_input)
+
+    def _end_workflow_trace(self, status: str):
+        """Finish the current workflow trace so exporters receive it."""
+        if self._workflow_span is None:
+            return
+        if self.current_workflow:
+            self._workflow_span.attributes["title"] = self.current_workflow.title
+            self._workflow_span.attributes["tasks"] = len(self.current_workflow.tasks)
+        self._workflow_span.attributes["result"] = status
+        if self.token_usage:
+            self._workflow_span.attributes["prompt_tokens"] = self.token_usage.prompt_tokens
+            self._workflow_span.attributes["completion_tokens"] = self.token_usage.completion_tokens
+        tracer.end_span(self._workflow_span)
+        self._workflow_span = None
+
+    async def _start_workflow(self, user_input: str):
+        # Macro state belongs to one workflow; a new plan starts again at task 1
+        self._trace_task_index = None
+        self._macro_trace = []
+        self._macro_replayed = False
         try:
-            # Create workflow using orchestrator
-            self.current_workflow = await self.orchestrator.create_workflow(user_input)
-            
-            # Send initial workflow info to user
-            workflow_msg = f"\nAuto Browser: Created workflow: {self.current_workflow.title}\n"
-            for i, task in enumerate(self.current_workflow.tasks, 1):
-                workflow_msg += f"\n{i}. {task.title}\n"
-                workflow_msg += f"   Description: {task.description}\n"
-            
-            await self.send_to_websocket(workflow_msg)
-            
+            # Start loading an obvious target URL while the plan is still being generated
+            previous_url = self.page.url
+            speculative_url = self._find_speculative_url(user_input)
+            if speculative_url:
+                print(f"[Worker] Speculatively navigating to {speculative_url}")
+                self._speculation_url = speculative_url
+                self._speculation = asyncio.create_task(
+                    self.page.goto(speculative_url, wait_until="domcontentloaded", timeout=30000)
+                )
+
+            # Return as soon as task 1 is parsed; the rest of the plan streams in the background
+            plan_stream = self.orchestrator.stream_workflow(user_input)
+            try:
+                first_task = await plan_stream.__anext__()
+            except StopAsyncIteration:
+                raise ValueError("Planner returned no tasks")
+            self.current_workflow = self.orchestrator.current_workflow
+            await self._resolve_speculation([first_task], previous_url)
+
+            self._planning_task = asyncio.create_task(self._finish_planning(plan_stream))
+            await self.send_to_websocket(
+                f"\nAuto Browser: Starting workflow: {self.current_workflow.title}\n"
+                f"\n1. {first_task.title}\n   Description: {first_task.description}\n"
+            )
+
             # Start executing workflow
             return True
-            
+
         except Exception as e:
+            await self._cancel_speculation()
             error_msg = f"Error processing user input: {str(e)}"
             await self.send_to_websocket(error_msg)
             return False
 
+    async def _finish_planning(self, plan_stream):
+        """Consume the rest of the streamed plan and show the full workflow."""
+        try:
+            async for task in plan_stream:
+                print(f"[Worker] Planned task {len(self.current_workflow.tasks)}: {task.title}")
+        except Exception as e:
+            print(f"[Worker] Planning stopped early, continuing with {len(self.current_workflow.tasks)} task(s): {e}")
+
+        workflow_msg = f"\nAuto Browser: Created workflow: {self.current_workflow.title}\n"
+        for i, task in enumerate(self.current_workflow.tasks, 1):
+            workflow_msg += f"\n{i}. {task.title}\n"
+            workflow_msg += f"   Description: {task.description}\n"
+        await self.send_to_websocket(workflow_msg)
+
+    async def _wait_for_planning(self):
+        """Block until the streamed plan is complete so task counts are final."""
+        if self._planning_task and not self._planning_task.done():
+            await self._planning_task
+
+    def _find_speculative_url(self, text: str) -> Union[str, None]:
+        """Return the single URL or domain named in the prompt, if there is exactly one."""
+        candidates = {match.group(0).rstrip(".,;:)") for match in _URL_PATTERN.finditer(text)}
+        if len(candidates) != 1:
+            return None
+        url = candidates.pop()
+        return url if url.startswith("http") else f"https://{url}"
+
+    async def _resolve_speculation(self, tasks, previous_url: str):
+        """
+        Keep the speculative page if the plan refers to it, otherwise roll back.
+        Only the first task is checked: it starts running on this page right away, so
+        the rest of the plan arrives too late to roll back safely. A later task that
+        navigates elsewhere cancels the speculation in move_to_url instead.
+        """
+        if not self._speculation:
+            return
+        host = urlparse(self._speculation_url).netloc.lower().removeprefix("www.")
+        plan_text = " ".join(f"{t.title} {t.description}" for t in tasks).lower()
+        if host and host in plan_text:
+            print(f"[Worker] Plan agrees with speculative navigation to {host}")
+            return
+        print(f"[Worker] Plan does not use {host}, rolling back speculative navigation")
+        await self._cancel_speculation()
+        try:
+            await self.page.goto(previous_url or "about:blank")
+        except Exception as e:
+            print(f"[Worker] Could not roll back speculative navigation: {e}")
+
+    async def _cancel_speculation(self):
+        """Stop any in-flight speculative navigation."""
+        if self._speculation:
+            self._speculation.cancel()
+            try:
+                await self._speculation
+            except BaseException:
+                pass
+        self._speculation = None
+        self._speculation_url = None
+
     async def step(self) -> bool:
         """Execute the next step in the workflow."""
+        with metric_labels(worker=self.worker_id, session=self.session_id, domain=SiteKnowledge.domain_of(self.page.url)):
+            with tracer.use_span(self._workflow_span):
+                async with Timer("worker.step"):
+                    return await self._step()
+
+    async def _step(self) -> bool:
         if not self.current_workflow:
             return False
 
@@ -176,6 +391,7 @@ Instructions:
             # Stop if there are no more tasks
             if not current_task:
                 await self.send_to_websocket("\nAuto Browser: Workflow completed! Let me know if you need anything else.")
+                self._end_workflow_trace("completed")
                 return False
 
             # Update progress - ensure we handle websocket errors gracefully
@@ -191,7 +407,8 @@ Instructions:
             print(f"[Worker] Task index: {current_task['progress']['current_task']}/{current_task['progress']['total_tasks']}")
 
             # Execute the task
-            active = await self._execute_step(current_task)
+            async with Timer("worker.execute_step"):
+                active = await self._execute_step(current_task)
             print(f"[Worker] Task execution result - active: {active}")
 
             return True
@@ -252,10 +469,30 @@ Instructions:
                     "type": "progress_update",
                     "data": display_progress
                 }
-                await self.websocket.send_text(json.dumps(progress_msg))
+                async with Timer("websocket.send"):
+                    await self.websocket.send_text(json.dumps(progress_msg))
             except Exception as e:
                 print(f"Error sending progress update: {e}")
 
+    async def _record_tokens(self, estimate: Dict[str, int], response, content: str, tool_calls) -> None:
+        """Add a step's tokens to the workflow totals and push them to the dashboard."""
+        if self.token_usage is None:
+            self.token_usage = TokenAccount(self.model)
+        completion_estimate = count_tokens(content, self.model) + sum(
+            count_tokens(tc.function.name + tc.function.arguments, self.model) for tc in tool_calls
+        )
+        counted = self.token_usage.record("worker_step", estimate, getattr(response, "usage", None), completion_estimate)
+        top = ", ".join(f"{category}={tokens}" for category, tokens in sorted(estimate.items(), key=lambda item: -item[1])[:3])
+        print(f"[Worker] Tokens: prompt {counted['prompt']} (estimated {sum(estimate.values())}: {top}), "
+              f"completion {counted['completion']}, workflow total {self.token_usage.prompt_tokens + self.token_usage.completion_tokens}")
+
+        if self.websocket:
+            try:
+                async with Timer("websocket.send"):
+                    await self.websocket.send_text(json.dumps({"type": "token_update", "data": self.token_usage.to_dict()}))
+            except Exception as e:
+                print(f"Error sending token update: {e}")
+
     async def move_to_url(self, url: str) -> str:
         """Navigate to a URL with retry logic and error handling."""
         max_retries = 3
@@ -263,32 +500,50 @@ Instructions:
         last_error = None
         self.first_step_over = True
 
+        # Reuse a speculative navigation to the same URL instead of loading it again;
+        # one to a different URL is cancelled rather than waited for
+        if self._speculation and self._speculation_url.rstrip("/") == url.rstrip("/"):
+            speculation = self._speculation
+            self._speculation = None
+            self._speculation_url = None
+            try:
+                await speculation
+                print(f"Using speculatively loaded page: {self.page.url}")
+                contents = await self.get_url_contents()
+                self.element_cache[self.page.url] = contents
+                return f"Navigated to {url}. Contents: {contents}"
+            except Exception as e:
+                print(f"Speculative navigation failed, loading normally: {e}")
+        else:
+            await self._cancel_speculation()
+
         while retry_count < max_retries:
             try:
                 # Try different navigation options based on retry count
-                if retry_count == 0:
-                    # First attempt: Standard navigation with longer timeout
-                    await self.page.goto(url, wait_until="domcontentloaded", timeout=30000)
-                elif retry_count == 1:
-                    # Second attempt: Force HTTP1.1 and clear cache/cookies
-                    await self.page.context.clear_cookies()
-                    await self.page.route("**/*", lambda route: route.continue_(
-                        headers={"Accept": "*/*", "Upgrade-Insecure-Requests": "1", "Connection": "keep-alive"}
-                    ))
-                    await self.page.goto(url, wait_until="domcontentloaded", timeout=45000)
-                else:
-                    # Final attempt: Network conditions and different wait strategy
-                    await self.page.context.clear_cookies()
-                    await self.page.set_extra_http_headers({"Accept-Encoding": "gzip, deflate"})
-                    await self.page.goto(url, wait_until="load", timeout=60000)
+                async with Timer("navigation", attempt=retry_count + 1):
+                    if retry_count == 0:
+                        # First attempt: Standard navigation with longer timeout
+                        await self.page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                    elif retry_count == 1:
+                        # Second attempt: Force HTTP1.1 and clear cache/cookies.
+                        # Extra headers replace earlier ones, unlike page.route which would stack a handler per retry
+                        await self.page.context.clear_cookies()
+                        await self.page.set_extra_http_headers({"Accept": "*/*", "Upgrade-Insecure-Requests": "1", "Connection": "keep-alive"})
+                        await self.page.goto(url, wait_until="domcontentloaded", timeout=45000)
+                    else:
+                        # Final attempt: Network conditions and different wait strategy
+                        await self.page.context.clear_cookies()
+                        await self.page.set_extra_http_headers({"Accept-Encoding": "gzip, deflate"})
+                        await self.page.goto(url, wait_until="load", timeout=60000)
 
                 # Wait for network to be idle and add small delay
-                try:
-                    await self.page.wait_for_load_state("networkidle", timeout=5000)
-                except:
-                    pass  # Don't fail if networkidle times out
-                
-                await asyncio.sleep(2)
+                async with Timer("readiness_wait"):
+                    try:
+                        await self.page.wait_for_load_state("networkidle", timeout=5000)
+                    except:
+                        pass  # Don't fail if networkidle times out
+                    
+                    await asyncio.sleep(2)
                 print(f"Successfully navigated to: {url} (attempt {retry_count + 1})")
                 
                 # Get new page contents
@@ -315,6 +570,62 @@ Instructions:
         print(error_msg)
         return f"Error navigating to URL: {error_msg}"
 
+    async def fetch_url_text(self, url: str) -> str:
+        """Read a page over plain HTTP, falling back to the browser when it needs JavaScript or a login."""
+        result = await http_fetch_text(url)
+        if result.get("needs_browser"):
+            print(f"[Worker] {url} needs the browser ({result['needs_browser']}), navigating instead")
+            return f"Page could not be read without the browser ({result['needs_browser']}), opened it instead.\n" + await self.move_to_url(url)
+        print(f"[Worker] Fetched {url} without the browser ({len(result['text'])} chars)")
+        return format_fetch_result(result)
+
+    async def read_urls(self, urls, question: str = "") -> str:
+        """Read several pages concurrently (HTTP first, pooled tabs otherwise) into one digest."""
+        if isinstance(urls, str):
+            urls = [u for u in re.split(r"[\s,]+", urls) if u]
+        if not urls:
+            return "Error: no URLs given"
+        try:
+            max_tabs = int(self.config.get("read_urls_max_tabs", "4"))
+            return await read_pages(self.page.context, urls, question, max_tabs=max_tabs)
+        except Exception as e:
+            return f"Error reading URLs: {str(e)}"
+
+    async def read_page(self, chunk: int = 1, rank: bool = False) -> str:
+        """Read a chunk of the current page's main text, optionally ordered by relevance to the task."""
+        try:
+            if isinstance(rank, str):
+                rank = rank.strip().lower() in ("1", "true", "yes")
+            query = self._current_task_text() if rank else None
+            return await self.page_reader.read(self.page, int(chunk), query)
+        except Exception as e:
+            return f"Error reading page: {str(e)}"
+
+    async def query_network_json(self, url_pattern: str = "", json_path: str = "") -> str:
+        """List or query the JSON responses captured since the last navigation."""
+        try:
+            await self.network_capture.settle()
+            return query_responses(self.network_capture, url_pattern, json_path)
+        except ValueError as e:
+            return f"Error: {str(e)}. Supported: $, .key, ['key'], [n], [*], .* and ..key"
+        except Exception as e:
+            return f"Error querying network responses: {str(e)}"
+
+    async def extract_records(self, container_selector: str, fields, follow_next=False, max_pages: int = 1) -> str:
+        """Scrape all records matching container_selector in one in-page pass, optionally following pagination."""
+        try:
+            if isinstance(follow_next, str) and follow_next.strip().lower() in ("true", "false", ""):
+                follow_next = follow_next.strip().lower() == "true"
+            max_pages = max(1, min(int(max_pages), int(self.config.get("extract_records_max_pages", "20"))))
+            return await extract_page_records_tool(
+                self.page, container_selector, fields, follow_next=follow_next, max_pages=max_pages,
+                max_tabs=int(self.config.get("read_urls_max_tabs", "4")), worker_id=self.worker_id,
+            )
+        except ValueError as e:
+            return f"Error: {str(e)}"
+        except Exception as e:
+            return f"Error extracting records: {str(e)}"
+
     async def get_url_contents(self) -> str:
         """Retrieve and cache the current page's contents."""
         cache_key = self.page.url
@@ -327,19 +638,25 @@ Instructions:
         
         try:
             # Wait for page to be ready
-            await self.page.wait_for_load_state("domcontentloaded", timeout=10000)
-            await asyncio.sleep(2)  # Give time for dynamic content
-            
-            try:
-                # Try to wait for network to be idle, but don't fail if it times out
-                await self.page.wait_for_load_state("networkidle", timeout=5000)
-            except Exception as e:
-                print(f"Warning: Network not idle, continuing anyway: {e}")
+            async with Timer("readiness_wait"):
+                await self.page.wait_for_load_state("domcontentloaded", timeout=10000)
+                await asyncio.sleep(2)  # Give time for dynamic content
+                
+                try:
+                    # Try to wait for network to be idle, but don't fail if it times out
+                    await self.page.wait_for_load_state("networkidle", timeout=5000)
+                except Exception as e:
+                    print(f"Warning: Network not idle, continuing anyway: {e}")
             
             try:
                 # Get page elements and process them into JSON
-                elements = await get_page_elements(self.page)
-                elements_info = await process(self, elements)
+                with metric_labels(domain=SiteKnowledge.domain_of(self.page.url)):
+                    elements = await self._extract_elements()
+                    # Scrolling later only reports elements that aren't in this snapshot
+                    self._seen_elements = set()
+                    self._seen_url = self.page.url
+                    elements, _ = filter_new_elements(elements, self._seen_elements)
+                    elements_info = await self._rank_and_process(elements)
                 
                 # Cache and return only the JSON data
                 self.element_cache[cache_key] = elements_info
@@ -360,19 +677,120 @@ Instructions:
                 "details": str(e)
             })
 
+    def _current_task_text(self) -> str:
+        current = self.orchestrator.get_current_task()
+        return f"{current['task_title']} {current['task']}" if current else ""
+
+    async def _rank_and_process(self, elements: str) -> str:
+        """Keep the elements most relevant to the current task within the token budget and add selectors."""
+        async with Timer("rank_elements"):
+            elements, self._remaining_elements = rank_snapshot(
+                elements, self._current_task_text(), self.snapshot_token_budget, self._count_tokens
+            )
+            snapshot = json.loads(elements)
+            self._remaining_total = snapshot["total_elements"]
+            self._remaining_url = self.page.url
+            if self.extraction_mode == "viewport":
+                snapshot["viewport"] = {"hint": "Only elements on or near the screen are listed. Call scroll_and_extract('down') to see more of the page."}
+                elements = json.dumps(snapshot, indent=2)
+        return await process(self, elements)
+
+    async def _extract_elements(self, viewport_margin=None) -> str:
+        """Snapshot the page with the backend configured for this site, falling back to the DOM scan."""
+        domain = SiteKnowledge.domain_of(self.page.url)
+        if viewport_margin is None and self.extraction_mode == "viewport":
+            viewport_margin = VIEWPORT_MARGIN
+        # The accessibility tree has no layout positions, so scrolling always uses the DOM scan
+        if viewport_margin is None and (self.extraction_backend == "ax" or domain in self.ax_backend_sites):
+            try:
+                elements = await get_ax_elements(self.page)
+                if json.loads(elements)["total_elements"] > 0:
+                    return elements
+                print(f"[Worker] Accessibility tree for {domain} has no usable elements, falling back to DOM extraction")
+            except Exception as e:
+                print(f"[Worker] Accessibility extraction failed for {domain} ({e}), falling back to DOM extraction")
+        return await get_page_elements(self.page, viewport_margin=viewport_margin)
+
+    async def scroll_and_extract(self, direction: str = "down") -> str:
+        """Scroll one screen up or down and return only elements that weren't seen on this page yet."""
+        direction = direction.strip().lower()
+        if direction not in ("up", "down"):
+            return "Error: direction must be 'up' or 'down'"
+        try:
+            if self._seen_url != self.page.url:
+                self._seen_elements = set()
+                self._seen_url = self.page.url
+            position = await scroll_viewport(self.page, direction)
+            if not position["moved"]:
+                return f"Already at the {'top' if direction == 'up' else 'bottom'} of the page, nothing new to show."
+
+            # Give lazy-loaded and infinite-scroll content time to render
+            await asyncio.sleep(1)
+            position = await scroll_viewport(self.page, "none")
+            region_key = self.region_cache.key(self.page.url, position)
+            cached = self.region_cache.get(region_key)
+            if cached is not None:
+                return f"Region seen before, cached contents:\n{cached}"
+
+            with metric_labels(domain=SiteKnowledge.domain_of(self.page.url)):
+                elements = await self._extract_elements(viewport_margin=0)
+                # Elements in a scrolled container move with it, so key them by position within the container
+                offset = position["scrollTop"] if position["container"] else 0
+                elements, new_count = filter_new_elements(elements, self._seen_elements, offset)
+                if new_count == 0:
+                    return "Scrolled, but no new elements were revealed."
+                result = await self._rank_and_process(elements)
+            self.region_cache.put(region_key, result)
+            return result
+        except Exception as e:
+            return f"Error scrolling: {str(e)}"
+
+    def _count_tokens(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    async def get_more_elements(self) -> str:
+        """Return the next batch of lower-ranked elements from the last page snapshot."""
+        if self._remaining_url != self.page.url:
+            return "Error: The page has changed since the last snapshot. Call get_url_contents first."
+        if not self._remaining_elements:
+            return "No more elements available on this page."
+        try:
+            batch, self._remaining_elements = take_within_budget(
+                self._remaining_elements, self.snapshot_token_budget, self._count_tokens
+            )
+            elements = build_snapshot(batch, self._remaining_total, len(self._remaining_elements))
+            with metric_labels(domain=SiteKnowledge.domain_of(self.page.url)):
+                return await process(self, elements)
+        except Exception as e:
+            return f"Error getting more elements: {str(e)}"
+
+    async def _record_selector(self, domain: str, xpathSelector: str, success: bool) -> None:
+        """Remember whether a selector worked on this site."""
+        if not self.site_knowledge:
+            return
+        # SQLite writes and commits block, keep them off the event loop
+        if success:
+            await asyncio.to_thread(self.site_knowledge.record_success, domain, xpathSelector)
+        else:
+            await asyncio.to_thread(self.site_knowledge.record_failure, domain, xpathSelector)
+
     async def send_keys_to_element(self, xpathSelector: str, keys: str) -> str:
         """Send keys to an element identified by xpath."""
+        domain = SiteKnowledge.domain_of(self.page.url)
         locator, error = await self._get_locator(xpathSelector)
         if error:
+            await self._record_selector(domain, xpathSelector, False)
             return error
         try:
             await locator.click(force=True)
             await locator.fill("")
             await self.highlight_element(xpathSelector)
             await locator.type(keys, delay=10)
+            await self._record_selector(domain, xpathSelector, True)
             await asyncio.sleep(2)
             return f"Keys sent. Contents: {await self.get_url_contents()}"
         except Exception as e:
+            await self._record_selector(domain, xpathSelector, False)
             return f"Error sending keys: {str(e)}"
 
     async def call_submit(self, xpathSelector: str) -> str:
@@ -392,15 +810,14 @@ Instructions:
 
     async def click_element(self, xpathSelector: str) -> str:
         """Click an element identified by xpath."""
+        domain = SiteKnowledge.domain_of(self.page.url)
         locator, error = await self._get_locator(xpathSelector)
         if error:
+            await self._record_selector(domain, xpathSelector, False)
             return error
         try:
             # Wait for element to be present and visible
-            await self.page.wait_for_selector(f"xpath={xpathSelector}", 
-                state="visible", 
-                timeout=10000
-            )
+            await locator.wait_for(state="visible", timeout=10000)
             
             # Ensure page is loaded
             await self.page.wait_for_load_state("domcontentloaded")
@@ -417,10 +834,12 @@ Instructions:
             
             # Click with force if needed
             await locator.click(force=True, timeout=5000)
+            await self._record_selector(domain, xpathSelector, True)
             await asyncio.sleep(3)  # Wait for any navigation/changes
             
             return f"Element clicked. Contents: {await self.get_url_contents()}"
         except Exception as e:
+            await self._record_selector(domain, xpathSelector, False)
             return f"Error clicking element: {str(e)}"
 
     async def highlight_element(self, xpathSelector: str, color='red', duration=5000) -> str:
@@ -432,17 +851,7 @@ Instructions:
             bounding_box = await locator.bounding_box()
             if bounding_box:
                 box_data = {'box': bounding_box, 'color': color, 'duration': duration}
-                await self.page.evaluate(
-                    '''(data) => {
-                        const div = document.createElement('div');
-                        div.style.cssText = `position:absolute;z-index:9999;border:4px solid ${data.color};pointer-events:none;`;
-                        div.style.left = `${data.box.x + window.scrollX}px`;
-                        div.style.top = `${data.box.y + window.scrollY}px`;
-                        div.style.width = `${data.box.width}px`;
-                        div.style.height = `${data.box.height}px`;
-                        document.body.appendChild(div);
-                        setTimeout(() => div.parentNode?.removeChild(div), data.duration);
-                    }''', box_data)
+                await call_bundle(self.page, "highlight", box_data)
             return "Element highlighted"
         except Exception as e:
             print(f"Error highlighting: {e}")
@@ -464,10 +873,11 @@ Instructions:
             return f"Error clicking at position: {str(e)}"
 
     async def _get_locator(self, xpathSelector: str, first_only=False) -> tuple[Any, str]:
-        """Retrieve a locator for an xpath, handling multiple matches."""
-        selector = f"xpath={xpathSelector}"
+        """Retrieve a locator for an xpath or frame/shadow handle, handling multiple matches."""
+        selector = xpathSelector
         try:
-            locator = self.page.locator(selector)
+            root, selector = resolve_selector(self.page, xpathSelector)
+            locator = root.locator(selector)
             count = await locator.count()
             if (count == 0):
                 return None, "Invalid XPath: No elements found"
@@ -503,7 +913,8 @@ Instructions:
             # Regular messages go to dashboard
             print(f"[Worker] Attempting to send to websocket {id(self.websocket)}: {message[:50].strip()}...") # Log attempt
             try:
-                await self.websocket.send_text(message.strip())
+                async with Timer("websocket.send"):
+                    await self.websocket.send_text(message.strip())
                 print(f"[Worker] Sent message successfully to {id(self.websocket)}.") # Log success
             except Exception as e:
                 print(f"[Worker] Error sending to websocket {id(self.websocket)}: {e}") # Log error
@@ -564,12 +975,21 @@ Instructions:
                 await self.display_message(error_msg)
                 return False
 
+            # Replay a recorded macro the first time we see a task
+            task_index = int(task_info['task_id']) - 1
+            if self._trace_task_index != task_index:
+                self._trace_task_index = task_index
+                self._macro_trace = []
+                self._macro_replayed = False
+                if self.macros and await self._replay_macro(task_info):
+                    return False
+
             # Add current task to messages
             self.messages.add_system_text(f"""Current task: {task_info['task_description']}
 Task ID: {task_info['task_id']}
 Execute this task using the available tools. Only mark the task as complete when you have fully achieved its objective, or mark it as failed if you've exhausted all possible approaches.""")
 
-            # Log messages to chat.log
+            # Log new messages to chat.jsonl
             await self._log_messages()
             print("Messages logged")
 
@@ -619,22 +1039,34 @@ Execute this task using the available tools. Only mark the task as complete when
                     # Clean up temp file
                     temp_path.unlink()
 
+            # Let the local model spot tasks that are already done before paying for a full step
+            if self.router and self.router.enabled and await self._detect_task_completion(task_info):
+                return False
+
             print("Getting response from API")
             # Get response from API
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=self.messages.get_messages_for_api(),
-                tools=self.tools,
-                tool_choice="auto",
-                temperature=0.3,
-                stream=False
-            )
+            api_messages = self.messages.get_messages_for_api()
+            token_estimate = estimate_prompt_tokens(api_messages, self.model, self.tools)
+            start = time.monotonic()
+            async with Timer("llm_call", model=self.model):
+                response = await self.client.chat.completions.create(
+                    model=self.model,
+                    messages=api_messages,
+                    tools=self.tools,
+                    tool_choice="auto",
+                    temperature=0.3,
+                    stream=False
+                )
+            if self.router:
+                self.router.record_large_latency(time.monotonic() - start)
             print(f"Response: {response}")
             
             # Extract content and tool calls
             content = response.choices[0].message.content or ""
             tool_calls = response.choices[0].message.tool_calls or []
 
+            await self._record_tokens(token_estimate, response, content, tool_calls)
+
             # Process tool calls if any
             if tool_calls:
                 # First collect all tool responses
@@ -653,8 +1085,15 @@ Execute this task using the available tools. Only mark the task as complete when
                     if hasattr(self, function_name):
                         try:
                             tool_function = getattr(self, function_name)
-                            result = await tool_function(**arguments)
+                            # Fingerprint the target before acting on it, the element may be gone afterwards
+                            fingerprint = None
+                            if self.macros and function_name in MACRO_TOOLS and "xpathSelector" in arguments:
+                                fingerprint = await self._fingerprint(arguments["xpathSelector"])
+                            async with Timer(f"tool.{function_name}"):
+                                result = await tool_function(**arguments)
                             tool_responses.append((tool_call.id, result, function_name))
+                            if self.macros and function_name in MACRO_TOOLS and not _is_error_result(result):
+                                self._macro_trace.append({"tool": function_name, "arguments": arguments, "fingerprint": fingerprint})
                             
                             # Print result
                             print(f"Result: {str(result)[:500]}")
@@ -716,42 +1155,124 @@ Execute this task using the available tools. Only mark the task as complete when
                 await self.display_message(f"Error: {str(e)}")
             return False  # Stop processing on error
 
+    async def _fingerprint(self, xpathSelector: str) -> Union[str, None]:
+        """Describe the single element a selector resolves to, or None if it is ambiguous."""
+        locator, error = await self._get_locator(xpathSelector)
+        if error:
+            return None
+        try:
+            return await locator.evaluate(FINGERPRINT_JS)
+        except Exception:
+            return None
+
+    async def _replay_macro(self, task_info: Dict[str, Any]) -> bool:
+        """Replay a recorded macro for the task. Returns True if it ran to completion."""
+        steps = self.macros.lookup(task_info['task_description'])
+        if not steps:
+            return False
+
+        self._macro_replayed = True
+        print(f"[Macros] Replaying {len(steps)} step(s) for task {task_info['task_id']}")
+        for i, step in enumerate(steps, 1):
+            selector = step["arguments"].get("xpathSelector")
+            if selector and step["fingerprint"]:
+                current = await self._fingerprint(selector)
+                if current != step["fingerprint"]:
+                    return self._macro_diverged(i, step, f"expected element '{step['fingerprint']}', found '{current}'")
+
+            try:
+                result = await getattr(self, step["tool"])(**step["arguments"])
+            except Exception as e:
+                result = f"Error executing {step['tool']}: {str(e)}"
+
+            # Keep the replay in history so the model has context if it takes over
+            call_id = f"macro_{uuid.uuid4().hex[:8]}"
+            self.messages.add_message(Message(
+                role="assistant",
+                content="",
+                tool_calls=[{
+                    "id": call_id,
+                    "type": "function",
+                    "function": {"name": step["tool"], "arguments": json.dumps(step["arguments"])}
+                }]
+            ))
+            self.messages.add_tool_response(call_id, result, step["tool"])
+
+            if _is_error_result(result):
+                return self._macro_diverged(i, step, str(result)[:200])
+            self._macro_trace.append(step)
+
+        # The steps ran, but the page may still show a different outcome than last time
+        if self.router and self.router.enabled and await self._detect_task_completion(task_info):
+            return True
+        print(f"[Macros] Replayed {len(steps)} step(s), handing task {task_info['task_id']} to the model to verify")
+        self.messages.add_system_text(
+            f"A recorded macro for this task replayed all {len(steps)} step(s) above. Check the latest page state: "
+            f"if the task objective is met, mark the task complete with what was found, otherwise continue the task."
+        )
+        return False
+
+    def _macro_diverged(self, index: int, step: Dict[str, Any], reason: str) -> bool:
+        """Hand a partially replayed task back to the model."""
+        print(f"[Macros] Replay diverged at step {index} ({step['tool']}): {reason}")
+        self.messages.add_system_text(
+            f"A recorded macro for this task ran {index - 1} step(s) and stopped at step {index} "
+            f"({step['tool']}): {reason}. Continue the task from the current page state."
+        )
+        return False
+
+    async def _detect_task_completion(self, task_info: Dict[str, Any]) -> bool:
+        """Ask the router whether the latest tool result already shows the task objective."""
+        latest = None
+        for msg in reversed(self.messages.messages):
+            if msg.role == "system":
+                continue
+            latest = msg
+            break
+        # Only worth asking right after an action produced a fresh page state
+        if latest is None or latest.role != "tool" or not isinstance(latest.content, str):
+            return False
+
+        answer = await self.router.classify(
+            "completion",
+            f"Has this task objective been achieved according to the latest page state? Task: {task_info['task_description']}",
+            ["complete", "not_complete"],
+            latest.content[:6000],
+            escalate=False
+        )
+        if not answer or answer["label"] != "complete":
+            return False
+
+        self.messages.add_assistant_text(f"Task {task_info['task_id']} is complete: {answer['reason']}")
+        await self.mark_task_complete(task_info["task_id"], answer["reason"] or "Task objective reached")
+        return True
+
     async def _log_messages(self) -> None:
-        """Log all messages to chat.log file."""
+        """Append messages added since the last call to log/chat.jsonl without blocking the loop."""
         try:
-            # Create log directory if it doesn't exist
-            os.makedirs("log", exist_ok=True)
-            
-            # Write messages to chat.log
-            with open("log/chat.log", "w", encoding="utf-8") as f:
-                f.write("=== Chat History ===\n\n")
-                for msg in self.messages.messages:
-                    # Write role
-                    f.write(f"[{msg.role.upper()}]\n")
-                    
-                    # Handle different content types
-                    if isinstance(msg.content, str):
-                        f.write(f"{msg.content}\n")
-                    elif isinstance(msg.content, list):
-                        for item in msg.content:
-                            if isinstance(item, dict):
-                                if item.get("type") == "text":
-                                    f.write(f"{item['text']}\n")
-                                elif item.get("type") == "image_url":
-                                    f.write("[IMAGE ATTACHMENT]\n")
-                    
-                    # Write tool calls if present
-                    if msg.tool_calls:
-                        f.write("\nTool Calls:\n")
-                        for tool_call in msg.tool_calls:
-                            f.write(f"- {tool_call['function']['name']}\n")
-                            f.write(f"  Arguments: {tool_call['function']['arguments']}\n")
-                    
-                    f.write("\n---\n\n")
-                
-                f.write("=== End Chat History ===\n")
-            
-            print(f"[Worker] Messages logged to log/chat.log")
+            new_messages = self.messages.messages_since(self._logged_seq)
+            for msg in new_messages:
+                # Copy content, history entries can be trimmed or extended in place later
+                if isinstance(msg.content, list):
+                    content = [
+                        item if item.get("type") != "image_url" else {"type": "image_url", "image_url": "[IMAGE ATTACHMENT]"}
+                        for item in msg.content if isinstance(item, dict)
+                    ]
+                else:
+                    content = msg.content
+                log_writer.write("log/chat.jsonl", {
+                    "worker": self.worker_id,
+                    "session": self.session_id,
+                    "seq": msg.seq,
+                    "role": msg.role,
+                    "content": content,
+                    "name": msg.name,
+                    "tool_call_id": msg.tool_call_id,
+                    "tool_calls": list(msg.tool_calls) if msg.tool_calls else None,
+                })
+            if new_messages:
+                self._logged_seq = new_messages[-1].seq
+                print(f"[Worker] Queued {len(new_messages)} message(s) for log/chat.jsonl")
             
         except Exception as e:
             print(f"[Worker] Error logging messages: {e}")
@@ -761,10 +1282,16 @@ Execute this task using the available tools. Only mark the task as complete when
         try:
             # Parse task ID (convert from one-based to zero-based)
             task_index = int(task_id) - 1
+            await self._wait_for_planning()
             
             # Send success message
             await self.send_to_websocket(f"\nAuto Browser: ✓ {result}")
             
+            # Remember how this task was done so it can be replayed next time
+            if self.macros and self._trace_task_index == task_index:
+                self.macros.record(self.current_workflow.tasks[task_index].description, self._macro_trace)
+                self._macro_trace = []
+
             # Update progress in orchestrator
             self.orchestrator.update_progress(task_index, completed=True)
             
@@ -774,8 +1301,10 @@ Execute this task using the available tools. Only mark the task as complete when
                 print(f"[Worker] Moving to next task: {self.current_workflow.tasks[task_index + 1].title}")
                 print(f"[Worker] Task {task_index + 2}/{len(self.current_workflow.tasks)}")  # Display in one-based
             else:
-                # Workflow is complete
+                # Workflow is complete - remember the plan for similar prompts
+                self.orchestrator.record_workflow_result()
                 await self.send_to_websocket("\nAuto Browser: Workflow completed! Let me know if you need anything else.")
+                self._end_workflow_trace("completed")
             
             return "Task marked as complete"
             
@@ -789,7 +1318,12 @@ Execute this task using the available tools. Only mark the task as complete when
         try:
             # Parse task ID (convert from one-based to zero-based)
             task_index = int(task_id) - 1
+            await self._wait_for_planning()
             
+            # A macro that led to a failed task should not be replayed again
+            if self.macros and self._macro_replayed and self._trace_task_index == task_index:
+                self.macros.forget(self.current_workflow.tasks[task_index].description)
+
             # Send failure message
             await self.send_to_websocket(f"\nAuto Browser: ❌ Task {task_id} failed: {reason}")  # Keep one-based in message
             
@@ -800,8 +1334,11 @@ Execute this task using the available tools. Only mark the task as complete when
                 print(f"[Worker] Moving to next task after failure: {self.current_workflow.tasks[task_index + 1].title}")
                 print(f"[Worker] Task {task_index + 2}/{len(self.current_workflow.tasks)}")  # Display in one-based
             else:
-                # Last task failed
+                # Last task failed; the plan is not cached for reuse
+                self.orchestrator.update_progress(task_index, completed=False, failed=True)
+                self.orchestrator.record_workflow_result()
                 await self.send_to_websocket("\nAuto Browser: Workflow completed with some failed tasks. Let me know if you need anything else.")
+                self._end_workflow_trace("completed_with_failures")
                 self.current_workflow = None
             
             return "Task marked as failed, continuing with next task"
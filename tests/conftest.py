@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The scripts use flat imports (from worker import Worker) with scripts/ on the path
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts"))
@@ -0,0 +1,84 @@
+import json
+import asyncio
+import pytest
+
+pytest.importorskip("playwright")
+
+from web import capture
+from web.capture import NetworkCapture, json_path, query_responses
+
+DATA = {
+    "results": [
+        {"name": "a", "price": 1, "tags": ["x"]},
+        {"name": "b", "price": 2, "meta": {"name": "inner"}},
+    ],
+    "total": 2,
+    "odd key": True,
+}
+
+
+def test_json_path():
+    assert json_path(DATA, "$") == [DATA]
+    assert json_path(DATA, "$.total") == [2]
+    assert json_path(DATA, "$.results[1].name") == ["b"]
+    assert json_path(DATA, "$.results[*].price") == [1, 2]
+    assert json_path(DATA, "$['odd key']") == [True]
+    assert json_path(DATA, "$..name") == ["a", "b", "inner"]
+    assert json_path(DATA, "$.results[5]") == []
+    with pytest.raises(ValueError):
+        json_path(DATA, "$.results[?(@.price > 1)]")
+
+
+class _Request:
+    resource_type = "fetch"
+    method = "GET"
+
+
+class _Response:
+    def __init__(self, url, body):
+        self.url = url
+        self.status = 200
+        self.request = _Request()
+        self.headers = {"content-type": "application/json"}
+        self._body = body
+
+    async def body(self):
+        return self._body
+
+
+def test_capture_parses_small_and_large_bodies(monkeypatch):
+    monkeypatch.setattr(capture, "THREAD_PARSE_BYTES", 100)
+    network = NetworkCapture()
+    network._new_navigation("https://example.com/")
+    large = {"items": list(range(100))}
+
+    async def record():
+        network._on_response(_Response("https://example.com/api/small", b'{"ok": 1}'))
+        network._on_response(_Response("https://example.com/api/large", json.dumps(large).encode()))
+        await network.settle()
+
+    asyncio.run(record())
+    assert [entry["data"] for entry in network.responses("/api/")] == [large, {"ok": 1}]
+    assert json.loads(query_responses(network, "large", "$.items[3]")) == [{"url": "https://example.com/api/large", "matches": [3]}]
+
+
+def test_query_responses_truncates_to_valid_json():
+    network = NetworkCapture()
+    network._new_navigation("https://example.com/")
+    for i in range(10):
+        data = {"items": [{"name": "x" * 50, "id": n} for n in range(20)]}
+        network.navigations[-1]["responses"].append({"url": f"https://example.com/api/page{i}", "method": "GET", "status": 200, "size": 1000, "data": data})
+
+    listing = json.loads(query_responses(network, "/api/", max_chars=600))
+    assert listing["truncated"] is True
+    assert 0 < len(listing["responses"]) < 10
+    assert listing["total"] == 10
+
+    result = json.loads(query_responses(network, "/api/", "$.items[*].name", max_chars=500))
+    assert result["truncated"] is True
+    assert result["total_matches"] == 200
+    assert all(match == "x" * 50 for entry in result["results"] for match in entry["matches"])
+
+    result = json.loads(query_responses(network, "/api/page0", "$.items", max_chars=200))
+    assert result["results"] == []
+    assert result["first_match_shape"] == ["20 items", {"name": "str", "id": "int"}]
@@ -0,0 +1,96 @@
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("playwright")
+
+from web.fetch import extract_readable
+
+ARTICLE = """
+<html><head><title>  The   Article </title></head><body>
+<nav><a href="/">Home</a> <a href="/about">About</a></nav>
+<main>
+  <h1>Heading</h1>
+  <p>""" + "First paragraph of the story with enough words to count. " * 5 + """</p>
+  <ul><li><a href="/a">Related one</a></li><li><a href="/b">Related two</a></li></ul>
+  <p>Second paragraph with a <a href="/ref">reference</a> inside a long sentence of text.</p>
+  <script>var ignored = "script text";</script>
+</main>
+</body></html>
+"""
+
+
+def test_extracts_main_text_without_link_lists():
+    result = extract_readable(ARTICLE, "https://example.com/post")
+    assert result["title"] == "The Article"
+    assert result["needs_browser"] is None
+    assert result["text"].startswith("Heading")
+    assert "Second paragraph" in result["text"]
+    assert "Related one" not in result["text"]
+    assert "script text" not in result["text"]
+    assert "Home" not in result["text"]
+
+
+def test_truncates_to_max_chars():
+    result = extract_readable(ARTICLE, "https://example.com/post", max_chars=50)
+    assert len(result["text"]) == 50
+    assert result["truncated"]
+
+
+def test_flags_pages_that_need_a_browser():
+    app = '<html><body><div id="root"></div><script src="/bundle.js"></script></body></html>'
+    assert extract_readable(app)["needs_browser"] == "page is rendered with JavaScript"
+    login = "<html><body><p>" + "Sign in to continue. " * 20 + '</p><form><input type="password"></form></body></html>'
+    assert extract_readable(login)["needs_browser"] == "login form"
+    assert extract_readable("<html><body></body></html>")["needs_browser"] == "no readable text"
+
+
+def _serve(handler):
+    import asyncio
+    import httpx
+    from web import fetch
+
+    async def run():
+        fetch._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await fetch.fetch_url_text("https://example.com/file")
+        finally:
+            await fetch.close_client()
+    return asyncio.run(run())
+
+
+def test_fetch_skips_large_and_binary_downloads():
+    import httpx
+
+    class Body(httpx.AsyncByteStream):
+        def __init__(self):
+            self.read = 0
+
+        async def __aiter__(self):
+            for _ in range(100):
+                self.read += 1
+                yield b"%PDF" * 1024
+
+    body = Body()
+    result = _serve(lambda request: httpx.Response(200, headers={"content-type": "application/pdf"}, stream=body))
+    assert result["needs_browser"] == "unsupported content type application/pdf"
+    assert body.read == 0
+
+    result = _serve(lambda request: httpx.Response(200, headers={"content-type": "text/plain", "content-length": str(10 ** 9)}, stream=body))
+    assert result["needs_browser"].startswith("response too large")
+    assert body.read == 0
+
+
+def test_fetch_caps_bytes_read(monkeypatch):
+    import httpx
+    from web import fetch
+    monkeypatch.setattr(fetch, "FETCH_MAX_BYTES", 10)
+
+    class Body(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            for chunk in (b"012345", b"6789ab", b"cdef"):
+                yield chunk
+
+    # No content-length header, so only the cap on the bytes read applies
+    result = _serve(lambda request: httpx.Response(200, headers={"content-type": "text/plain; charset=utf-8"}, stream=Body()))
+    assert result["text"] == "0123456789"
+    assert result["needs_browser"] is None
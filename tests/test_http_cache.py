@@ -0,0 +1,42 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from web.http_cache import HttpCache, freshness_lifetime, is_storable
+
+NOW = 1_700_000_000.0
+
+
+def test_freshness_lifetime():
+    assert freshness_lifetime({"cache-control": "public, max-age=600"}) == 600
+    assert freshness_lifetime({"cache-control": "max-age=600, s-maxage=60"}) == 60
+    assert freshness_lifetime({
+        "expires": "Wed, 21 Oct 2015 07:30:00 GMT",
+        "date": "Wed, 21 Oct 2015 07:20:00 GMT",
+    }) == 600
+    assert freshness_lifetime({"expires": "0"}) == 0
+    assert freshness_lifetime({"last-modified": "Tue, 14 Nov 2023 22:13:20 GMT"}, now=NOW + 1000) == pytest.approx(100)
+    assert freshness_lifetime({}) == 0
+
+
+def test_is_storable():
+    assert is_storable(200, {"cache-control": "max-age=60"})
+    assert is_storable(200, {"etag": '"abc"'})
+    assert is_storable(200, {"cache-control": "max-age=60", "vary": "Accept-Encoding"})
+    assert not is_storable(404, {"cache-control": "max-age=60"})
+    assert not is_storable(200, {"cache-control": "no-store"})
+    assert not is_storable(200, {"cache-control": "private, max-age=60"})
+    assert not is_storable(200, {"cache-control": "max-age=60", "set-cookie": "a=b"})
+    assert not is_storable(200, {"cache-control": "max-age=60", "vary": "Cookie"})
+    assert not is_storable(200, {})
+
+
+def test_store_and_lookup(tmp_path):
+    cache = HttpCache(path=str(tmp_path))
+    url = "https://cdn.example.com/app.js"
+    cache.store(url, 200, {"cache-control": "max-age=600", "content-type": "text/javascript", "content-encoding": "gzip"}, b"console.log(1)")
+    entry, body = cache.lookup(url)
+    assert body == b"console.log(1)"
+    assert HttpCache.is_fresh(entry)
+    assert "content-encoding" not in entry["headers"]
+    assert cache.lookup("https://cdn.example.com/other.js") is None
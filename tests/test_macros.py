@@ -0,0 +1,33 @@
+from macros import MacroLibrary
+
+
+def test_selectors_are_recorded_verbatim(tmp_path):
+    library = MacroLibrary(path=str(tmp_path / "macros.json"))
+    library.record('Open result 2 for "cats"', [
+        {"tool": "click_element", "arguments": {"xpathSelector": '(//h2[contains(text(),"cats")]/a)[2]'}, "fingerprint": "a||||"},
+        {"tool": "send_keys_to_element", "arguments": {"xpathSelector": "//input[2]", "keys": "cats"}, "fingerprint": "input||q|text|"},
+        {"tool": "get_url_contents", "arguments": {}},
+    ])
+    steps = library.lookup('Open result 5 for "dogs"')
+    assert [step["tool"] for step in steps] == ["click_element", "send_keys_to_element"]
+    assert steps[0]["arguments"]["xpathSelector"] == '(//h2[contains(text(),"cats")]/a)[2]'
+    assert steps[1]["arguments"] == {"xpathSelector": "//input[2]", "keys": "dogs"}
+
+
+def test_lookup_requires_matching_parameter_count(tmp_path):
+    library = MacroLibrary(path=str(tmp_path / "macros.json"))
+    library.record('Search "cats"', [{"tool": "move_to_url", "arguments": {"url": "https://example.com"}}])
+    assert library.lookup('Search "dogs" 3') is None
+    library.forget('Search "dogs"')
+    assert library.lookup('Search "dogs"') is None
+
+
+def test_replay_keeps_parameter_case(tmp_path):
+    library = MacroLibrary(path=str(tmp_path / "macros.json"))
+    library.record('Open https://en.wikipedia.org/wiki/Alan_Turing and search "Alan Turing"', [
+        {"tool": "move_to_url", "arguments": {"url": "https://en.wikipedia.org/wiki/Alan_Turing"}},
+        {"tool": "send_keys_to_element", "arguments": {"xpathSelector": "//input[@name='search']", "keys": "Alan Turing"}},
+    ])
+    steps = library.lookup('open https://en.wikipedia.org/wiki/Grace_Hopper and search "Grace Hopper"')
+    assert steps[0]["arguments"] == {"url": "https://en.wikipedia.org/wiki/Grace_Hopper"}
+    assert steps[1]["arguments"]["keys"] == "Grace Hopper"
@@ -0,0 +1,33 @@
+import json
+import pytest
+
+pytest.importorskip("tiktoken")
+
+from metrics import message_category
+from messages import Message
+
+SNAPSHOT = json.dumps({"total_elements": 1, "elements": {"links": [{"tag": "a", "text": "Docs", "xpath_selector": "//a[@href='/docs']"}]}}, indent=2)
+
+
+def tool_message(name, content):
+    # The dict sent to the API for a tool result
+    return Message.create_tool_response("call_1", content, name).to_dict()
+
+
+def test_page_snapshots_from_any_tool_are_page_json():
+    assert message_category(tool_message("get_url_contents", SNAPSHOT), 2) == "page_json"
+    assert message_category(tool_message("move_to_url", f"Navigated to https://example.com. Contents: {SNAPSHOT}"), 2) == "page_json"
+    assert message_category(tool_message("click_element", f"Element clicked. Contents: {SNAPSHOT}"), 2) == "page_json"
+    assert message_category(tool_message("send_keys_to_element", f"Keys sent. Contents: {SNAPSHOT}"), 2) == "page_json"
+
+
+def test_other_tool_results():
+    assert message_category(tool_message("click_element", "Error clicking element: Timeout 5000ms exceeded"), 2) == "tool_results"
+    assert message_category(tool_message("mark_task_complete", "Task marked as complete"), 2) == "tool_results"
+
+
+def test_other_roles():
+    assert message_category({"role": "system", "content": "prompt"}, 0) == "system_prompt"
+    assert message_category({"role": "system", "content": "Current task: x"}, 3) == "task_instructions"
+    assert message_category({"role": "assistant", "content": "ok"}, 4) == "assistant"
+    assert message_category({"role": "user", "content": "find docs"}, 1) == "user"
@@ -0,0 +1,17 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from web.network import RequestRouter
+
+
+def test_vision_keeps_images_and_fonts():
+    config = {"block_resource_types": "image,media,font"}
+    router = RequestRouter.from_config({**config, "enable_vision": "true", "http_cache": "false"})
+    assert router.block_reason("https://example.com/a.png", "image") is None
+    assert router.block_reason("https://example.com/a.woff2", "font") is None
+    assert router.block_reason("https://example.com/a.mp4", "media") == "resource_type"
+
+    router = RequestRouter.from_config({**config, "enable_vision": "false", "http_cache": "false"})
+    assert router.block_reason("https://example.com/a.png", "image") == "resource_type"
+    assert router.block_reason("https://doubleclick.net/ad.js", "script") == "domain"
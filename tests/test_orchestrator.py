@@ -0,0 +1,51 @@
+import json
+import pytest
+
+pytest.importorskip("openai")
+
+from orchestrator import Orchestrator, StreamingPlanParser, Workflow, Task
+from plan_cache import PlanCache
+
+PLAN = {
+    "title": "Find {cats}",
+    "tasks": [
+        {"title": "Search", "description": "Search for \"cats\" with a \\\"quoted\\\" } brace"},
+        {"title": "Open", "description": "Open the first result"},
+    ],
+}
+
+
+def test_streaming_parser_yields_tasks_as_they_complete():
+    text = json.dumps(PLAN)
+    parser = StreamingPlanParser()
+    tasks = []
+    for i in range(0, len(text), 7):
+        tasks.extend(parser.feed(text[i:i + 7]))
+    assert parser.title == "Find {cats}"
+    assert [(task.title, task.description) for task in tasks] == [(t["title"], t["description"]) for t in PLAN["tasks"]]
+    assert json.loads(parser.buffer) == PLAN
+
+
+def _orchestrator(tmp_path, completed):
+    orchestrator = Orchestrator(api_key="sk-test", plan_cache=PlanCache(path=str(tmp_path / "plans.json")))
+    orchestrator.current_prompt = "find cats"
+    orchestrator.current_workflow = Workflow("Find cats", [Task("Search", "Search for cats"), Task("Open", "Open it")])
+    orchestrator.update_progress(0, completed=True)
+    orchestrator.update_progress(1, completed=completed, failed=not completed)
+    return orchestrator
+
+
+def test_plan_cached_only_after_success(tmp_path):
+    orchestrator = _orchestrator(tmp_path, completed=True)
+    assert orchestrator.plan_cache.lookup("find cats") is None
+    orchestrator.record_workflow_result()
+    cached = orchestrator.plan_cache.lookup("Find cats!")
+    assert [task["title"] for task in cached["tasks"]] == ["Search", "Open"]
+    assert not any(task["completed"] for task in cached["tasks"])
+
+
+def test_failed_workflow_drops_cached_plan(tmp_path):
+    orchestrator = _orchestrator(tmp_path, completed=False)
+    orchestrator.plan_cache.store("find cats", orchestrator.current_workflow.to_dict())
+    orchestrator.record_workflow_result()
+    assert orchestrator.plan_cache.lookup("find cats") is None
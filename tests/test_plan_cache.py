@@ -0,0 +1,68 @@
+from plan_cache import PlanCache, normalize_prompt, extract_parameters, parameterize, fill
+
+
+def test_normalize_prompt():
+    assert normalize_prompt("  Search   for Cats!! ") == "search for cats"
+
+
+def test_extract_parameters():
+    skeleton, params = extract_parameters('Search "cats" on example.com and open result 2')
+    assert skeleton == "search {p0} on {p1} and open result {p2}"
+    assert params == ["cats", "example.com", "2"]
+
+
+def test_extract_parameters_keeps_case():
+    skeleton, params = extract_parameters('Open https://github.com/Anthropic/SDK and say "Good Morning"')
+    assert skeleton == "open {p0} and say {p1}"
+    assert params == ["https://github.com/Anthropic/SDK", "Good Morning"]
+
+
+def test_parameterize_round_trip():
+    text = parameterize('Search for "cats" on example.com', ["cats", "example.com"])
+    assert text == 'Search for "{p0}" on {p1}'
+    assert fill(text, ["dogs", "example.org"]) == 'Search for "dogs" on example.org'
+
+
+def test_parameterize_leaves_values_inside_tokens():
+    params = ["cats", "2"]
+    assert parameterize('//h2[contains(text(),"x")]/a', params) == '//h2[contains(text(),"x")]/a'
+    assert parameterize("Released in 2022", params) == "Released in 2022"
+    assert parameterize("Open the 2nd result", params) == "Open the 2nd result"
+    assert parameterize("Visit example.com/docs", ["example.com"]) == "Visit example.com/docs"
+
+
+def test_parameterize_keeps_task_numbers():
+    assert parameterize("Task 2: open result 2", ["2"]) == "Task 2: open result {p0}"
+    assert parameterize("Show the top 10", ["10"]) == "Show the top {p0}"
+
+
+def test_parameterize_escapes_braces():
+    text = parameterize("Fill {name} with cats", ["cats"])
+    assert fill(text, ["dogs"]) == "Fill {name} with dogs"
+
+
+def test_template_lookup(tmp_path):
+    cache = PlanCache(path=str(tmp_path / "plans.json"))
+    plan = {
+        "title": 'Search "cats"',
+        "current_task_index": 1,
+        "tasks": [{"title": "Task 1", "description": 'Search for "cats" and open h2 result', "completed": True, "failed": False}],
+    }
+    cache.record_success('Search "cats"', plan)
+    filled = cache.lookup('search "dogs"')
+    assert filled["title"] == 'Search "dogs"'
+    assert filled["tasks"][0]["description"] == 'Search for "dogs" and open h2 result'
+    assert filled["tasks"][0]["completed"] is False
+    assert filled["current_task_index"] == 0
+    assert PlanCache(path=str(tmp_path / "plans.json")).lookup('search "birds"') is not None
+
+
+def test_template_fills_original_case(tmp_path):
+    cache = PlanCache(path=str(tmp_path / "plans.json"))
+    prompt = 'Open https://github.com/Anthropic/SDK and post "Good Morning"'
+    cache.record_success(prompt, {
+        "title": "Post greeting",
+        "tasks": [{"title": "Open", "description": 'Go to https://github.com/Anthropic/SDK and type "Good Morning"'}],
+    })
+    filled = cache.lookup('open https://example.com/Docs/API and post "Hello There"')
+    assert filled["tasks"][0]["description"] == 'Go to https://example.com/Docs/API and type "Hello There"'
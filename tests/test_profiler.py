@@ -0,0 +1,27 @@
+import sys
+import signal
+import pytest
+
+from web.profiler import SamplingProfiler
+
+
+def test_collapsed_is_cumulative():
+    profiler = SamplingProfiler()
+    frame = sys._getframe()
+    profiler._record(frame, "task-1", "scope", locked=False)
+    profiler._record(frame, "task-1", "scope", locked=False)
+    first = profiler.collapsed()
+    assert first.startswith("task:task-1;scope:scope;")
+    assert first.endswith(" 2")
+    profiler._record(frame, "task-1", "scope")
+    assert profiler.collapsed().endswith(" 3")
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGPROF"), reason="SIGPROF sampling is Unix only")
+def test_signal_during_collapsed_does_not_deadlock():
+    profiler = SamplingProfiler()
+    profiler._record(sys._getframe(), "", "", locked=False)
+    with profiler._lock:
+        # A sample arriving while a reader holds the lock must not wait for it
+        profiler._on_signal(signal.SIGPROF, sys._getframe())
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in profiler.collapsed().splitlines()) == 2
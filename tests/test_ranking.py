@@ -0,0 +1,48 @@
+import json
+import pytest
+
+pytest.importorskip("playwright")
+
+from web.ranking import terms, score_element, take_within_budget, rank_snapshot
+
+
+def test_terms():
+    assert terms("Compare the Prices of laptops") == {"compare", "price", "laptop"}
+    assert terms(None) == set()
+
+
+def test_score_prefers_matching_visible_interactive_elements():
+    task = terms("search for laptops")
+    search_box = {"tag": "input", "placeholder": "Search", "viewportY": 0.1}
+    footer_link = {"tag": "a", "text": "Careers", "viewportY": 5}
+    below_fold = {"tag": "input", "placeholder": "Search", "viewportY": 3}
+    assert score_element(search_box, task) > score_element(below_fold, task) > score_element(footer_link, task)
+
+
+def test_take_within_budget_keeps_at_least_one():
+    entries = [{"element": {"tag": "a", "text": "x" * 400, "href": "/a"}} for _ in range(3)]
+    selected, rest = take_within_budget(entries, token_budget=10)
+    assert len(selected) == 1 and len(rest) == 2
+    selected, rest = take_within_budget(entries, token_budget=10_000)
+    assert len(selected) == 3 and rest == []
+
+
+def test_group_field_is_not_charged():
+    plain = [{"element": {"tag": "a", "text": "Item", "href": "/a"}}]
+    grouped = [{"element": {"tag": "a", "text": "Item", "href": "/a", "group": "li.result-row.card>a" * 20}}]
+    cost = []
+    take_within_budget(plain, 0, count_tokens=lambda text: cost.append(len(text)) or 0)
+    take_within_budget(grouped, 0, count_tokens=lambda text: cost.append(len(text)) or 0)
+    assert cost[:2] == cost[2:]
+
+
+def test_rank_snapshot():
+    snapshot = json.dumps({"elements": {
+        "links": [{"tag": "a", "text": "Careers", "href": "/jobs", "viewportY": 4}],
+        "inputs": [{"tag": "input", "placeholder": "Search products", "viewportY": 0.2}],
+    }})
+    reduced, remaining = rank_snapshot(snapshot, "search products", token_budget=1)
+    data = json.loads(reduced)
+    assert data["elements"] == {"inputs": [{"tag": "input", "placeholder": "Search products"}]}
+    assert data["more_available"]["count"] == 1
+    assert remaining[0]["element"]["text"] == "Careers"
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from web.reader import split_chunks, rank_chunks
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_split_chunks_keeps_paragraphs_together():
+    text = "one two three\n\nfour five\n\nsix seven eight nine"
+    # Each piece costs its words plus one for the joining newline
+    assert split_chunks(text, chunk_tokens=7, count_tokens=count_words) == ["one two three\nfour five", "six seven eight nine"]
+
+
+def test_split_chunks_breaks_long_paragraphs():
+    sentence = "word " * 9 + "end."
+    chunks = split_chunks(f"{sentence} {sentence} {sentence}", chunk_tokens=12, count_tokens=count_words)
+    assert len(chunks) == 3
+    assert all(count_words(chunk) <= 12 for chunk in chunks)
+    run_on = split_chunks("x" * 100, chunk_tokens=10)
+    assert "".join(run_on) == "x" * 100
+    assert all(len(chunk) // 4 <= 10 for chunk in run_on)
+
+
+def test_split_chunks_empty():
+    assert split_chunks("") == []
+    assert split_chunks("\n \n") == []
+
+
+def test_rank_chunks():
+    chunks = ["about shipping", "pricing and plans", "contact", "plans for teams"]
+    assert rank_chunks(chunks, "team pricing plans") == [1, 3, 0, 2]
+    assert rank_chunks(chunks, None) == [0, 1, 2, 3]
@@ -0,0 +1,43 @@
+import json
+import asyncio
+import pytest
+
+pytest.importorskip("playwright")
+
+from web import records
+from web.records import RecordSink, parse_fields
+
+
+def test_parse_fields():
+    assert parse_fields({"title": "h2", "link": "a@href"}) == [("title", "h2"), ("link", "a@href")]
+    assert parse_fields('{"title": "h2"}') == [("title", "h2")]
+    assert parse_fields("price, name") == [("price", ".price"), ("name", ".name")]
+    with pytest.raises(ValueError):
+        parse_fields(3)
+
+
+def test_sink_keeps_small_results_inline():
+    sink = RecordSink(["title"])
+    asyncio.run(sink.add("https://example.com/1", [["a"], ["b"]]))
+    summary = json.loads(sink.summary(1))
+    assert summary["rows"] == [["a"], ["b"]]
+    assert "file" not in summary
+
+
+def test_spilled_rows_keep_their_own_url(tmp_path, monkeypatch):
+    monkeypatch.setattr(records, "RECORDS_DIR", str(tmp_path))
+    monkeypatch.setattr(records, "INLINE_ROWS", 3)
+    sink = RecordSink(["title"], worker_id="t")
+
+    async def fill():
+        await sink.add("https://example.com/1", [["a"], ["b"]])
+        await asyncio.gather(*[sink.add(f"https://example.com/{page}", [[f"p{page}"]] * 2) for page in range(2, 6)])
+
+    asyncio.run(fill())
+    with open(sink.path, encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f]
+    assert len(lines) == sink.count == 10
+    assert [line["_url"] for line in lines[:2]] == ["https://example.com/1"] * 2
+    for line in lines[2:]:
+        assert line["_url"].endswith(line["title"][1:])
+    assert len(sink.rows) == 3
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("playwright")
+
+from web.repeated import collapse_elements, collapse_repeated
+
+
+def row(i):
+    return {"tag": "a", "text": f"Item {i}", "href": f"/item/{i}", "group": "li.result>a",
+            "xpath_selector": f"//a[@href='/item/{i}']"}
+
+
+def test_collapses_groups_of_min_rows():
+    elements = [{"tag": "h1", "text": "Results"}] + [row(i) for i in range(4)] + [{"tag": "button", "text": "Next"}]
+    collapsed = collapse_elements(elements)
+    assert [entry.get("tag", "repeated") for entry in collapsed] == ["h1", "repeated", "button"]
+    table = collapsed[1]
+    assert table["repeated"] == 4
+    assert table["template"] == {"tag": "a"}
+    assert table["fields"] == ["text", "href", "xpath_selector"]
+    assert table["rows"][2] == ["Item 2", "/item/2", "//a[@href='/item/2']"]
+
+
+def test_short_groups_are_kept_and_group_field_removed():
+    elements = [row(i) for i in range(3)] + [{"tag": "input", "type": "search", "group": "form>input"}]
+    collapsed = collapse_elements(elements)
+    assert len(collapsed) == 4
+    assert all("group" not in entry for entry in collapsed)
+
+
+def test_collapse_repeated_by_category():
+    results = {"links": [row(i) for i in range(5)], "total_elements": 5}
+    collapsed = collapse_repeated(results)
+    assert collapsed["links"][0]["repeated"] == 5
+    assert collapsed["total_elements"] == 5
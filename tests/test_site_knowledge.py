@@ -0,0 +1,35 @@
+import time
+
+from site_knowledge import SiteKnowledge
+
+
+def test_known_good_and_bad(tmp_path):
+    knowledge = SiteKnowledge(path=str(tmp_path / "knowledge.db"))
+    for _ in range(2):
+        knowledge.record_success("example.com", "//button[@id='go']")
+    for _ in range(3):
+        knowledge.record_failure("example.com", "//a[2]")
+    assert [entry["xpath_selector"] for entry in knowledge.known_good("example.com")] == ["//button[@id='go']"]
+    assert knowledge.known_bad("example.com") == {"//a[2]"}
+    assert knowledge.known_bad("other.com") == set()
+
+
+def test_expired_entries_are_ignored_and_reset(tmp_path):
+    knowledge = SiteKnowledge(path=str(tmp_path / "knowledge.db"))
+    for _ in range(3):
+        knowledge.record_failure("example.com", "//a[2]")
+    knowledge.conn.execute("UPDATE selectors SET last_used = ?", (time.time() - 31 * 86400,))
+    knowledge.conn.commit()
+    assert knowledge.known_bad("example.com") == set()
+
+    knowledge.record_failure("example.com", "//a[2]")
+    row = knowledge.conn.execute("SELECT successes, failures FROM selectors").fetchone()
+    assert row == (0, 1)
+    # Reopening prunes entries past the age limit
+    knowledge.conn.execute("UPDATE selectors SET last_used = ?", (time.time() - 31 * 86400,))
+    knowledge.conn.commit()
+    assert SiteKnowledge(path=str(tmp_path / "knowledge.db")).conn.execute("SELECT COUNT(*) FROM selectors").fetchone()[0] == 0
+
+
+def test_domain_of():
+    assert SiteKnowledge.domain_of("https://www.Example.com/path") == "example.com"